@@ -1,38 +1,325 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, Response, stream_with_context
 from flask_cors import CORS
 from datetime import datetime
 from pathlib import Path
 import os
-import pandas as pd
+import json
+import threading
+import time
 from werkzeug.utils import secure_filename
 from backend.database import init_db
-from predict_seq import ProteinPredictor
+from batching import MicroBatcher
+from predict_fasta import iter_fasta, stream_predictions
+from jobs import JobManager
+from model_registry import ModelRegistry, RegistryWatcher
+from utils.result_index import ResultIndexCache, remove_result_index
 from auth import register_user, login_user
+from prediction_store import (
+    save_predictions, save_predictions_stream, list_jobs, get_job_results, get_protein_results, delete_job, import_results_dir
+)
 
 app = Flask(__name__)
 CORS(app)
 
-# 初始化数据库
-init_db()
-
 # 配置
 UPLOAD_FOLDER = 'static/uploads'
 RESULTS_FOLDER = 'static/results'
-SEQUENCE_RESULTS_FILE = 'static/results/sequence_predictions.csv'
+SEQUENCE_RESULTS_JOB = 'sequence_predictions.csv'  # 单序列预测统一记录在该任务下
 ALLOWED_EXTENSIONS = {'fasta'}
 MODEL_PATH = 'models/best_model.pt'
 
+# 推理设备配置: 不设置 INFERENCE_DEVICE 时有GPU用GPU，否则用CPU
+INFERENCE_DEVICE = os.environ.get('INFERENCE_DEVICE') or None
+CPU_QUANTIZE = os.environ.get('CPU_QUANTIZE', '0') == '1'  # CPU上启用int8动态量化
+CPU_THREADS = int(os.environ.get('CPU_THREADS', 0)) or None  # intra-op 线程数，默认由torch决定
+CPU_INTEROP_THREADS = int(os.environ.get('CPU_INTEROP_THREADS', 0)) or None
+
+# 预测器后端: 'eager' 加载 esm + torch_geometric 原始模型，'artifact' 只加载 export_model.py 的导出产物
+PREDICTOR_BACKEND = os.environ.get('PREDICTOR_BACKEND', 'eager')
+MODEL_ARTIFACT_DIR = os.environ.get('MODEL_ARTIFACT_DIR', 'models/export')
+
+# 模型版本注册目录(model_registry.py)，激活版本变化时在后台加载新版本并原子替换
+MODEL_REGISTRY_DIR = os.environ.get('MODEL_REGISTRY_DIR', 'models/registry')
+MODEL_WATCH_INTERVAL = float(os.environ.get('MODEL_WATCH_INTERVAL', 5))  # 检查间隔(秒)，0 表示不监视
+MODEL_RETIRE_SECONDS = float(os.environ.get('MODEL_RETIRE_SECONDS', 30))  # 替换后旧版本继续保留的时间
+
+# 长序列处理方式覆盖('truncate' / 'window')，不设置时使用模型配置sidecar中的值(默认截断)
+LONG_SEQUENCE = os.environ.get('LONG_SEQUENCE') or None
+
+# 多进程部署(gunicorn.conf.py): 模型在主进程加载并移入共享内存，由 fork 出的各worker共用
+SHARED_WEIGHTS = os.environ.get('SHARED_WEIGHTS', '0') == '1'
+
+# 微批调度配置
+BATCH_MAX_WAIT_MS = int(os.environ.get('BATCH_MAX_WAIT_MS', 10))
+BATCH_MAX_SIZE = int(os.environ.get('BATCH_MAX_SIZE', 16))
+BATCH_MAX_RESIDUES = int(os.environ.get('BATCH_MAX_RESIDUES', 8000))
+
+# ESM嵌入缓存配置
+EMBEDDING_CACHE_DIR = 'data/embedding_cache'
+EMBEDDING_CACHE_MEMORY_MB = int(os.environ.get('EMBEDDING_CACHE_MEMORY_MB', 256))
+RESULT_CACHE_ENTRIES = int(os.environ.get('RESULT_CACHE_ENTRIES', 100000))
+
+# 流式预测时每次读取的记录数(越小首个结果越快返回)
+STREAM_BUCKET_SIZE = int(os.environ.get('STREAM_BUCKET_SIZE', 64))
+
+# 异步任务配置
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 1))
+
 app.config.update( #  配置项
     UPLOAD_FOLDER=UPLOAD_FOLDER,
     RESULTS_FOLDER=RESULTS_FOLDER
 )
 
-# 确保目录存在
-for folder in [UPLOAD_FOLDER, RESULTS_FOLDER]:
-    os.makedirs(folder, exist_ok=True)
+# 结果CSV旁路索引缓存(用于未入库的结果文件)
+result_index_cache = ResultIndexCache()
+
+# 模型注册目录及其监视线程在 startup() 中创建
+model_registry = None
+model_watcher = None
+
+# 模型相关对象在第一次使用或调用 /warmup 时才创建(同时才导入 torch 等依赖)，
+# 认证、历史记录和健康检查接口在启动后立即可用
+WARMUP_ON_START = os.environ.get('WARMUP_ON_START', '0') == '1'  # 启动后在后台加载模型并预热
+STARTED_AT = time.time()
+
+embedding_caches = {}  # 缓存名(embedding_cache_name) -> EmbeddingCache，ESM设置相同的模型版本共用
+result_cache = None
+predictor = None
+batcher = None
+_model_lock = threading.Lock()
+_swap_lock = threading.Lock()
+model_state = {
+    'status': 'not_loaded',  # not_loaded / loading / ready / failed
+    'backend': PREDICTOR_BACKEND,
+    'version': None,
+    'load_seconds': None,
+    'warmup_seconds': None,
+    'loaded_at': None,
+    'error': None,
+    'swap': {'status': 'idle', 'target': None, 'error': None},  # 热替换状态: idle / loading / failed
+}
+
+
+def _resolve_model(version=None):
+    """返回 (版本名, 权重路径)，默认取激活版本；注册目录为空时把 MODEL_PATH 登记为第一个版本"""
+    if model_registry.active_version() is None:
+        model_registry.register_initial(MODEL_PATH, note='初始模型')
+    record, path = model_registry.resolve(version)
+    return record['version'], path
+
+
+def _get_embedding_cache(config):
+    from utils.embedding_cache import EmbeddingCache, embedding_cache_name
+
+    # 缓存名包含表示层、长序列窗口设置和是否量化，配置变化后不会读到旧的嵌入
+    name = embedding_cache_name(config, quantized=CPU_QUANTIZE)
+    if name not in embedding_caches:
+        embedding_caches[name] = EmbeddingCache(
+            name,
+            max_memory_bytes=EMBEDDING_CACHE_MEMORY_MB * 1024 * 1024,
+            disk_dir=EMBEDDING_CACHE_DIR
+        )
+    return embedding_caches[name]
+
+
+def _create_predictor(version=None):
+    """创建指定模型版本(默认激活版本)的预测器和微批调度器，不替换正在使用的对象"""
+    global result_cache
+    from utils.result_cache import ResultCache
+
+    if result_cache is None:
+        # 结果缓存按模型作用域区分条目，所有版本共用一个
+        result_cache = ResultCache(max_entries=RESULT_CACHE_ENTRIES)
+    if PREDICTOR_BACKEND == 'artifact':
+        # 导出产物的清单中自带模型校验和，不经过模型注册目录
+        from predict_artifact import MANIFEST_FILE, ArtifactPredictor
+        with open(os.path.join(MODEL_ARTIFACT_DIR, MANIFEST_FILE), 'r') as f:
+            config = json.load(f)['config']
+        loaded = ArtifactPredictor(MODEL_ARTIFACT_DIR, device=INFERENCE_DEVICE,
+                                   embedding_cache=_get_embedding_cache(config),
+                                   result_cache=result_cache, num_threads=CPU_THREADS,
+                                   num_interop_threads=CPU_INTEROP_THREADS)
+    else:
+        from models.config import load_model_config
+        from predict_seq import ProteinPredictor
+        version, model_path = _resolve_model(version)
+        config = load_model_config(model_path)
+        if LONG_SEQUENCE:
+            config['long_sequence'] = LONG_SEQUENCE
+        loaded = ProteinPredictor(model_path, device=INFERENCE_DEVICE,
+                                  embedding_cache=_get_embedding_cache(config),
+                                  result_cache=result_cache, config=config, quantize=CPU_QUANTIZE,
+                                  num_threads=CPU_THREADS, num_interop_threads=CPU_INTEROP_THREADS,
+                                  model_version=version)
+
+    # 合并并发的单序列请求
+    loaded_batcher = MicroBatcher(
+        loaded,
+        max_wait_ms=BATCH_MAX_WAIT_MS,
+        max_batch_size=BATCH_MAX_SIZE,
+        max_residues=BATCH_MAX_RESIDUES,
+        max_length=loaded.config['max_length']
+    )
+    return loaded, loaded_batcher
+
+
+def _load_predictor():
+    global predictor, batcher
+
+    model_state.update(status='loading', error=None)
+    start = time.perf_counter()
+    try:
+        loaded, loaded_batcher = _create_predictor()
+        if SHARED_WEIGHTS:
+            shared_bytes = loaded.share_memory()
+            print(f"模型权重已移入共享内存: {shared_bytes / 1024 ** 2:.1f}MB")
+        batcher = loaded_batcher
+        predictor = loaded
+    except Exception as e:
+        model_state.update(status='failed', error=str(e))
+        print(f"模型加载失败：{str(e)}")
+        raise
+
+    model_state.update(status='ready', version=loaded.model_version,
+                       load_seconds=round(time.perf_counter() - start, 3),
+                       loaded_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+    print(f"模型 {loaded.model_version} 加载完成，耗时 {model_state['load_seconds']}s")
+
+
+def get_predictor():
+    """返回预测器，第一次调用时加载模型(线程安全，加载失败时下次调用会重试)"""
+    if predictor is None:
+        with _model_lock:
+            if predictor is None:
+                _load_predictor()
+    return predictor
+
+
+def get_batcher():
+    get_predictor()
+    return batcher
+
+
+def warmup():
+    """加载模型并用虚拟序列跑一次前向，触发内存分配器和算子初始化"""
+    loaded = get_predictor()
+    start = time.perf_counter()
+    loaded.warmup()
+    model_state['warmup_seconds'] = round(time.perf_counter() - start, 3)
+
+
+def _warmup_in_background():
+    try:
+        warmup()
+    except Exception as e:
+        print(f"模型预热失败：{str(e)}")
+
+
+def swap_model(version=None):
+    """
+    热替换模型版本(默认激活版本): 在调用线程中加载并预热新版本，期间旧版本照常服务；
+    完成后在锁内替换 predictor/batcher 引用。已取得旧引用的请求、流式预测和异步任务
+    继续用旧权重完成，旧调度器在 MODEL_RETIRE_SECONDS 秒后停止(停止前会处理完队列)。
+    多进程部署时替换后的权重为各worker私有，不再共享内存。
+    返回是否成功(模型尚未加载或已是目标版本也算成功)，失败时注册目录监视会在下次轮询时重试
+    """
+    global predictor, batcher
+
+    with _swap_lock:
+        if predictor is None:
+            # 模型还没有加载，第一次使用时会直接加载激活版本
+            return True
+        target = version or model_registry.active_version()
+        if target == predictor.model_version:
+            return True
+
+        model_state['swap'] = {'status': 'loading', 'target': target, 'error': None}
+        start = time.perf_counter()
+        try:
+            loaded, loaded_batcher = _create_predictor(target)
+            loaded.warmup()
+        except Exception as e:
+            model_state['swap'] = {'status': 'failed', 'target': target, 'error': str(e)}
+            print(f"模型版本 {target} 加载失败，继续使用 {predictor.model_version}：{str(e)}")
+            return False
+
+        with _model_lock:
+            old_predictor, old_batcher = predictor, batcher
+            predictor, batcher = loaded, loaded_batcher
+        model_state.update(version=loaded.model_version, load_seconds=round(time.perf_counter() - start, 3),
+                           loaded_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        model_state['swap'] = {'status': 'idle', 'target': None, 'error': None}
+        print(f"模型已从 {old_predictor.model_version} 切换到 {loaded.model_version}，"
+              f"耗时 {model_state['load_seconds']}s")
+
+        timer = threading.Timer(MODEL_RETIRE_SECONDS, _retire_model, args=(old_predictor, old_batcher))
+        timer.daemon = True
+        timer.start()
+        return True
+
+
+def _retire_model(old_predictor, old_batcher):
+    """停止旧版本的调度器，并清除旧版本的结果缓存条目"""
+    old_batcher.stop()
+    if old_predictor.cache_scope != predictor.cache_scope:
+        result_cache.invalidate(old_predictor.cache_scope)
+    print(f"模型版本 {old_predictor.model_version} 已下线")
+
+
+def start_model_watcher():
+    """启动模型注册目录监视(激活版本变化时热替换)，多进程部署时由 gunicorn.conf.py 在每个worker中调用"""
+    if model_watcher is not None and MODEL_WATCH_INTERVAL > 0 and PREDICTOR_BACKEND == 'eager':
+        model_watcher.start()
+
+
+# 异步FASTA预测任务(第一个任务开始时才加载模型)，线程池的线程在提交任务时才创建
+job_manager = JobManager(get_predictor, UPLOAD_FOLDER, RESULTS_FOLDER, max_workers=JOB_WORKERS)
+
+_started = False
+_startup_lock = threading.Lock()
+
+
+def startup():
+    """
+    启动时的初始化: 建表、创建目录、导入历史结果CSV、打开模型注册目录、预加载模型、
+    启动注册目录监视并恢复未完成的异步任务。导入 app 模块时不执行(只定义配置和路由)，
+    由 __main__ 和 gunicorn.conf.py(主进程 fork 之前)调用，其他部署方式在第一个请求时调用；重复调用直接返回
+    """
+    global model_registry, model_watcher, _started
+
+    with _startup_lock:
+        if _started:
+            return
+
+        init_db()
+        for folder in [UPLOAD_FOLDER, RESULTS_FOLDER]:
+            os.makedirs(folder, exist_ok=True)
+
+        # 导入尚未入库的历史结果CSV(已导入的会被跳过)，在开始处理请求之前同步完成:
+        # 否则先到的预测请求会创建同名任务(如 sequence_predictions.csv)，导入时该CSV被当作已导入而跳过
+        import_results_dir(RESULTS_FOLDER)
+
+        model_registry = ModelRegistry(MODEL_REGISTRY_DIR)
+        model_watcher = RegistryWatcher(model_registry, swap_model, interval=MODEL_WATCH_INTERVAL)
+
+        if SHARED_WEIGHTS:
+            # 多进程部署: 必须在主进程 fork 之前加载，worker 才能共享权重；
+            # 主进程不监视注册目录(避免在主进程加载新版本)也不执行任务，由 gunicorn.conf.py 在 fork 后启动
+            get_predictor()
+        else:
+            if WARMUP_ON_START:
+                threading.Thread(target=_warmup_in_background, name='model-warmup', daemon=True).start()
+            start_model_watcher()
+            job_manager.resume_pending()
+        _started = True
+
+
+@app.before_request
+def _ensure_started():
+    # 没有经过 __main__ / gunicorn.conf.py 启动时(如 flask run)，在第一个请求时初始化
+    if not _started:
+        startup()
 
-# 初始化序列预测器
-predictor = ProteinPredictor(MODEL_PATH, device='cuda')
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -97,24 +384,15 @@ def predict_sequence():
         if not sequence or len(sequence) < 10:
             return jsonify({'error': '序列长度过短'}), 400
 
-        # 预测
-        predictions = predictor.predict(sequence)
+        # 预测(经微批调度器与其他并发请求合批)
+        predictions = get_batcher().predict(sequence)
 
-        # 准备保存的数据
-        df = pd.DataFrame(predictions)
-
-        # 确保列的顺序正确
-        df = df[['timestamp', 'protein_id', 'sequence', 'function', 'confidence']]
-
-        # 保存到CSV
-        if os.path.exists(SEQUENCE_RESULTS_FILE):
-            df.to_csv(SEQUENCE_RESULTS_FILE, mode='a', header=False, index=False)
-        else:
-            df.to_csv(SEQUENCE_RESULTS_FILE, index=False)
+        # 保存到数据库
+        save_predictions(SEQUENCE_RESULTS_JOB, 'sequence', predictions)
 
         return jsonify({
             'results': predictions,
-            'filename': 'sequence_predictions.csv'
+            'filename': SEQUENCE_RESULTS_JOB
         })
 
     except Exception as e:
@@ -132,44 +410,31 @@ def predict_fasta():
         return jsonify({'error': '没有选择文件'}), 400
 
     if allowed_file(file.filename):
+        # async=1 时立即返回任务ID，由后台线程池执行
+        if request.args.get('async', type=int):
+            return submit_job()
+
         try:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             orig_filename = secure_filename(file.filename)
             result_filename = f"{timestamp}_{orig_filename}.csv"
 
-            # 保存并预测
-            input_filepath = os.path.join(app.config['UPLOAD_FOLDER'], 'test.fasta')
             result_filepath = os.path.join(app.config['RESULTS_FOLDER'], result_filename)
 
-            file.save(input_filepath)
-
-            import sys
-            from predict_fasta import main
-            sys.argv = [
-                'predict_fasta.py',
-                '--fasta', input_filepath,
-                '--model', MODEL_PATH,
-                '--output', result_filepath
-            ]
-            main()
-
-            # 读取结果
-            if os.path.exists(result_filepath):
-                results_df = pd.read_csv(result_filepath)
-
-                # 按蛋白质ID和置信度排序
-                results_df = results_df.sort_values(
-                    ['protein_id', 'confidence'],
-                    ascending=[True, False]
-                )
-
-                # 添加一个新的API端点，获取单个蛋白质的序列
-                return jsonify({
-                    'results': results_df.to_dict(orient='records'),
-                    'filename': result_filename
-                })
+            # 直接从上传流中逐条解析并分批预测，不再先完整保存上传文件；
+            # 结果增量写入导出CSV和数据库
+            stream = stream_predictions(get_predictor(), iter_fasta(file.stream), output_path=result_filepath)
+            results = []
+            for _, protein_results in save_predictions_stream(result_filename, 'fasta', stream):
+                results.extend(protein_results)
+
+            # 按蛋白质ID和置信度排序
+            results.sort(key=lambda x: (x['protein_id'], -x['confidence']))
 
-            return jsonify({'error': '无法读取预测结果'}), 500
+            return jsonify({
+                'results': results,
+                'filename': result_filename
+            })
 
         except Exception as e:
             print(f"FASTA预测错误：{str(e)}")
@@ -178,6 +443,105 @@ def predict_fasta():
     return jsonify({'error': '不支持的文件类型'}), 400
 
 
+@app.route('/predict/stream', methods=['POST'])
+def predict_fasta_stream():
+    """
+    流式返回FASTA预测结果: 每个蛋白质所在批次完成后立即输出一行
+    默认输出NDJSON(application/x-ndjson)；format=sse 或 Accept: text/event-stream 时输出SSE
+    消息类型: result(单个蛋白质的预测) / done(结束，含结果文件名和数量) / error
+    """
+    if 'file' not in request.files:
+        return jsonify({'error': '没有文件'}), 400
+
+    file = request.files['file']
+    if file.filename == '' or not file:
+        return jsonify({'error': '没有选择文件'}), 400
+
+    if not allowed_file(file.filename):
+        return jsonify({'error': '不支持的文件类型'}), 400
+
+    use_sse = (request.args.get('format') == 'sse'
+               or 'text/event-stream' in request.headers.get('Accept', ''))
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    result_filename = f"{timestamp}_{secure_filename(file.filename)}.csv"
+    result_filepath = os.path.join(app.config['RESULTS_FOLDER'], result_filename)
+
+    def encode(event, payload):
+        data = json.dumps(payload, ensure_ascii=False)
+        if use_sse:
+            return f"event: {event}\ndata: {data}\n\n"
+        return json.dumps(dict(payload, type=event), ensure_ascii=False) + '\n'
+
+    def generate():
+        count = 0
+        try:
+            # 小分桶让第一批结果尽快返回，首个结果的等待时间与文件大小无关
+            stream = stream_predictions(get_predictor(), iter_fasta(file.stream), output_path=result_filepath,
+                                        bucket_size=STREAM_BUCKET_SIZE)
+            for protein_id, protein_results in save_predictions_stream(result_filename, 'fasta', stream):
+                count += 1
+                yield encode('result', {'protein_id': protein_id, 'results': protein_results})
+            yield encode('done', {'filename': result_filename, 'count': count})
+        except Exception as e:
+            print(f"FASTA流式预测错误：{str(e)}")
+            yield encode('error', {'error': f'预测过程错误：{str(e)}'})
+
+    mimetype = 'text/event-stream' if use_sse else 'application/x-ndjson'
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # 关闭nginx缓冲
+    return response
+
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    if 'file' not in request.files:
+        return jsonify({'error': '没有文件'}), 400
+
+    file = request.files['file']
+    if file.filename == '' or not file:
+        return jsonify({'error': '没有选择文件'}), 400
+
+    if not allowed_file(file.filename):
+        return jsonify({'error': '不支持的文件类型'}), 400
+
+    try:
+        job_id = job_manager.submit(file, secure_filename(file.filename))
+        return jsonify({'job_id': job_id, 'status_url': f'/jobs/{job_id}'}), 202
+    except Exception as e:
+        return jsonify({'error': f'提交任务失败：{str(e)}'}), 500
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    status = job_manager.get(job_id)
+    if status is None:
+        return jsonify({'error': '任务不存在'}), 404
+    return jsonify(status)
+
+
+@app.route('/jobs/<job_id>/results', methods=['GET'])
+def get_job_result(job_id):
+    try:
+        status = job_manager.get(job_id)
+        if status is None:
+            return jsonify({'error': '任务不存在'}), 404
+
+        # 任务未完成时返回已写入的部分结果
+        page, page_size = get_pagination()
+        results, total = get_job_results(status['filename'], page, page_size)
+        return jsonify({
+            'status': status['status'],
+            'filename': status['filename'],
+            'total': total,
+            'results': results or []
+        })
+
+    except Exception as e:
+        return jsonify({'error': f'读取结果失败：{str(e)}'}), 500
+
+
 # 添加一个新路由，用于获取指定蛋白质ID的序列，读取预测结果
 @app.route('/protein/<protein_id>', methods=['GET'])
 def get_protein_sequence(protein_id): #  添加参数
@@ -187,23 +551,24 @@ def get_protein_sequence(protein_id): #  添加参数
         if not filename:
             return jsonify({'error': '未提供文件名'}), 400
 
-        file_path = os.path.join(app.config['RESULTS_FOLDER'], filename)
-        if not os.path.exists(file_path):
-            return jsonify({'error': '找不到结果文件'}), 404
+        predictions = get_protein_results(filename, protein_id)
+        if predictions is None:
+            # 未入库的结果文件: 通过旁路索引只读取该蛋白质所在的行
+            file_path = os.path.join(app.config['RESULTS_FOLDER'], secure_filename(filename))
+            if not os.path.exists(file_path):
+                return jsonify({'error': '找不到结果文件'}), 404
+            predictions = result_index_cache.lookup(file_path, protein_id)
 
-        df = pd.read_csv(file_path)
-        protein_data = df[df['protein_id'] == protein_id]
-
-        if protein_data.empty:
+        if not predictions:
             return jsonify({'error': '找不到指定的蛋白质'}), 404
 
         # 获取该蛋白质的序列信息（应该对于同一蛋白质ID，所有行的序列都相同）
-        sequence = protein_data['sequence'].iloc[0]
+        sequence = predictions[0]['sequence']
 
         return jsonify({
             'protein_id': protein_id,
             'sequence': sequence,
-            'predictions': protein_data.to_dict(orient='records')
+            'predictions': predictions
         })
 
     except Exception as e:
@@ -214,24 +579,84 @@ def index():
     return jsonify({'message': '蛋白质功能预测系统 API'})
 
 
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    # 模型尚未加载时缓存也还没有创建
+    return jsonify({
+        'embedding': predictor.embedding_cache.stats() if predictor is not None else None,
+        'result': result_cache.stats() if result_cache is not None else None
+    })
+
+
+@app.route('/health/live', methods=['GET'])
+def liveness():
+    """存活检查: 进程能响应请求即可，不依赖模型"""
+    return jsonify({'status': 'alive', 'uptime_seconds': round(time.time() - STARTED_AT, 1)})
+
+
+@app.route('/health/ready', methods=['GET'])
+def readiness():
+    """就绪检查: 模型加载完成后返回200，否则返回503，并报告加载状态和耗时"""
+    return jsonify(model_state), 200 if model_state['status'] == 'ready' else 503
+
+
+@app.route('/warmup', methods=['POST'])
+def warmup_model():
+    """加载模型并预热；async=1 时在后台进行，立即返回202"""
+    if request.args.get('async', type=int):
+        if model_state['status'] != 'loading':
+            threading.Thread(target=_warmup_in_background, name='model-warmup', daemon=True).start()
+        return jsonify(model_state), 202
+
+    try:
+        warmup()
+        return jsonify(model_state)
+    except Exception as e:
+        return jsonify(dict(model_state, error=f'模型加载失败：{str(e)}')), 500
+
+
+@app.route('/models', methods=['GET'])
+def list_models():
+    """已登记的模型版本、激活版本和当前进程正在使用的版本"""
+    return jsonify({
+        'active': model_registry.active_version(),
+        'serving': model_state['version'],
+        'swap': model_state['swap'],
+        'versions': model_registry.list_versions()
+    })
+
+
+@app.route('/models/<version>/activate', methods=['POST'])
+def activate_model(version):
+    """激活模型版本: 当前进程立即在后台热替换，其他worker由注册目录监视发现变化"""
+    if PREDICTOR_BACKEND != 'eager':
+        return jsonify({'error': '导出产物后端不支持模型热替换，请重新导出后重启服务'}), 400
+    try:
+        model_registry.activate(version)
+    except KeyError:
+        return jsonify({'error': f'模型版本不存在: {version}'}), 404
+
+    if predictor is not None:
+        threading.Thread(target=swap_model, args=(version,), name='model-swap', daemon=True).start()
+    return jsonify({'active': version, 'serving': model_state['version'], 'swap': model_state['swap']}), 202
+
+
+def get_pagination():
+    """读取可选的分页参数 page / page_size，未提供 page_size 时返回全部"""
+    page = request.args.get('page', 1, type=int)
+    page_size = request.args.get('page_size', None, type=int)
+    return page, page_size
+
+
 @app.route('/history', methods=['GET'])
 def get_history():
     try:
-        # 获取所有预测结果文件
-        results = []
-        for filename in os.listdir(app.config['RESULTS_FOLDER']):
-            if filename.endswith('.csv'):
-                file_path = os.path.join(app.config['RESULTS_FOLDER'], filename)
-                file_stat = os.stat(file_path)
-                results.append({
-                    'filename': filename,
-                    'created_time': datetime.fromtimestamp(file_stat.st_mtime).strftime('%Y-%m-%d %H:%M:%S'),
-                    'size': f'{file_stat.st_size / 1024:.1f}KB'
-                })
+        page, page_size = get_pagination()
+        jobs, total = list_jobs(page, page_size)
 
-        # 按时间倒序排序
-        results.sort(key=lambda x: x['created_time'], reverse=True)
-        return jsonify(results)
+        response = jsonify(jobs)
+        response.headers['X-Total-Count'] = str(total)
+        return response
 
     except Exception as e:
         return jsonify({'error': f'获取历史记录失败：{str(e)}'}), 500
@@ -240,11 +665,14 @@ def get_history():
 @app.route('/results/<filename>')
 def get_result(filename):
     try:
-        file_path = os.path.join(app.config['RESULTS_FOLDER'], filename)
-        if os.path.exists(file_path):
-            df = pd.read_csv(file_path)
-            return jsonify(df.to_dict(orient='records'))
-        return jsonify({'error': '找不到结果文件'}), 404
+        page, page_size = get_pagination()
+        results, total = get_job_results(filename, page, page_size)
+        if results is None:
+            return jsonify({'error': '找不到结果文件'}), 404
+
+        response = jsonify(results)
+        response.headers['X-Total-Count'] = str(total)
+        return response
 
     except Exception as e:
         return jsonify({'error': f'读取结果失败：{str(e)}'}), 500
@@ -253,16 +681,22 @@ def get_result(filename):
 @app.route('/results/<filename>', methods=['DELETE'])
 def delete_result(filename):
     try:
-        file_path = os.path.join(app.config['RESULTS_FOLDER'], filename)
-        if not os.path.exists(file_path):
-            return jsonify({'error': '文件不存在'}), 404
-
         # 检查是否为预测结果文件
         if not filename.endswith('.csv'):
             return jsonify({'error': '只能删除预测结果文件'}), 400
 
-        # 删除文件
-        os.remove(file_path)
+        deleted = delete_job(filename)
+
+        # 同时删除导出的CSV，避免下次启动时被重新导入
+        file_path = os.path.join(app.config['RESULTS_FOLDER'], secure_filename(filename))
+        if os.path.exists(file_path):
+            os.remove(file_path)
+            remove_result_index(file_path)
+            result_index_cache.invalidate(file_path)
+            deleted = True
+
+        if not deleted:
+            return jsonify({'error': '文件不存在'}), 404
         return jsonify({'message': '文件已成功删除'}), 200
     except Exception as e:
         return jsonify({'error': f'删除失败：{str(e)}'}), 500
@@ -351,4 +785,7 @@ def predict_protein_sites():
 
 if __name__ == '__main__':
     app.debug = True
+    # 调试模式的重载器在父进程中也会执行这里，只在实际提供服务的子进程中初始化
+    if not app.debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        startup()
     app.run(host='127.0.0.1', port=5000)
\ No newline at end of file
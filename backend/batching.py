@@ -0,0 +1,165 @@
+# backend/batching.py
+import os
+import queue
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+from datetime import datetime
+
+# 当前进程中的调度器(弱引用，不会让已替换的预测器一直留在内存中)
+_live_batchers = weakref.WeakSet()
+
+
+def _restart_after_fork():
+    # gunicorn 预加载模式下调度器在主进程创建，fork 后子进程里没有工作线程，需要重新启动；
+    # 已停止的调度器(热替换后下线的旧版本)不再启动
+    for batcher in list(_live_batchers):
+        if not batcher._stopped:
+            batcher._start()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+class _PendingRequest:
+    """等待合批的单个预测请求"""
+
+    def __init__(self, sequence, threshold):
+        self.sequence = sequence
+        self.threshold = threshold
+        self.length = len(sequence.strip())
+        self.future = Future()
+
+
+class MicroBatcher:
+    """
+    动态微批调度器：把时间窗口内到达的多个 /predict/sequence 请求合并成一个批次，
+    用一次填充后的ESM前向和一次PyG Batch的GNN前向完成预测，再把结果分发回各个调用方。
+
+    Args:
+        predictor: ProteinPredictor 实例
+        max_wait_ms: 第一个请求到达后最多等待多少毫秒来凑批
+        max_batch_size: 每批最多包含的请求数
+        max_residues: 每批最多包含的残基总数(截断模式下按截断后的长度计)
+        max_length: 截断模式下每条序列的最大长度，传给 predictor.predict_proba_batch
+    """
+
+    def __init__(self, predictor, max_wait_ms=10, max_batch_size=16, max_residues=8000, max_length=1000):
+        self.predictor = predictor
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.max_residues = max_residues
+        self.max_length = max_length
+
+        self._start()
+        _live_batchers.add(self)
+
+    def _start(self):
+        # 锁保证"检查是否已停止"和"入队"是原子的，请求不会排在停止标记之后
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._carry = None  # 因超出残基上限而顺延到下一批的请求
+        self._stopped = False
+        self._worker = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, sequence, threshold=0.5):
+        """提交一条序列，返回 Future，结果格式与 ProteinPredictor.predict 相同"""
+        request = _PendingRequest(sequence, threshold)
+        with self._lock:
+            if self._stopped:
+                raise RuntimeError("调度器已停止")
+            self._queue.put(request)
+        return request.future
+
+    def predict(self, sequence, threshold=0.5, timeout=None):
+        """阻塞版本的 submit，可直接替换 predictor.predict"""
+        return self.submit(sequence, threshold).result(timeout=timeout)
+
+    def stop(self):
+        """停止接收新请求，处理完已入队的请求后结束工作线程"""
+        with self._lock:
+            self._stopped = True
+            self._queue.put(None)
+        self._worker.join()
+        self._fail_pending()
+
+    def _fail_pending(self):
+        # 工作线程退出后仍未处理的请求(如工作线程异常退出时)直接失败，调用方不会一直阻塞
+        pending = [self._carry] if self._carry is not None else []
+        self._carry = None
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is not None:
+                pending.append(request)
+        for request in pending:
+            if not request.future.done():
+                request.future.set_exception(RuntimeError("调度器已停止"))
+
+    def _residues(self, request):
+        return self.predictor.residue_count(request.length, self.max_length)
+
+    def _collect_batch(self):
+        """阻塞直到拿到第一个请求，然后在等待窗口内继续收集"""
+        if self._carry is not None:
+            first, self._carry = self._carry, None
+        else:
+            first = self._queue.get()
+            if first is None:
+                return None
+
+        batch = [first]
+        residues = self._residues(first)
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                self._stopped = True
+                break
+            if residues + self._residues(request) > self.max_residues:
+                # 超出残基预算，留到下一批
+                self._carry = request
+                break
+            batch.append(request)
+            residues += self._residues(request)
+
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            if batch is None:
+                break
+            self._run_batch(batch)
+            if self._stopped and self._carry is None and self._queue.empty():
+                break
+
+    def _run_batch(self, batch):
+        try:
+            probs = self.predictor.predict_proba_batch([req.sequence for req in batch], self.max_length)
+        except Exception as e:
+            for req in batch:
+                req.future.set_exception(e)
+            return
+
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        for req, req_probs in zip(batch, probs):
+            try:
+                results = self.predictor.format_predictions(
+                    req.sequence, req_probs, req.threshold, timestamp, f"SEQ_{timestamp}"
+                )
+                req.future.set_result(results)
+            except Exception as e:
+                req.future.set_exception(e)
@@ -0,0 +1,87 @@
+# backend/benchmarks/bench_batching.py
+"""
+对比逐请求预测与微批调度器在并发负载下的吞吐量和 p50/p99 延迟
+
+用法(在 backend 目录下):
+    python -m benchmarks.bench_batching --clients 16 --requests 512
+"""
+import argparse
+import threading
+import time
+
+from batching import MicroBatcher
+from benchmarks.common import random_sequences, latency_summary
+from predict_seq import ProteinPredictor
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='微批调度器基准测试')
+    parser.add_argument('--model', type=str, default='models/best_model.pt', help='模型文件路径')
+    parser.add_argument('--device', type=str, default=None, help='推理设备')
+    parser.add_argument('--clients', type=int, default=16, help='并发客户端数')
+    parser.add_argument('--requests', type=int, default=512, help='请求总数')
+    parser.add_argument('--min_len', type=int, default=50, help='最短序列长度')
+    parser.add_argument('--max_len', type=int, default=600, help='最长序列长度')
+    parser.add_argument('--max_wait_ms', type=int, default=10, help='合批等待窗口(毫秒)')
+    parser.add_argument('--max_batch_size', type=int, default=16, help='每批最大请求数')
+    parser.add_argument('--max_residues', type=int, default=8000, help='每批最大残基数')
+    return parser.parse_args()
+
+
+def run_load(predict_fn, sequences, clients):
+    """用 clients 个线程并发地发出请求，返回每个请求的延迟和总耗时"""
+    latencies = []
+    lock = threading.Lock()
+    cursor = iter(range(len(sequences)))
+
+    def client():
+        while True:
+            with lock:
+                idx = next(cursor, None)
+            if idx is None:
+                return
+            start = time.perf_counter()
+            predict_fn(sequences[idx])
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, time.perf_counter() - start
+
+
+def report(name, summary):
+    print(f"{name:<12} 请求数={summary['requests']:<6} "
+          f"吞吐={summary['throughput']:.1f} req/s  "
+          f"p50={summary['p50_ms']:.1f}ms  p99={summary['p99_ms']:.1f}ms")
+
+
+def main():
+    args = parse_args()
+    predictor = ProteinPredictor(args.model, device=args.device)
+    sequences = random_sequences(args.requests, args.min_len, args.max_len)
+
+    # 预热，避免首次前向的开销计入结果
+    predictor.predict(sequences[0])
+
+    latencies, elapsed = run_load(predictor.predict, sequences, args.clients)
+    report('逐请求', latency_summary(latencies, elapsed))
+
+    batcher = MicroBatcher(
+        predictor,
+        max_wait_ms=args.max_wait_ms,
+        max_batch_size=args.max_batch_size,
+        max_residues=args.max_residues
+    )
+    latencies, elapsed = run_load(batcher.predict, sequences, args.clients)
+    batcher.stop()
+    report('微批调度', latency_summary(latencies, elapsed))
+
+
+if __name__ == "__main__":
+    main()
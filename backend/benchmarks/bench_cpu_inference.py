@@ -0,0 +1,135 @@
+# backend/benchmarks/bench_cpu_inference.py
+"""
+CPU推理: fp32 与 int8 动态量化在不同线程数下的吞吐/延迟，以及量化相对fp32的预测偏差
+每个 (精度, 线程数) 组合在独立子进程中运行(inter-op 线程数每个进程只能设置一次)
+
+用法(在 backend 目录下):
+    python -m benchmarks.bench_cpu_inference --fasta heldout.fasta --limit 500 --threads 1 2 4 8
+"""
+import argparse
+import itertools
+import multiprocessing
+import os
+import tempfile
+
+from benchmarks.common import Timer, latency_summary, write_synthetic_fasta
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='CPU推理(int8量化/线程数)基准测试')
+    parser.add_argument('--fasta', type=str, default=None, help='留出集FASTA，不提供则生成合成序列')
+    parser.add_argument('--model', type=str, default='models/best_model.pt', help='模型文件路径')
+    parser.add_argument('--limit', type=int, default=500, help='最多使用的序列条数')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8], help='测试的CPU线程数')
+    parser.add_argument('--max_tokens', type=int, default=8000, help='每个ESM批次的token上限')
+    parser.add_argument('--latency_samples', type=int, default=50, help='测单条延迟使用的序列数')
+    parser.add_argument('--threshold', type=float, default=0.5, help='预测阈值')
+    return parser.parse_args()
+
+
+def run_case(quantize, threads, fasta_path, model_path, limit, max_tokens, latency_samples):
+    import time
+
+    from predict_fasta import iter_fasta
+    from predict_seq import ProteinPredictor
+
+    predictor = ProteinPredictor(model_path, device='cpu', quantize=quantize,
+                                 num_threads=threads, num_interop_threads=1)
+    with open(fasta_path, 'r') as handle:
+        records = list(itertools.islice(iter_fasta(handle), limit))
+    max_length = predictor.config['max_length']
+
+    # 预热
+    predictor.predict_proba_batch([records[0][1]])
+
+    probs = [None] * len(records)
+    with Timer() as t:
+        for batch_indices in predictor._length_batches(records, max_tokens, max_length):
+            batch_probs = predictor.predict_proba_batch([records[i][1] for i in batch_indices], max_length)
+            for i, row in zip(batch_indices, batch_probs):
+                probs[i] = row.tolist()
+    residues = sum(predictor.residue_count(len(seq), max_length) for _, seq in records)
+
+    latencies = []
+    for _, seq in records[:latency_samples]:
+        start = time.perf_counter()
+        predictor.predict_proba_batch([seq], max_length)
+        latencies.append(time.perf_counter() - start)
+
+    summary = latency_summary(latencies, sum(latencies))
+    return {
+        'records': len(records),
+        'seq_per_s': len(records) / t.elapsed,
+        'residues_per_s': residues / t.elapsed,
+        'p50_ms': summary['p50_ms'],
+        'p99_ms': summary['p99_ms'],
+        'probs': probs,
+    }
+
+
+def compare(reference, probs, threshold):
+    """量化结果相对fp32的偏差: 概率差、逐类别判定一致率、整条标签集合一致率"""
+    max_diff = 0.0
+    total_diff = 0.0
+    decisions = agree = same_sets = 0
+    for ref_row, row in zip(reference, probs):
+        same = True
+        for a, b in zip(ref_row, row):
+            diff = abs(a - b)
+            max_diff = max(max_diff, diff)
+            total_diff += diff
+            decisions += 1
+            if (a > threshold) == (b > threshold):
+                agree += 1
+            else:
+                same = False
+        same_sets += same
+    return {
+        'max_abs_diff': max_diff,
+        'mean_abs_diff': total_diff / decisions if decisions else 0.0,
+        'decision_agreement': agree / decisions if decisions else 1.0,
+        'label_set_agreement': same_sets / len(reference) if reference else 1.0,
+    }
+
+
+def main():
+    args = parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fasta_path = args.fasta
+        if fasta_path is None:
+            fasta_path = os.path.join(tmp, 'synthetic.fasta')
+            write_synthetic_fasta(fasta_path, args.limit)
+            print("未提供留出集，使用合成序列(偏差只反映数值误差，不代表真实准确率变化)")
+
+        ctx = multiprocessing.get_context('spawn')
+        results = {}
+        for threads in args.threads:
+            for quantize in (False, True):
+                name = 'int8' if quantize else 'fp32'
+                try:
+                    with ctx.Pool(1) as pool:
+                        result = pool.apply(run_case, (quantize, threads, fasta_path, args.model, args.limit,
+                                                       args.max_tokens, args.latency_samples))
+                except Exception as e:
+                    print(f"{name} 线程={threads} 失败：{str(e)}")
+                    continue
+                results[(name, threads)] = result
+                print(f"{name:<5} 线程={threads:<3} 吞吐={result['seq_per_s']:>7.1f}条/s "
+                      f"{result['residues_per_s']:>9.0f}残基/s  "
+                      f"单条延迟 p50={result['p50_ms']:.1f}ms p99={result['p99_ms']:.1f}ms")
+
+        # 量化偏差与线程数无关，取任意一组成对结果比较
+        for threads in args.threads:
+            if ('fp32', threads) in results and ('int8', threads) in results:
+                delta = compare(results[('fp32', threads)]['probs'], results[('int8', threads)]['probs'],
+                                args.threshold)
+                print(f"\nint8 相对 fp32 (阈值 {args.threshold}):")
+                print(f"  概率最大偏差={delta['max_abs_diff']:.4f} 平均偏差={delta['mean_abs_diff']:.5f}")
+                print(f"  逐类别判定一致率={delta['decision_agreement']:.4%} "
+                      f"标签集合完全一致率={delta['label_set_agreement']:.4%}")
+                break
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# backend/benchmarks/bench_export.py
+"""
+比较 eager 模型与导出产物(TorchScript / ONNX)的启动耗时、内存占用和单条序列延迟
+每个后端在独立子进程中运行，启动耗时包含 import 和模型加载
+
+用法(在 backend 目录下，先用 export_model.py 导出):
+    python -m benchmarks.bench_export --artifacts models/export models/export_onnx --device cpu
+"""
+import argparse
+import multiprocessing
+
+from benchmarks.common import latency_summary, random_sequences
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='导出模型基准测试')
+    parser.add_argument('--model', type=str, default='models/best_model.pt', help='模型文件路径')
+    parser.add_argument('--artifacts', type=str, nargs='*', default=['models/export'], help='导出目录')
+    parser.add_argument('--device', type=str, default='cpu', help='推理设备')
+    parser.add_argument('--requests', type=int, default=100, help='测延迟的序列条数')
+    parser.add_argument('--max_len', type=int, default=600, help='最长序列长度')
+    return parser.parse_args()
+
+
+def run_backend(backend, path, device, sequences):
+    import time
+
+    from benchmarks.common import peak_rss_mb
+
+    start = time.perf_counter()
+    if backend == 'eager':
+        from predict_seq import ProteinPredictor
+        predictor = ProteinPredictor(path, device=device)
+    else:
+        from predict_artifact import ArtifactPredictor
+        predictor = ArtifactPredictor(path, device=device)
+    startup = time.perf_counter() - start
+    startup_rss = peak_rss_mb()
+
+    # 第一次前向单独计时(TorchScript 会在前几次调用时做图优化)
+    start = time.perf_counter()
+    predictor.predict_proba_batch([sequences[0]])
+    first_call = time.perf_counter() - start
+
+    latencies = []
+    begin = time.perf_counter()
+    for seq in sequences:
+        start = time.perf_counter()
+        predictor.predict_proba_batch([seq])
+        latencies.append(time.perf_counter() - start)
+    elapsed = time.perf_counter() - begin
+
+    return {
+        'startup_s': startup,
+        'startup_rss_mb': startup_rss,
+        'peak_rss_mb': peak_rss_mb(),
+        'first_call_ms': first_call * 1000,
+        'latency': latency_summary(latencies, elapsed),
+    }
+
+
+def main():
+    args = parse_args()
+    sequences = random_sequences(args.requests, 50, args.max_len)
+
+    cases = [('eager', args.model)] + [('artifact', path) for path in args.artifacts]
+    ctx = multiprocessing.get_context('spawn')
+    for backend, path in cases:
+        try:
+            with ctx.Pool(1) as pool:
+                result = pool.apply(run_backend, (backend, path, args.device, sequences))
+        except Exception as e:
+            print(f"{backend} ({path}) 失败：{str(e)}")
+            continue
+        latency = result['latency']
+        print(f"{backend:<8} {path}")
+        print(f"  启动={result['startup_s']:.2f}s 启动后RSS={result['startup_rss_mb']:.0f}MB "
+              f"峰值RSS={result['peak_rss_mb']:.0f}MB 首次调用={result['first_call_ms']:.0f}ms")
+        print(f"  单条延迟 p50={latency['p50_ms']:.1f}ms p99={latency['p99_ms']:.1f}ms "
+              f"吞吐={latency['throughput']:.1f}条/s")
+
+
+if __name__ == "__main__":
+    main()
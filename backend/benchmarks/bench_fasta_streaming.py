@@ -0,0 +1,81 @@
+# backend/benchmarks/bench_fasta_streaming.py
+"""
+在数GB的合成FASTA上比较整文件加载与流式解析/预测的耗时和峰值内存
+每种模式在独立子进程中运行，以便分别统计峰值RSS
+
+用法(在 backend 目录下):
+    python -m benchmarks.bench_fasta_streaming --size_gb 2 --modes stream bio
+    python -m benchmarks.bench_fasta_streaming --fasta big.fasta --modes predict --limit 20000
+"""
+import argparse
+import itertools
+import multiprocessing
+import os
+import tempfile
+
+from benchmarks.common import Timer, peak_rss_mb, write_synthetic_fasta
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='流式FASTA处理基准测试')
+    parser.add_argument('--fasta', type=str, default=None, help='已有的FASTA文件，不提供则生成合成文件')
+    parser.add_argument('--size_gb', type=float, default=2.0, help='合成FASTA的大致大小(GB)')
+    parser.add_argument('--modes', type=str, nargs='+', default=['stream', 'bio'],
+                        choices=['stream', 'bio', 'predict'],
+                        help='stream: iter_fasta 流式解析; bio: load_fasta 整文件加载; predict: 流式解析+预测')
+    parser.add_argument('--model', type=str, default='models/best_model.pt', help='模型文件路径')
+    parser.add_argument('--limit', type=int, default=None, help='predict 模式下最多预测的记录数')
+    return parser.parse_args()
+
+
+def run_mode(mode, fasta_path, model_path, limit, queue):
+    from predict_fasta import iter_fasta, load_fasta, stream_predictions
+
+    records = 0
+    with Timer() as t:
+        if mode == 'bio':
+            records = len(load_fasta(fasta_path))
+        elif mode == 'stream':
+            with open(fasta_path, 'r') as handle:
+                for _ in iter_fasta(handle):
+                    records += 1
+        else:
+            from predict_seq import ProteinPredictor
+            predictor = ProteinPredictor(model_path)
+            with open(fasta_path, 'r') as handle, tempfile.TemporaryDirectory() as tmp:
+                stream = itertools.islice(iter_fasta(handle), limit)
+                for _ in stream_predictions(predictor, stream, os.path.join(tmp, 'out.csv')):
+                    records += 1
+    queue.put((mode, records, t.elapsed, peak_rss_mb()))
+
+
+def main():
+    args = parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fasta_path = args.fasta
+        if fasta_path is None:
+            fasta_path = os.path.join(tmp, 'synthetic.fasta')
+            # 平均每条约 (50+800)/2 个残基，加上标题和换行
+            count = int(args.size_gb * 1024 ** 3 / 450)
+            print(f"生成合成FASTA: {count} 条序列...")
+            write_synthetic_fasta(fasta_path, count)
+        size_mb = os.path.getsize(fasta_path) / 1024 ** 2
+        print(f"文件大小: {size_mb:.0f}MB")
+
+        ctx = multiprocessing.get_context('spawn')
+        queue = ctx.Queue()
+        for mode in args.modes:
+            proc = ctx.Process(target=run_mode, args=(mode, fasta_path, args.model, args.limit, queue))
+            proc.start()
+            proc.join()
+            if proc.exitcode != 0:
+                print(f"{mode:<8} 失败(退出码 {proc.exitcode})")
+                continue
+            mode, records, elapsed, rss = queue.get()
+            print(f"{mode:<8} 记录数={records:<10} 耗时={elapsed:.1f}s "
+                  f"吞吐={size_mb / elapsed:.1f}MB/s 峰值RSS={rss:.0f}MB")
+
+
+if __name__ == "__main__":
+    main()
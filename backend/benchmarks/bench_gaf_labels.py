@@ -0,0 +1,97 @@
+# backend/benchmarks/bench_gaf_labels.py
+"""
+GAF标签构建耗时: 原来的 iterrows 逐行构建 vs 向量化的稀疏CSR标签矩阵
+合成的GAF数据框默认1000万行；逐行版本太慢，只在前 --legacy_rows 行上运行并与向量化结果核对
+
+用法(在 backend 目录下):
+    python -m benchmarks.bench_gaf_labels --rows 10000000 --legacy_rows 200000
+"""
+import argparse
+import time
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from utils.gaf_parser import build_go_label_matrix, filter_annotations
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='GAF标签构建基准测试')
+    parser.add_argument('--rows', type=int, default=10_000_000, help='合成GAF行数')
+    parser.add_argument('--proteins', type=int, default=200_000, help='蛋白质数')
+    parser.add_argument('--terms', type=int, default=30_000, help='GO术语数')
+    parser.add_argument('--legacy_rows', type=int, default=200_000, help='逐行版本使用的行数(0表示不运行)')
+    parser.add_argument('--min_samples', type=int, default=10, help='每个GO术语的最小样本数')
+    parser.add_argument('--max_samples', type=int, default=1000, help='每个GO术语的最大样本数')
+    parser.add_argument('--max_terms', type=int, default=1000, help='最大GO术语数量')
+    return parser.parse_args()
+
+
+def synthetic_gaf(rows, proteins, terms, seed=0):
+    """与 parse_goa_gaf 返回的列和类型一致；GO术语频率近似长尾分布"""
+    rng = np.random.default_rng(seed)
+    protein_names = np.array([f'UniProtKB:P{i:06d}' for i in range(proteins)], dtype=object)
+    term_names = np.array([f'GO:{i:07d}' for i in range(terms)], dtype=object)
+    term_codes = np.minimum(rng.zipf(1.3, rows) - 1, terms - 1)
+    return pd.DataFrame({
+        'DB_Object_ID': pd.array(protein_names[rng.integers(0, proteins, rows)], dtype='string'),
+        'GO_ID': pd.array(term_names[rng.permutation(terms)[term_codes]], dtype='string'),
+        'Evidence_Code': pd.Categorical.from_codes(
+            rng.integers(0, 6, rows), categories=['IDA', 'IPI', 'IMP', 'TAS', 'IEA', 'NAS']),
+        'Aspect': pd.Categorical.from_codes(rng.choice(3, rows, p=[0.5, 0.3, 0.2]), categories=['F', 'P', 'C']),
+        'Taxon': pd.array(np.where(rng.random(rows) < 0.7, 'taxon:9606', 'taxon:10090'), dtype='string'),
+    })
+
+
+def legacy_label_map(gaf_df, aspect='F'):
+    """原实现中耗时的部分: iterrows 构建 label_map 并在嵌套循环中统计术语频率"""
+    filtered = filter_annotations(gaf_df, aspect).copy()
+    filtered.loc[:, 'UniProt_ID'] = filtered['DB_Object_ID'].str.split(':').str[-1]
+    label_map = defaultdict(set)
+    for _, row in filtered.iterrows():
+        label_map[row['UniProt_ID']].add(row['GO_ID'])
+    go_counts = defaultdict(int)
+    for terms in label_map.values():
+        for go in terms:
+            go_counts[go] += 1
+    return label_map, go_counts
+
+
+def main():
+    args = parse_args()
+    start = time.perf_counter()
+    gaf_df = synthetic_gaf(args.rows, args.proteins, args.terms)
+    print(f"生成 {args.rows} 行合成GAF: {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    labels, protein_ids, go_to_idx, _ = build_go_label_matrix(
+        gaf_df, min_samples=args.min_samples, max_samples=args.max_samples, max_terms=args.max_terms)
+    elapsed = time.perf_counter() - start
+    print(f"向量化: {elapsed:.2f}s ({args.rows / elapsed:,.0f} 行/秒) -> "
+          f"{labels.shape[0]} 个蛋白质 × {labels.shape[1]} 个术语, 非零 {labels.nnz}, "
+          f"CSR {(labels.data.nbytes + labels.indices.nbytes + labels.indptr.nbytes) / 1024 ** 2:.1f}MB")
+
+    if args.legacy_rows:
+        subset = gaf_df.iloc[:args.legacy_rows]
+        start = time.perf_counter()
+        label_map, _ = legacy_label_map(subset)
+        legacy_elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        sub_labels, sub_ids, sub_go_to_idx, _ = build_go_label_matrix(
+            subset, min_samples=args.min_samples, max_samples=args.max_samples, max_terms=args.max_terms)
+        vector_elapsed = time.perf_counter() - start
+
+        # 核对: 每个保留的蛋白质的术语集合与逐行版本一致
+        terms = np.array(list(sub_go_to_idx), dtype=object)
+        selected = set(sub_go_to_idx)
+        expected = [pid for pid, pid_terms in label_map.items() if pid_terms & selected]
+        match = sub_ids == expected and all(
+            set(terms[sub_labels[i].indices]) == label_map[pid] & selected for i, pid in enumerate(sub_ids))
+        print(f"前 {args.legacy_rows} 行: iterrows {legacy_elapsed:.2f}s "
+              f"(折算全部 {legacy_elapsed * args.rows / args.legacy_rows / 60:.1f} 分钟) vs "
+              f"向量化 {vector_elapsed:.2f}s, 结果{'一致' if match else '不一致'}")
+
+
+if __name__ == "__main__":
+    main()
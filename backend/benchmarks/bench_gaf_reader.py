@@ -0,0 +1,77 @@
+# backend/benchmarks/bench_gaf_reader.py
+"""
+GAF读取的耗时和峰值内存: 整个文件读入后再过滤 vs 分块读取并逐块过滤 vs 加载列式缓存
+每种方式在独立的子进程中运行，峰值内存互不影响
+
+用法(在 backend 目录下):
+    python -m benchmarks.bench_gaf_reader --rows 5000000
+    python -m benchmarks.bench_gaf_reader --gaf goa_uniprot_all.gaf.gz   # 使用真实文件
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='GAF分块读取与列式缓存基准测试')
+    parser.add_argument('--gaf', type=str, default=None, help='GAF文件路径，不指定时生成合成文件')
+    parser.add_argument('--rows', type=int, default=5_000_000, help='合成GAF行数')
+    parser.add_argument('--chunksize', type=int, default=1_000_000, help='分块读取的行数')
+    parser.add_argument('--aspect', type=str, default='F', help='GO方面')
+    return parser.parse_args()
+
+
+def write_synthetic_gaf(path, rows):
+    from benchmarks.bench_gaf_labels import synthetic_gaf
+    from utils.gaf_parser import GAF_COLUMNS
+
+    synthetic_gaf(rows, max(rows // 50, 1000), 30_000).reindex(columns=GAF_COLUMNS).to_csv(
+        path, sep='\t', header=False, index=False)
+
+
+def run_mode(mode, path, chunksize, aspect, cache_dir):
+    from benchmarks.common import peak_rss_mb
+    from utils.gaf_parser import filter_annotations, parse_goa_gaf, read_filtered_gaf
+
+    start = time.perf_counter()
+    if mode == 'full':
+        filtered = filter_annotations(parse_goa_gaf(path), aspect)
+    else:
+        filtered = read_filtered_gaf(path, aspect, chunksize=chunksize, cache_dir=cache_dir)
+    return {
+        'seconds': time.perf_counter() - start,
+        'rows': len(filtered),
+        'peak_mb': peak_rss_mb(),
+    }
+
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix='bench_gaf_reader_')
+    try:
+        path = args.gaf
+        if path is None:
+            path = os.path.join(workdir, 'synthetic.gaf')
+            start = time.perf_counter()
+            write_synthetic_gaf(path, args.rows)
+            print(f"生成 {args.rows} 行合成GAF ({os.path.getsize(path) / 1024 ** 2:.0f}MB): "
+                  f"{time.perf_counter() - start:.1f}s")
+
+        cache_dir = os.path.join(workdir, 'cache')
+        modes = [('整体读取后过滤', 'full', None), ('分块读取并过滤', 'chunked', None),
+                 ('分块读取并写缓存', 'chunked', cache_dir), ('加载列式缓存', 'chunked', cache_dir)]
+        ctx = multiprocessing.get_context('spawn')
+        for name, mode, mode_cache in modes:
+            with ctx.Pool(1) as pool:
+                result = pool.apply(run_mode, (mode, path, args.chunksize, args.aspect, mode_cache))
+            print(f"{name:<12} 耗时={result['seconds']:7.2f}s 保留={result['rows']:>9} 行 "
+                  f"进程峰值内存={result['peak_mb']:7.0f}MB")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# backend/benchmarks/bench_go_slim.py
+"""
+GO slim标签转换耗时: 原来的 蛋白质 × 术语 × 类别 嵌套循环 vs 预编译索引 + 一次稀疏矩阵乘法
+默认 50万蛋白质 × 1000个术语；嵌套循环只在前 --legacy_proteins 个蛋白质上运行并折算，同时核对结果
+
+用法(在 backend 目录下):
+    python -m benchmarks.bench_go_slim --proteins 500000 --terms 1000
+"""
+import argparse
+import time
+
+import numpy as np
+from scipy.sparse import random as sparse_random
+
+from data.go_slim import GO_SLIM_MAPPING, GO_TO_SLIM, compile_slim_index, convert_to_slim_labels, stack_labels
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='GO slim标签转换基准测试')
+    parser.add_argument('--proteins', type=int, default=500_000, help='蛋白质数')
+    parser.add_argument('--terms', type=int, default=1000, help='GO术语数(标签向量长度)')
+    parser.add_argument('--density', type=float, default=0.005, help='标签矩阵中1的比例')
+    parser.add_argument('--legacy_proteins', type=int, default=2000, help='嵌套循环版本使用的蛋白质数(0表示不运行)')
+    return parser.parse_args()
+
+
+def synthetic_labels(proteins, terms, density, seed=0):
+    """go_dict 包含全部GO slim术语和随机补足的其他术语，标签为随机稀疏0/1矩阵"""
+    rng = np.random.default_rng(seed)
+    slim_terms = list(GO_TO_SLIM)[:terms]
+    other_terms = [f'GO:9{i:06d}' for i in range(terms - len(slim_terms))]
+    go_terms = slim_terms + other_terms
+    rng.shuffle(go_terms)
+    go_dict = {term: i for i, term in enumerate(go_terms)}
+    labels = sparse_random(proteins, terms, density=density, format='csr', dtype=np.float32, random_state=seed)
+    labels.data[:] = 1.0
+    protein_ids = [f'P{i:07d}' for i in range(proteins)]
+    return labels, protein_ids, go_dict
+
+
+def legacy_convert(labels, protein_ids, go_dict):
+    """原 _filter_by_go_slim 的转换部分"""
+    new_labels = {}
+    for pid in protein_ids:
+        orig_label = labels[pid]
+        slim_label = [0] * len(GO_SLIM_MAPPING)
+        converted = False
+        for term, idx in go_dict.items():
+            if term in GO_TO_SLIM and idx < len(orig_label):
+                if orig_label[idx] == 1:
+                    slim_idx = list(GO_SLIM_MAPPING.keys()).index(GO_TO_SLIM[term])
+                    slim_label[slim_idx] = 1
+                    converted = True
+        if converted:
+            new_labels[pid] = slim_label
+    return new_labels
+
+
+def main():
+    args = parse_args()
+    label_matrix, protein_ids, go_dict = synthetic_labels(args.proteins, args.terms, args.density)
+
+    start = time.perf_counter()
+    slim_index = compile_slim_index(go_dict, label_matrix.shape[1])
+    slim_labels, converted = convert_to_slim_labels(label_matrix, slim_index)
+    elapsed = time.perf_counter() - start
+    print(f"稀疏矩阵转换: {args.proteins} × {args.terms} 用时 {elapsed:.3f}s, "
+          f"保留 {int(converted.sum())} 个蛋白质")
+
+    # 数据集的标签通常是 {protein_id: 稠密向量}，另外统计堆叠为稀疏矩阵的开销
+    subset = min(args.proteins, 100_000)
+    dense = label_matrix[:subset].toarray()
+    label_dict = {pid: dense[i] for i, pid in enumerate(protein_ids[:subset])}
+    start = time.perf_counter()
+    stack_labels(label_dict, protein_ids[:subset])
+    stack_elapsed = time.perf_counter() - start
+    print(f"字典标签堆叠为CSR: {subset} 个蛋白质 {stack_elapsed:.2f}s "
+          f"(折算全部 {stack_elapsed * args.proteins / subset:.1f}s)")
+
+    if args.legacy_proteins:
+        count = min(args.legacy_proteins, args.proteins)
+        start = time.perf_counter()
+        expected = legacy_convert(label_dict, protein_ids[:count], go_dict)
+        legacy_elapsed = time.perf_counter() - start
+        got = {protein_ids[row]: slim_labels[row].astype(int).tolist()
+               for row in np.flatnonzero(converted[:count])}
+        print(f"嵌套循环: {count} 个蛋白质 {legacy_elapsed:.2f}s "
+              f"(折算全部 {legacy_elapsed * args.proteins / count / 60:.1f} 分钟), "
+              f"结果{'一致' if got == expected else '不一致'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# backend/benchmarks/bench_graph_builders.py
+"""
+比较不同残基图构建方式的建图耗时、边数以及GNN推理耗时
+ESM嵌入/接触图只计算一次，GNN使用随机初始化的权重(只关心耗时)
+
+用法(在 backend 目录下):
+    python -m benchmarks.bench_graph_builders --sequences 256 --batch_size 32
+"""
+import argparse
+
+import torch
+
+from benchmarks.common import Timer, random_sequences
+from models.multi_label_gnn import MultiLabelGNN
+from predict_seq import ProteinPredictor
+from utils.graph_builders import CachedGraphBuilder, create_graph_builder
+
+STRATEGIES = [
+    {'type': 'chain'},
+    {'type': 'window', 'k': 3},
+    {'type': 'window', 'k': 8},
+    {'type': 'knn', 'k': 10, 'source': 'embedding'},
+    {'type': 'knn', 'k': 10, 'source': 'contact'},
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='残基图构建方式基准测试')
+    parser.add_argument('--model', type=str, default='models/best_model.pt', help='模型文件路径')
+    parser.add_argument('--device', type=str, default=None, help='推理设备')
+    parser.add_argument('--sequences', type=int, default=256, help='序列数')
+    parser.add_argument('--batch_size', type=int, default=32, help='批大小')
+    parser.add_argument('--max_len', type=int, default=800, help='最长序列长度')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    predictor = ProteinPredictor(args.model, device=args.device)
+    sequences = random_sequences(args.sequences, 50, args.max_len)
+    batches = [sequences[i:i + args.batch_size] for i in range(0, len(sequences), args.batch_size)]
+
+    # 预先计算ESM特征和接触图，不计入建图耗时
+    features = []
+    for batch in batches:
+        features.append((batch, predictor.embed_sequences(batch), predictor.predict_contacts(batch)))
+
+    gnn = MultiLabelGNN(
+        input_dim=predictor.config['input_dim'],
+        hidden_dim=predictor.config['hidden_dim'],
+        output_dim=predictor.config['output_dim']
+    ).to(predictor.device).eval()
+
+    for strategy in STRATEGIES:
+        builder = CachedGraphBuilder(create_graph_builder(strategy))
+        edge_counts = 0
+        build_time = 0.0
+        infer_time = 0.0
+        for batch, embeddings, contacts in features:
+            with Timer() as t:
+                edge_index = builder.build(batch, embeddings, lambda idx: [contacts[i] for i in idx])
+            build_time += t.elapsed
+            edge_counts += edge_index.size(1)
+
+            data = predictor.build_batch(batch, embeddings)
+            data.edge_index = edge_index
+            data = data.to(predictor.device)
+            with torch.no_grad(), Timer() as t:
+                gnn(data)
+                if predictor.device.type == 'cuda':
+                    torch.cuda.synchronize()
+            infer_time += t.elapsed
+
+        # 再跑一遍，统计按序列哈希缓存后的建图耗时
+        with Timer() as t:
+            for batch, embeddings, contacts in features:
+                builder.build(batch, embeddings, lambda idx: [contacts[i] for i in idx])
+        cached_time = t.elapsed
+
+        print(f"{builder.name:<24} 边数/图={edge_counts / len(sequences):>8.0f}  "
+              f"建图={build_time / len(sequences) * 1000:.3f}ms/图  "
+              f"缓存后={cached_time / len(sequences) * 1000:.3f}ms/图  "
+              f"GNN推理={infer_time / len(sequences) * 1000:.3f}ms/图")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# backend/benchmarks/bench_long_sequences.py
+"""
+长序列嵌入的耗时与峰值内存随序列长度的变化(最长到titin的约35k残基)
+对比滑动窗口分段嵌入与整条序列一次ESM前向(后者只测到 --full_max 为止，避免OOM)
+
+用法(在 backend 目录下):
+    python -m benchmarks.bench_long_sequences --lengths 1000 4000 8000 16000 35000
+"""
+import argparse
+import random
+
+import torch
+
+from benchmarks.common import Timer, peak_rss_mb, random_sequence
+from predict_seq import ProteinPredictor
+from utils.sliding_window import embed_windowed, window_spans
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='长序列滑动窗口嵌入基准测试')
+    parser.add_argument('--model', type=str, default='models/best_model.pt', help='模型文件路径')
+    parser.add_argument('--device', type=str, default=None, help='推理设备')
+    parser.add_argument('--lengths', type=int, nargs='+', default=[1000, 2000, 4000, 8000, 16000, 35000],
+                        help='测试的序列长度')
+    parser.add_argument('--window_overlap', type=int, default=None, help='窗口重叠长度(默认取模型配置)')
+    parser.add_argument('--windows_per_batch', type=int, default=None, help='每次前向的窗口数(默认取模型配置)')
+    parser.add_argument('--full_max', type=int, default=4000, help='整条前向测试的最大长度')
+    return parser.parse_args()
+
+
+def _reset_peak(device):
+    if device.type == 'cuda':
+        torch.cuda.synchronize()
+        torch.cuda.reset_peak_memory_stats()
+
+
+def _peak_mb(device):
+    """GPU上报告显存峰值，CPU上报告进程峰值RSS(只增不减，仅供参考)"""
+    if device.type == 'cuda':
+        torch.cuda.synchronize()
+        return torch.cuda.max_memory_allocated() / (1024 * 1024)
+    return peak_rss_mb()
+
+
+def main():
+    args = parse_args()
+    predictor = ProteinPredictor(args.model, device=args.device)
+    overlap = args.window_overlap if args.window_overlap is not None else predictor.window_overlap
+    per_batch = args.windows_per_batch or predictor.windows_per_batch
+    window = predictor.window_size
+    device = predictor.device
+    rng = random.Random(0)
+
+    # 预热
+    predictor._esm_forward([random_sequence(window, rng)])
+
+    print(f"窗口={window} 重叠={overlap} 每批窗口数={per_batch} 设备={device}")
+    for length in args.lengths:
+        sequence = random_sequence(length, rng)
+
+        _reset_peak(device)
+        with Timer() as t:
+            emb = embed_windowed(predictor._esm_forward, sequence, window, overlap, per_batch)
+        line = (f"长度={length:>6}  窗口数={len(window_spans(length, window, overlap)):>3}  "
+                f"分段: {t.elapsed * 1000:>9.1f}ms  峰值={_peak_mb(device):>8.1f}MB")
+
+        if length <= args.full_max:
+            _reset_peak(device)
+            with Timer() as t:
+                full = predictor._esm_forward([sequence])[0]
+            similarity = torch.nn.functional.cosine_similarity(emb, full, dim=-1).mean().item()
+            line += f"  |  整条: {t.elapsed * 1000:>9.1f}ms  峰值={_peak_mb(device):>8.1f}MB  余弦相似度={similarity:.4f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# backend/benchmarks/bench_predict_many.py
+"""
+在合成FASTA(默认1k与10k条序列)上比较逐条 predict 与按长度分桶的 predict_many 吞吐量
+
+用法(在 backend 目录下):
+    python -m benchmarks.bench_predict_many --sizes 1000 10000 --max_tokens 16000
+"""
+import argparse
+import os
+import tempfile
+
+from Bio import SeqIO
+
+from benchmarks.common import Timer, write_synthetic_fasta
+from predict_seq import ProteinPredictor
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='predict_many 吞吐量基准测试')
+    parser.add_argument('--model', type=str, default='models/best_model.pt', help='模型文件路径')
+    parser.add_argument('--device', type=str, default=None, help='推理设备')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000], help='合成FASTA的序列条数')
+    parser.add_argument('--max_tokens', type=int, default=16000, help='每个ESM批次的token上限')
+    parser.add_argument('--skip_baseline', action='store_true', help='跳过逐条预测的基线')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    predictor = ProteinPredictor(args.model, device=args.device)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            fasta_path = os.path.join(tmp, f'synthetic_{size}.fasta')
+            residues = write_synthetic_fasta(fasta_path, size)
+            records = [(rec.id, str(rec.seq)) for rec in SeqIO.parse(fasta_path, 'fasta')]
+            print(f"\n{size} 条序列, 共 {residues} 个残基")
+
+            if not args.skip_baseline:
+                with Timer() as t:
+                    for _, seq in records:
+                        predictor.predict(seq)
+                print(f"逐条 predict:   {size / t.elapsed:.1f} seq/s, {residues / t.elapsed:.0f} 残基/s")
+
+            with Timer() as t:
+                for _ in predictor.predict_many(records, max_tokens=args.max_tokens):
+                    pass
+            print(f"predict_many:   {size / t.elapsed:.1f} seq/s, {residues / t.elapsed:.0f} 残基/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# backend/benchmarks/bench_shared_weights.py
+"""
+多worker部署的内存占用: 每个worker各自加载模型 vs 主进程加载后fork(写时复制) vs 权重移入共享内存后fork
+所有worker完成若干次预测后同时统计 RSS/PSS/私有内存(仅Linux)
+
+用法(在 backend 目录下):
+    python -m benchmarks.bench_shared_weights --workers 4 --modes private fork shared
+"""
+import argparse
+import multiprocessing
+
+from benchmarks.common import random_sequences
+from utils.shared_memory import freeze_gc, memory_usage_mb
+
+_predictor = None  # fork 模式下由子进程继承
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='多worker共享模型权重的内存基准测试')
+    parser.add_argument('--model', type=str, default='models/best_model.pt', help='模型文件路径')
+    parser.add_argument('--workers', type=int, default=4, help='worker进程数')
+    parser.add_argument('--modes', type=str, nargs='+', default=['private', 'fork', 'shared'],
+                        choices=['private', 'fork', 'shared'],
+                        help='private: 各自加载; fork: 主进程加载后fork; shared: 共享内存权重后fork')
+    parser.add_argument('--requests', type=int, default=8, help='每个worker预测的序列数')
+    return parser.parse_args()
+
+
+def worker(mode, model_path, sequences, barrier, queue):
+    import torch
+
+    torch.set_num_threads(1)
+    if mode == 'private':
+        from predict_seq import ProteinPredictor
+        predictor = ProteinPredictor(model_path, device='cpu')
+    else:
+        predictor = _predictor
+
+    for seq in sequences:
+        predictor.predict_proba_batch([seq])
+
+    # 所有worker都存活时统计，PSS才能反映共享情况
+    barrier.wait()
+    queue.put(memory_usage_mb())
+    barrier.wait()
+
+
+def run_mode(mode, args, sequences):
+    global _predictor
+
+    if mode == 'private':
+        ctx = multiprocessing.get_context('spawn')
+    else:
+        from predict_seq import ProteinPredictor
+        ctx = multiprocessing.get_context('fork')
+        _predictor = ProteinPredictor(args.model, device='cpu')
+        if mode == 'shared':
+            _predictor.share_memory()
+            freeze_gc()
+
+    barrier = ctx.Barrier(args.workers + 1)
+    queue = ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(mode, args.model, sequences, barrier, queue))
+             for _ in range(args.workers)]
+    for proc in procs:
+        proc.start()
+
+    barrier.wait()
+    usages = [queue.get() for _ in procs]
+    parent = memory_usage_mb()
+    barrier.wait()
+    for proc in procs:
+        proc.join()
+    _predictor = None
+    return parent, usages
+
+
+def main():
+    args = parse_args()
+    sequences = random_sequences(args.requests, 50, 600)
+
+    for mode in args.modes:
+        parent, usages = run_mode(mode, args, sequences)
+        total_pss = parent['pss'] + sum(u['pss'] for u in usages)
+        avg = {key: sum(u[key] for u in usages) / len(usages) for key in ('rss', 'pss', 'uss', 'shared')}
+        print(f"{mode:<8} 每个worker平均: RSS={avg['rss']:.0f}MB PSS={avg['pss']:.0f}MB "
+              f"私有={avg['uss']:.0f}MB 共享={avg['shared']:.0f}MB | "
+              f"主进程RSS={parent['rss']:.0f}MB 总PSS={total_pss:.0f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# backend/benchmarks/bench_startup.py
+"""
+应用启动耗时: import app、startup() 到第一个健康检查/历史记录请求可用的时间，以及 /warmup 加载模型的耗时
+在独立子进程中运行，保证每次都是冷启动
+
+用法(在 backend 目录下):
+    python -m benchmarks.bench_startup
+"""
+import argparse
+import multiprocessing
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='应用启动耗时基准测试')
+    parser.add_argument('--skip_warmup', action='store_true', help='不测试模型加载和预热')
+    return parser.parse_args()
+
+
+def run_startup(skip_warmup):
+    import sys
+    import time
+
+    start = time.perf_counter()
+    import app
+    imported = time.perf_counter() - start
+    app.startup()
+    started = time.perf_counter() - start
+
+    client = app.app.test_client()
+    live = client.get('/health/live')
+    history = client.get('/history?page_size=10')
+    first_request = time.perf_counter() - start
+    heavy = [name for name in ('torch', 'torch_geometric', 'esm', 'pandas') if name in sys.modules]
+
+    result = {
+        'import_ms': imported * 1000,
+        'startup_ms': (started - imported) * 1000,
+        'first_request_ms': first_request * 1000,
+        'live_status': live.status_code,
+        'history_status': history.status_code,
+        'ready_status_before': client.get('/health/ready').status_code,
+        'heavy_modules': heavy,
+    }
+    if not skip_warmup:
+        start = time.perf_counter()
+        response = client.post('/warmup')
+        result['warmup_s'] = time.perf_counter() - start
+        result['model_state'] = response.get_json()
+    return result
+
+
+def main():
+    args = parse_args()
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(1) as pool:
+        result = pool.apply(run_startup, (args.skip_warmup,))
+
+    print(f"import app: {result['import_ms']:.0f}ms  startup(): {result['startup_ms']:.0f}ms  "
+          f"首个请求完成: {result['first_request_ms']:.0f}ms "
+          f"(live={result['live_status']} history={result['history_status']} "
+          f"ready={result['ready_status_before']})")
+    print(f"启动时已导入的重量级模块: {', '.join(result['heavy_modules']) or '无'}")
+    if 'warmup_s' in result:
+        state = result['model_state']
+        print(f"/warmup 总耗时: {result['warmup_s']:.2f}s "
+              f"(加载 {state['load_seconds']}s, 预热 {state['warmup_seconds']}s, 状态 {state['status']})")
+
+
+if __name__ == "__main__":
+    main()
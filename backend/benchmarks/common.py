@@ -0,0 +1,68 @@
+# backend/benchmarks/common.py
+"""基准测试共用的小工具，在 backend 目录下以 python -m benchmarks.xxx 运行"""
+import random
+import time
+
+AMINO_ACIDS = 'ACDEFGHIKLMNPQRSTVWY'
+
+
+def random_sequence(length, rng=random):
+    return ''.join(rng.choices(AMINO_ACIDS, k=length))
+
+
+def random_sequences(count, min_len=50, max_len=800, seed=0):
+    rng = random.Random(seed)
+    return [random_sequence(rng.randint(min_len, max_len), rng) for _ in range(count)]
+
+
+def write_synthetic_fasta(path, count, min_len=50, max_len=800, seed=0, line_width=60):
+    """写出一个合成FASTA文件，返回写入的残基总数"""
+    rng = random.Random(seed)
+    total = 0
+    with open(path, 'w') as f:
+        for i in range(count):
+            seq = random_sequence(rng.randint(min_len, max_len), rng)
+            total += len(seq)
+            f.write(f'>SYN_{i:08d}\n')
+            for start in range(0, len(seq), line_width):
+                f.write(seq[start:start + line_width] + '\n')
+    return total
+
+
+def peak_rss_mb():
+    """当前进程的峰值常驻内存(MB)，仅支持类Unix系统"""
+    import resource
+    import sys
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为KB，macOS 为字节
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def percentile(values, q):
+    """简单的线性插值百分位数，避免依赖numpy"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    pos = (len(values) - 1) * q / 100.0
+    lo = int(pos)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (pos - lo)
+
+
+def latency_summary(latencies, elapsed):
+    """latencies 单位为秒，返回吞吐与 p50/p99(毫秒)"""
+    return {
+        'requests': len(latencies),
+        'throughput': len(latencies) / elapsed if elapsed > 0 else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+    }
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
@@ -0,0 +1,169 @@
+import numpy as np
+
+# GO terms到功能大类(GO slim)的映射，类别顺序即模型输出维度的顺序
+GO_SLIM_MAPPING = {
+    'protein_binding': [  # 蛋白质结合相关
+        'GO:0042803',  # protein homodimerization activity
+        'GO:0019901',  # protein kinase binding
+        'GO:0019899',  # enzyme binding
+        'GO:0005102',  # signaling receptor binding
+        'GO:0031625',  # ubiquitin protein ligase binding
+        'GO:0045296',  # cadherin binding
+        'GO:0044877',  # protein-containing complex binding
+        'GO:0005178',  # integrin binding
+        'GO:0051117',  # ATPase binding
+        'GO:0008022',  # protein C-terminus binding
+        'GO:0042802',  # identical protein binding
+        'GO:0051400',  # BH3 domain binding
+        'GO:0017018',  # myosin binding
+        'GO:0030674',  # protein binding, bridging
+        'GO:0051425',  # PTB domain binding
+        'GO:1903231'   # microRNA binding
+    ],
+    'dna_binding': [  # DNA结合相关
+        'GO:1990837',  # sequence-specific dsDNA binding
+        'GO:0003677',  # DNA binding
+        'GO:0003700',  # DNA-binding TF activity
+        'GO:0003682',  # chromatin binding
+        'GO:0000977',  # RNA pol II TF activity
+        'GO:0003690',  # double-stranded DNA binding
+        'GO:0003691',  # telomeric DNA binding
+        'GO:0043565',  # sequence-specific DNA binding
+        'GO:0003681',  # bent DNA binding
+        'GO:0000978'  # RNA polymerase II cis-binding
+    ],
+    'catalytic': [  # 催化活性相关
+        'GO:0004674',  # protein kinase activity
+        'GO:0061630',  # ubiquitin ligase activity
+        'GO:0003924',  # GTPase activity
+        'GO:0004842',  # ubiquitin-protein transferase activity
+        'GO:0016887',  # ATPase activity
+        'GO:0004715',  # non-membrane spanning protein tyrosine kinase activity
+        'GO:0004713',  # protein tyrosine kinase activity
+        'GO:0016491',  # oxidoreductase activity
+        'GO:0004252',  # serine-type endopeptidase activity
+        'GO:0008233',  # peptidase activity
+        'GO:0016301',  # kinase activity
+        'GO:0016787',  # hydrolase activity
+        'GO:0004553'  # hydrolase activity, O-glycosyl bonds
+    ],
+    'structural': [  # 结构相关
+        'GO:0005509',  # calcium ion binding
+        'GO:0008270',  # zinc ion binding
+        'GO:0005524',  # ATP binding
+        'GO:0051015',  # actin filament binding
+        'GO:0003779',  # actin binding
+        'GO:0008307',  # structural constituent of muscle
+        'GO:0005200',  # structural constituent of cytoskeleton
+        'GO:0051015',  # actin filament binding
+        'GO:0008092',  # cytoskeletal protein binding
+        'GO:0005198'  # structural molecule activity
+    ],
+    'transcription': [  # 转录相关
+        'GO:0001228',  # transcriptional activator activity
+        'GO:0003713',  # transcription coactivator activity
+        'GO:0140297',  # DNA-binding transcription factor binding
+        'GO:0003714',  # transcription corepressor activity
+        'GO:0001227',  # transcriptional repressor activity
+        'GO:0003712',  # transcription coregulator activity
+        'GO:0016251',  # RNA polymerase II general transcription activity
+        'GO:0003702'  # RNA polymerase II distal enhancer activity
+    ],
+    'signal': [  # 信号相关
+        'GO:0004984',  # olfactory receptor activity
+        'GO:0004930',  # G protein-coupled receptor activity
+        'GO:0038023',  # signaling receptor activity
+        'GO:0004871',  # signal transducer activity
+        'GO:0035326',  # enhancer binding
+        'GO:0048018',  # receptor ligand activity
+        'GO:0005125',  # cytokine activity
+        'GO:0005102'  # signaling receptor binding
+    ],
+    'transport': [  # 运输相关
+        'GO:0022857',  # transmembrane transporter activity
+        'GO:0015267',  # channel activity
+        'GO:0005216',  # ion channel activity
+        'GO:0005215',  # transporter activity
+        'GO:0022891',  # substrate-specific transmembrane transporter activity
+        'GO:0015075',  # ion transmembrane transporter activity
+        'GO:0022804',  # active transmembrane transporter activity
+        'GO:0015238'  # drug transmembrane transporter activity
+    ],
+    'enzyme_regulation': [  # 酶调控相关
+        'GO:0004857',  # enzyme inhibitor activity
+        'GO:0004860',  # protein kinase inhibitor activity
+        'GO:0004866',  # endopeptidase inhibitor activity
+        'GO:0030234',  # enzyme regulator activity
+        'GO:0019207',  # kinase regulator activity
+        'GO:0019887',  # protein kinase regulator activity
+        'GO:0008047',  # enzyme activator activity
+        'GO:0019210'  # kinase inhibitor activity
+    ]
+}
+
+# 反向映射(同一术语出现在多个类别中时以后出现的为准)
+GO_TO_SLIM = {}
+for _slim_cat, _go_terms in GO_SLIM_MAPPING.items():
+    for _term in _go_terms:
+        GO_TO_SLIM[_term] = _slim_cat
+SLIM_CATEGORIES = list(GO_SLIM_MAPPING.keys())
+SLIM_INDEX = {cat: i for i, cat in enumerate(SLIM_CATEGORIES)}
+
+
+def compile_slim_index(go_dict, num_terms=None):
+    """
+    把 go_dict(GO ID -> 标签列)编译为索引数组: 标签列 -> GO slim类别序号，不属于任何类别为 -1
+    num_terms 为标签向量长度，超出部分的术语忽略
+    """
+    if num_terms is None:
+        num_terms = max(go_dict.values(), default=-1) + 1
+    slim_index = np.full(num_terms, -1, dtype=np.int64)
+    for term, idx in go_dict.items():
+        if term in GO_TO_SLIM and idx < num_terms:
+            slim_index[idx] = SLIM_INDEX[GO_TO_SLIM[term]]
+    return slim_index
+
+
+def slim_projection(slim_index):
+    """[术语数, 类别数] 的0/1稀疏投影矩阵，标签矩阵右乘它即得到每个类别命中的术语数"""
+    from scipy.sparse import csr_matrix
+
+    rows = np.flatnonzero(slim_index >= 0)
+    return csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, slim_index[rows])),
+                      shape=(len(slim_index), len(SLIM_CATEGORIES)))
+
+
+def stack_labels(labels, protein_ids, chunk_size=10000):
+    """
+    把 {protein_id: 标签向量} 按 protein_ids 的顺序堆叠为CSR矩阵(分块转换，避免一次生成整个稠密矩阵)
+    labels 已经是稀疏矩阵(如 utils.gaf_parser.build_go_label_matrix 的结果，行与 protein_ids 对齐)时直接返回
+    Returns:
+        (CSR矩阵, 有标签的 protein_id 列表)
+    """
+    from scipy.sparse import csr_matrix, issparse, vstack
+
+    if issparse(labels):
+        return labels.tocsr(), list(protein_ids)
+
+    present = [pid for pid in protein_ids if pid in labels]
+    blocks = []
+    for start in range(0, len(present), chunk_size):
+        rows = np.asarray([labels[pid] for pid in present[start:start + chunk_size]], dtype=np.float32)
+        blocks.append(csr_matrix(rows))
+    if not blocks:
+        return csr_matrix((0, 0), dtype=np.float32), present
+    return vstack(blocks, format='csr'), present
+
+
+def convert_to_slim_labels(label_matrix, slim_index):
+    """
+    一次稀疏矩阵乘法把 [蛋白质数, 术语数] 的标签矩阵转换为 [蛋白质数, 类别数] 的0/1 GO slim标签
+    只有取值为1的标签参与转换
+    Returns:
+        (slim标签 float32 稠密矩阵, 每个蛋白质是否至少命中一个类别)
+    """
+    positives = label_matrix.copy()
+    positives.data = (positives.data == 1).astype(np.float32)
+    hits = np.asarray((positives @ slim_projection(slim_index)).todense())
+    slim_labels = (hits > 0).astype(np.float32)
+    return slim_labels, slim_labels.any(axis=1)
@@ -0,0 +1,189 @@
+import argparse
+import json
+import os
+
+import numpy as np
+import torch
+from torch_geometric.data import Data
+from tqdm import tqdm
+
+META_FILE = 'meta.json'
+INDEX_FILE = 'index.npz'
+IDS_FILE = 'ids.txt'
+SEQUENCES_FILE = 'sequences.txt'
+
+
+def _shard_paths(directory, shard):
+    prefix = os.path.join(directory, f'shard_{shard:05d}')
+    return f'{prefix}.x', f'{prefix}.edges'
+
+
+class GraphShardWriter:
+    """
+    把蛋白质图写入分片存储:
+        shard_XXXXX.x      所有图的节点特征按行拼接的 float16 [节点数, 维度]
+        shard_XXXXX.edges  所有图的局部 edge_index 依次拼接的 int64，每个图占 2 × 边数
+        index.npz          每个图的 分片号/节点偏移/节点数/边偏移/边数
+        ids.txt, sequences.txt  与 index 同序的 protein_id 和序列
+    读取时通过内存映射切片，不需要逐个打开文件和反序列化
+    """
+
+    def __init__(self, directory, dim, shard_bytes=512 * 1024 * 1024):
+        self.directory = directory
+        self.dim = dim
+        self.shard_bytes = shard_bytes
+        os.makedirs(directory, exist_ok=True)
+
+        self._ids = []
+        self._sequences = []
+        self._index = {name: [] for name in ('shard', 'node_offset', 'num_nodes', 'edge_offset', 'num_edges')}
+        self._shard = -1
+        self._files = None
+        self._node_offset = 0
+        self._edge_offset = 0
+        self._open_shard()
+
+    def _open_shard(self):
+        if self._files is not None:
+            for f in self._files:
+                f.close()
+        self._shard += 1
+        self._files = [open(path, 'wb') for path in _shard_paths(self.directory, self._shard)]
+        self._node_offset = 0
+        self._edge_offset = 0
+
+    def append(self, protein_id, x, edge_index, seq):
+        if x.size(1) != self.dim:
+            raise ValueError(f"节点特征维度不一致: {x.size(1)} != {self.dim}")
+        if self._node_offset and (self._node_offset + x.size(0)) * self.dim * 2 > self.shard_bytes:
+            self._open_shard()
+
+        x_file, edge_file = self._files
+        x_file.write(x.detach().to(torch.float16).contiguous().numpy().tobytes())
+        edge_file.write(edge_index.detach().to(torch.int64).contiguous().numpy().tobytes())
+
+        self._index['shard'].append(self._shard)
+        self._index['node_offset'].append(self._node_offset)
+        self._index['num_nodes'].append(x.size(0))
+        self._index['edge_offset'].append(self._edge_offset)
+        self._index['num_edges'].append(edge_index.size(1))
+        self._ids.append(protein_id)
+        self._sequences.append(seq)
+        self._node_offset += x.size(0)
+        self._edge_offset += edge_index.numel()
+
+    def close(self):
+        """写完索引后存储才可读；先写临时文件再替换，中途失败不会留下与分片不一致的索引"""
+        for f in self._files:
+            f.close()
+
+        tmp_path = os.path.join(self.directory, f'{INDEX_FILE}.tmp.npz')
+        np.savez(tmp_path, **{name: np.asarray(values, dtype=np.int64) for name, values in self._index.items()})
+        with open(os.path.join(self.directory, IDS_FILE), 'w') as f:
+            f.write('\n'.join(self._ids))
+        with open(os.path.join(self.directory, SEQUENCES_FILE), 'w') as f:
+            f.write('\n'.join(self._sequences))
+        with open(os.path.join(self.directory, META_FILE), 'w') as f:
+            json.dump({'dim': self.dim, 'dtype': 'float16', 'num_shards': self._shard + 1,
+                       'num_graphs': len(self._ids)}, f, indent=2)
+        os.replace(tmp_path, os.path.join(self.directory, INDEX_FILE))
+
+
+class GraphShardStore:
+    """
+    分片存储的只读视图，get() 返回内存映射上的切片(零拷贝，节点特征为 float16)
+    内存映射在每个进程第一次读取时打开，DataLoader 的worker进程各自映射同一组文件
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, META_FILE), 'r') as f:
+            self.meta = json.load(f)
+        self.dim = self.meta['dim']
+
+        index = np.load(os.path.join(directory, INDEX_FILE))
+        self._shard = index['shard']
+        self._node_offset = index['node_offset']
+        self._num_nodes = index['num_nodes']
+        self._edge_offset = index['edge_offset']
+        self._num_edges = index['num_edges']
+        with open(os.path.join(directory, IDS_FILE), 'r') as f:
+            self.protein_ids = f.read().split('\n') if self.meta['num_graphs'] else []
+        with open(os.path.join(directory, SEQUENCES_FILE), 'r') as f:
+            self._sequences = f.read().split('\n') if self.meta['num_graphs'] else []
+        self._positions = {pid: i for i, pid in enumerate(self.protein_ids)}
+
+        self._maps = {}
+        self._pid = None
+
+    @staticmethod
+    def exists(directory):
+        return directory is not None and os.path.exists(os.path.join(directory, INDEX_FILE))
+
+    def __len__(self):
+        return len(self.protein_ids)
+
+    def __contains__(self, protein_id):
+        return protein_id in self._positions
+
+    def _shard_maps(self, shard):
+        # fork 出的子进程重新打开映射，避免共用父进程的文件状态
+        if self._pid != os.getpid():
+            self._maps = {}
+            self._pid = os.getpid()
+        if shard not in self._maps:
+            x_path, edge_path = _shard_paths(self.directory, shard)
+            # 'c'(写时复制)映射可以直接交给 torch.from_numpy，修改不会写回文件
+            x_map = np.memmap(x_path, dtype=np.float16, mode='c').reshape(-1, self.dim)
+            edge_map = np.memmap(edge_path, dtype=np.int64, mode='c')
+            self._maps[shard] = (x_map, edge_map)
+        return self._maps[shard]
+
+    def get(self, protein_id):
+        i = self._positions[protein_id]
+        x_map, edge_map = self._shard_maps(int(self._shard[i]))
+        node_offset, num_nodes = int(self._node_offset[i]), int(self._num_nodes[i])
+        edge_offset, num_edges = int(self._edge_offset[i]), int(self._num_edges[i])
+        return Data(
+            x=torch.from_numpy(x_map[node_offset:node_offset + num_nodes]),
+            edge_index=torch.from_numpy(edge_map[edge_offset:edge_offset + 2 * num_edges]).view(2, num_edges),
+            seq=self._sequences[i],
+            protein_id=protein_id
+        )
+
+
+def convert_processed_dir(processed_dir, output_dir, protein_ids=None, shard_bytes=512 * 1024 * 1024):
+    """把 ProteinGraphDataset 逐个保存的 .pt 文件转换为分片存储，返回转换的图数"""
+    from data.preprocess import processed_path
+
+    if protein_ids is None:
+        paths = sorted(os.path.join(processed_dir, name) for name in os.listdir(processed_dir)
+                       if name.endswith('.pt') and name not in ('pre_filter.pt', 'pre_transform.pt'))
+    else:
+        paths = [processed_path(processed_dir, pid) for pid in protein_ids]
+
+    writer = None
+    for path in tqdm(paths, desc="正在转换为分片存储"):
+        data = torch.load(path, map_location='cpu')
+        if writer is None:
+            writer = GraphShardWriter(output_dir, data.x.size(1), shard_bytes=shard_bytes)
+        writer.append(data.protein_id, data.x, data.edge_index, data.seq)
+    if writer is None:
+        raise ValueError(f"{processed_dir} 中没有可转换的 .pt 文件")
+    writer.close()
+    return len(paths)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='把逐个保存的蛋白质图(.pt)转换为内存映射的分片存储')
+    parser.add_argument('--processed', type=str, required=True, help='ProteinGraphDataset 的 processed 目录')
+    parser.add_argument('--output', type=str, required=True, help='分片存储输出目录')
+    parser.add_argument('--shard_mb', type=int, default=512, help='每个节点特征分片的大小(MB)')
+    args = parser.parse_args()
+
+    count = convert_processed_dir(args.processed, args.output, shard_bytes=args.shard_mb * 1024 * 1024)
+    print(f"已转换 {count} 个蛋白质图到 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import os
+
+import torch
+from torch_geometric.loader import DataLoader
+
+
+def default_num_workers():
+    """默认的数据加载进程数: 留一个核给主进程，最多8个"""
+    return max(0, min(8, (os.cpu_count() or 1) - 1))
+
+
+def _init_loader_worker(worker_id):
+    # 每个数据加载进程只用一个线程做增强和拼接，避免与主进程的计算线程争抢CPU
+    torch.set_num_threads(1)
+
+
+def create_loader(dataset, batch_size=32, shuffle=False, device=None, num_workers=None, prefetch_factor=4,
+                  persistent_workers=True, drop_last=False):
+    """
+    为 ProteinGraphDataset 创建调优过的 DataLoader:
+        - 多个worker进程并行读取图(get)并做训练增强(__getitem__)，主进程只负责计算
+        - persistent_workers 在多个epoch之间复用worker，prefetch_factor 控制每个worker预取的批次数
+        - 推理设备为GPU时使用锁页内存，配合 to_device(non_blocking=True) 异步拷贝
+    num_workers=0 时退化为在主进程中加载(与默认 DataLoader 相同)
+    训练时使用 drop_last=True: 模型中的 BatchNorm 在只有一个图的批次上会报错
+    """
+    if num_workers is None:
+        num_workers = default_num_workers()
+    device = torch.device(device) if device is not None else torch.device('cpu')
+
+    kwargs = {}
+    if num_workers > 0:
+        kwargs.update(
+            persistent_workers=persistent_workers,
+            prefetch_factor=prefetch_factor,
+            worker_init_fn=_init_loader_worker,
+        )
+    return DataLoader(
+        dataset,
+        batch_size=batch_size,
+        shuffle=shuffle,
+        drop_last=drop_last,
+        num_workers=num_workers,
+        pin_memory=device.type == 'cuda',
+        **kwargs
+    )
+
+
+def to_device(batch, device):
+    """把批次拷贝到设备；源数据在锁页内存中时与计算重叠进行"""
+    return batch.to(device, non_blocking=True)
@@ -0,0 +1,239 @@
+import multiprocessing
+import os
+import time
+
+import torch
+from torch_geometric.data import Data
+from tqdm import tqdm
+from utils.graph_builders import CachedGraphBuilder, create_graph_builder
+from utils.sliding_window import contacts_windowed, embed_windowed
+
+
+def safe_protein_id(pid):
+    """处理文件名,替换非法字符"""
+    return pid.replace("|", "_").replace(":", "_")
+
+
+def processed_path(processed_dir, pid):
+    return os.path.join(processed_dir, f'{safe_protein_id(pid)}.pt')
+
+
+class GraphPreprocessor:
+    """
+    蛋白质图预处理: ESM嵌入(长序列按重叠窗口分段) + 残基图构建 + 保存 .pt
+    一个实例对应一个设备上的一份ESM模型，既可以在数据集所在进程中使用，也可以在预处理worker中使用
+    """
+
+    def __init__(self, feature_model, device, graph_config=None, max_length=1000, long_sequence='truncate',
+                 window_overlap=250, windows_per_batch=8, embedding_cache=None, esm_layer=None):
+        from esm import pretrained
+
+        self.device = torch.device(device)
+        self.max_length = max_length
+        self.long_sequence = long_sequence
+        self.window_overlap = window_overlap
+        self.windows_per_batch = windows_per_batch
+        self.embedding_cache = embedding_cache
+        self.graph_builder = CachedGraphBuilder(create_graph_builder(graph_config))
+
+        self.model, self.alphabet = pretrained.load_model_and_alphabet(feature_model)
+        self.model = self.model.to(self.device)
+        self.model.eval()
+        self.batch_converter = self.alphabet.get_batch_converter()
+        # 取哪一层的表示需与模型配置的 esm_layer 一致(预测时 predict_seq 使用同一层)，默认最后一层
+        self.repr_layer = esm_layer if esm_layer is not None else self.model.num_layers
+
+    def _is_long(self, seq):
+        return self.long_sequence == 'window' and len(seq) > self.max_length
+
+    def _esm_forward(self, seqs):
+        _, _, batch_tokens = self.batch_converter([(f"window_{i}", seq) for i, seq in enumerate(seqs)])
+        results = self.model(batch_tokens.to(self.device), repr_layers=[self.repr_layer])
+        representations = results["representations"][self.repr_layer]
+        return [representations[i, 1:len(seq) + 1].cpu() for i, seq in enumerate(seqs)]
+
+    def _esm_contacts(self, seqs):
+        _, _, batch_tokens = self.batch_converter([(f"window_{i}", seq) for i, seq in enumerate(seqs)])
+        results = self.model(batch_tokens.to(self.device), return_contacts=True)
+        contacts = results["contacts"]
+        return [contacts[i, :len(seq), :len(seq)].cpu() for i, seq in enumerate(seqs)]
+
+    def embed(self, seqs):
+        """返回每条序列的残基级ESM嵌入，缓存命中的序列不参与ESM前向"""
+        embeddings = [None] * len(seqs)
+        if self.embedding_cache is not None:
+            for i, seq in enumerate(seqs):
+                embeddings[i] = self.embedding_cache.get(seq)
+
+        missing = [i for i, emb in enumerate(embeddings) if emb is None]
+        # 超长序列单独按重叠窗口分段嵌入
+        short = [i for i in missing if not self._is_long(seqs[i])]
+        if short:
+            for i, emb in zip(short, self._esm_forward([seqs[i] for i in short])):
+                embeddings[i] = emb
+        for i in missing:
+            if embeddings[i] is None:
+                embeddings[i] = embed_windowed(self._esm_forward, seqs[i], self.max_length,
+                                               self.window_overlap, self.windows_per_batch)
+
+        if self.embedding_cache is not None:
+            for i in missing:
+                self.embedding_cache.put(seqs[i], embeddings[i])
+
+        return embeddings
+
+    def contacts(self, seqs):
+        """ESM预测的残基接触图(仅 contact kNN 建图需要)"""
+        contacts = [None] * len(seqs)
+        short = [i for i, seq in enumerate(seqs) if not self._is_long(seq)]
+        if short:
+            for i, contact in zip(short, self._esm_contacts([seqs[i] for i in short])):
+                contacts[i] = contact
+        for i, seq in enumerate(seqs):
+            if contacts[i] is None:
+                contacts[i] = contacts_windowed(self._esm_contacts, seq, self.max_length,
+                                                self.window_overlap, self.windows_per_batch)
+        return contacts
+
+    def process_batch(self, batch, processed_dir):
+        """
+        处理一批 (protein_id, 序列, 标签) 并逐个保存，返回 (蛋白质数, 残基数)
+        先写临时文件再重命名，中断时不会留下不完整的 .pt，重新运行时会被当作未处理
+        """
+        seqs = [seq for _, seq, _ in batch]
+        with torch.no_grad():
+            embeddings = self.embed(seqs)
+            edges = self.graph_builder.build_local(
+                seqs, embeddings, lambda indices: self.contacts([seqs[i] for i in indices])
+            )
+
+        for (pid, seq, label), emb, edge_index in zip(batch, embeddings, edges):
+            data = Data(
+                x=emb,
+                edge_index=edge_index,
+                y=torch.tensor(label, dtype=torch.float),
+                seq=seq,
+                protein_id=pid
+            )
+            file_path = processed_path(processed_dir, pid)
+            tmp_path = f"{file_path}.{os.getpid()}.tmp"
+            torch.save(data, tmp_path)
+            os.replace(tmp_path, file_path)
+
+        return len(batch), sum(len(seq) for seq in seqs)
+
+
+def token_budget_batches(items, max_tokens, max_length, long_sequence='truncate'):
+    """
+    按长度降序切分批次，每批填充后的token数(最长序列+2 × 条数)不超过 max_tokens
+    超长序列在窗口模式下单独成批(窗口数由 windows_per_batch 控制)；最长的批次最先派发，尾部更均衡
+    """
+    items = sorted(items, key=lambda item: len(item[1]), reverse=True)
+    batches = []
+    current = []
+    longest = 0
+    for item in items:
+        length = len(item[1])
+        if long_sequence == 'window' and length > max_length:
+            batches.append([item])
+            continue
+        tokens = min(length, max_length) + 2  # BOS/EOS
+        if current and max(longest, tokens) * (len(current) + 1) > max_tokens:
+            batches.append(current)
+            current = []
+            longest = 0
+        current.append(item)
+        longest = max(longest, tokens)
+    if current:
+        batches.append(current)
+    return batches
+
+
+_worker = None
+
+
+def _init_worker(settings, device_queue, num_threads):
+    global _worker
+
+    # 每个worker从队列领取一个设备(多GPU时各占一张卡，CPU时平分核数)
+    device = device_queue.get()
+    torch.set_num_threads(num_threads)
+    embedding_cache = None
+    if settings.get('embedding_cache_dir'):
+        from utils.embedding_cache import EmbeddingCache
+        embedding_cache = EmbeddingCache(settings['embedding_cache_model'], disk_dir=settings['embedding_cache_dir'])
+    _worker = GraphPreprocessor(settings['feature_model'], device, settings['graph_config'], settings['max_length'],
+                                settings['long_sequence'], settings['window_overlap'],
+                                settings['windows_per_batch'], embedding_cache, settings['esm_layer'])
+
+
+def _process_in_worker(args):
+    batch, processed_dir = args
+    return _worker.process_batch(batch, processed_dir)
+
+
+def worker_devices(num_workers=0, devices=None):
+    """
+    预处理使用的设备列表，每个元素对应一个worker进程；返回空列表表示在当前进程中处理
+        devices 指定时(如 ['cuda:0', 'cuda:1'])每个设备一个worker
+        否则有多张GPU时每张卡一个worker，只有CPU时启动 num_workers 个CPU worker
+    """
+    if devices:
+        return list(devices)
+    if torch.cuda.device_count() > 1:
+        return [f'cuda:{i}' for i in range(torch.cuda.device_count())]
+    if num_workers > 0 and not torch.cuda.is_available():
+        return ['cpu'] * num_workers
+    return []
+
+
+def run_preprocessing(items, processed_dir, settings, num_workers=0, devices=None, max_tokens=16000,
+                      local_preprocessor=None):
+    """
+    增量预处理: items 为尚未处理的 (protein_id, 序列, 标签)，按token预算分批后
+    在worker进程池(多CPU进程或多GPU)或当前进程中处理，进度按残基/秒报告
+    Args:
+        settings: 创建 GraphPreprocessor 所需的参数(可pickle的字典)
+        local_preprocessor: 不使用worker时调用，返回当前进程中的 GraphPreprocessor
+    Returns:
+        (蛋白质数, 残基数, 耗时秒)
+    """
+    batches = token_budget_batches(items, max_tokens, settings['max_length'], settings['long_sequence'])
+    total_residues = sum(len(seq) for _, seq, _ in items)
+    devices = worker_devices(num_workers, devices)
+
+    print(f"需要处理 {len(items)} 个蛋白质({total_residues} 个残基)，共 {len(batches)} 个批次，"
+          f"{'worker: ' + ', '.join(devices) if devices else '在当前进程中处理'}")
+
+    start = time.perf_counter()
+    done_proteins = 0
+    done_residues = 0
+    progress = tqdm(total=total_residues, desc="正在预处理蛋白质", unit='res', unit_scale=True)
+    try:
+        if devices:
+            ctx = multiprocessing.get_context('spawn')
+            device_queue = ctx.Queue()
+            for device in devices:
+                device_queue.put(device)
+            num_threads = max(1, (os.cpu_count() or 1) // len(devices))
+            with ctx.Pool(len(devices), initializer=_init_worker,
+                          initargs=(settings, device_queue, num_threads)) as pool:
+                for proteins, residues in pool.imap_unordered(_process_in_worker,
+                                                              [(batch, processed_dir) for batch in batches]):
+                    done_proteins += proteins
+                    done_residues += residues
+                    progress.update(residues)
+        else:
+            preprocessor = local_preprocessor()
+            for batch in batches:
+                proteins, residues = preprocessor.process_batch(batch, processed_dir)
+                done_proteins += proteins
+                done_residues += residues
+                progress.update(residues)
+    finally:
+        progress.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"预处理完成: {done_proteins} 个蛋白质，{done_residues} 个残基，耗时 {elapsed:.1f}s，"
+          f"{done_residues / elapsed if elapsed > 0 else 0:.0f} 残基/秒")
+    return done_proteins, done_residues, elapsed
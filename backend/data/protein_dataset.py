@@ -1,31 +1,40 @@
 import os
 import torch
 import numpy as np
-from torch_geometric.data import Dataset, Data
-from torch_geometric.utils import to_undirected
-from esm import pretrained
-from tqdm import tqdm
+from torch_geometric.data import Dataset
+from data.go_slim import GO_SLIM_MAPPING, GO_TO_SLIM, compile_slim_index, convert_to_slim_labels, stack_labels
+from data.graph_store import GraphShardStore, convert_processed_dir
+from data.preprocess import GraphPreprocessor, processed_path, run_preprocessing, safe_protein_id
 
 class ProteinGraphDataset(Dataset):
     def __init__(self, root, protein_ids, labels, sequences,go_dict,
                  feature_model="esm2_t6_8M_UR50D",
-                 max_length=1000, force_reprocess=False):
+                 max_length=1000, force_reprocess=False, embedding_cache=None, graph_config=None,
+                 long_sequence='truncate', window_overlap=250, windows_per_batch=8, shard_dir=None, esm_layer=None):
         self.protein_ids = protein_ids
         self.labels = labels
         self.sequences = sequences
         self.go_dict = go_dict
         self.feature_model = feature_model
+        self.esm_layer = esm_layer  # ESM表示层，None 表示最后一层，需与模型配置一致
         self.max_length = max_length
         self.force_reprocess = force_reprocess
+        # 超过 max_length 的序列: 'window' 滑动窗口分段嵌入，'truncate' 截断，需与模型配置一致
+        self.long_sequence = long_sequence
+        self.window_overlap = window_overlap
+        self.windows_per_batch = windows_per_batch
+        self.embedding_cache = embedding_cache  # 可选的 utils.embedding_cache.EmbeddingCache
+        # 残基图构建方式，需与模型配置(models.config)中的 graph 一致
+        self.graph_config = graph_config
         self.training = False
+        # 可选的分片存储(data.graph_store)，存在时 get() 从内存映射中切片读取，不再逐个 torch.load
+        self.shard_dir = shard_dir
+        self.graph_store = GraphShardStore(shard_dir) if GraphShardStore.exists(shard_dir) else None
         self._num_classes = len(go_dict)  # 使用下划线前缀的私有变量
 
-        # 初始化ESM模型
-        self.model, self.alphabet = pretrained.load_model_and_alphabet(feature_model)
+        # ESM模型在需要在当前进程中预处理时才加载(数据已处理好或使用worker进程时不加载)
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-        self.model = self.model.to(self.device)
-        self.batch_converter = self.alphabet.get_batch_converter()
-        self.model.eval()
+        self._preprocessor = None
         super().__init__(root)
 
     @property
@@ -37,154 +46,44 @@ class ProteinGraphDataset(Dataset):
         self._num_classes = value
 
     def _map_to_slim_categories(self):
-        """将GO terms映射到功能大类"""
-        self.go_slim_mapping = {
-            'protein_binding': [  # 蛋白质结合相关
-                'GO:0042803',  # protein homodimerization activity
-                'GO:0019901',  # protein kinase binding
-                'GO:0019899',  # enzyme binding
-                'GO:0005102',  # signaling receptor binding
-                'GO:0031625',  # ubiquitin protein ligase binding
-                'GO:0045296',  # cadherin binding
-                'GO:0044877',  # protein-containing complex binding
-                'GO:0005178',  # integrin binding
-                'GO:0051117',  # ATPase binding
-                'GO:0008022',  # protein C-terminus binding
-                'GO:0042802',  # identical protein binding
-                'GO:0051400',  # BH3 domain binding
-                'GO:0017018',  # myosin binding
-                'GO:0030674',  # protein binding, bridging
-                'GO:0051425',  # PTB domain binding
-                'GO:1903231'   # microRNA binding
-            ],
-            'dna_binding': [  # DNA结合相关
-                'GO:1990837',  # sequence-specific dsDNA binding
-                'GO:0003677',  # DNA binding
-                'GO:0003700',  # DNA-binding TF activity
-                'GO:0003682',  # chromatin binding
-                'GO:0000977',  # RNA pol II TF activity
-                'GO:0003690',  # double-stranded DNA binding
-                'GO:0003691',  # telomeric DNA binding
-                'GO:0043565',  # sequence-specific DNA binding
-                'GO:0003681',  # bent DNA binding
-                'GO:0000978'  # RNA polymerase II cis-binding
-            ],
-            'catalytic': [  # 催化活性相关
-                'GO:0004674',  # protein kinase activity
-                'GO:0061630',  # ubiquitin ligase activity
-                'GO:0003924',  # GTPase activity
-                'GO:0004842',  # ubiquitin-protein transferase activity
-                'GO:0016887',  # ATPase activity
-                'GO:0004715',  # non-membrane spanning protein tyrosine kinase activity
-                'GO:0004713',  # protein tyrosine kinase activity
-                'GO:0016491',  # oxidoreductase activity
-                'GO:0004252',  # serine-type endopeptidase activity
-                'GO:0008233',  # peptidase activity
-                'GO:0016301',  # kinase activity
-                'GO:0016787',  # hydrolase activity
-                'GO:0004553'  # hydrolase activity, O-glycosyl bonds
-            ],
-            'structural': [  # 结构相关
-                'GO:0005509',  # calcium ion binding
-                'GO:0008270',  # zinc ion binding
-                'GO:0005524',  # ATP binding
-                'GO:0051015',  # actin filament binding
-                'GO:0003779',  # actin binding
-                'GO:0008307',  # structural constituent of muscle
-                'GO:0005200',  # structural constituent of cytoskeleton
-                'GO:0051015',  # actin filament binding
-                'GO:0008092',  # cytoskeletal protein binding
-                'GO:0005198'  # structural molecule activity
-            ],
-            'transcription': [  # 转录相关
-                'GO:0001228',  # transcriptional activator activity
-                'GO:0003713',  # transcription coactivator activity
-                'GO:0140297',  # DNA-binding transcription factor binding
-                'GO:0003714',  # transcription corepressor activity
-                'GO:0001227',  # transcriptional repressor activity
-                'GO:0003712',  # transcription coregulator activity
-                'GO:0016251',  # RNA polymerase II general transcription activity
-                'GO:0003702'  # RNA polymerase II distal enhancer activity
-            ],
-            'signal': [  # 信号相关
-                'GO:0004984',  # olfactory receptor activity
-                'GO:0004930',  # G protein-coupled receptor activity
-                'GO:0038023',  # signaling receptor activity
-                'GO:0004871',  # signal transducer activity
-                'GO:0035326',  # enhancer binding
-                'GO:0048018',  # receptor ligand activity
-                'GO:0005125',  # cytokine activity
-                'GO:0005102'  # signaling receptor binding
-            ],
-            'transport': [  # 运输相关
-                'GO:0022857',  # transmembrane transporter activity
-                'GO:0015267',  # channel activity
-                'GO:0005216',  # ion channel activity
-                'GO:0005215',  # transporter activity
-                'GO:0022891',  # substrate-specific transmembrane transporter activity
-                'GO:0015075',  # ion transmembrane transporter activity
-                'GO:0022804',  # active transmembrane transporter activity
-                'GO:0015238'  # drug transmembrane transporter activity
-            ],
-            'enzyme_regulation': [  # 酶调控相关
-                'GO:0004857',  # enzyme inhibitor activity
-                'GO:0004860',  # protein kinase inhibitor activity
-                'GO:0004866',  # endopeptidase inhibitor activity
-                'GO:0030234',  # enzyme regulator activity
-                'GO:0019207',  # kinase regulator activity
-                'GO:0019887',  # protein kinase regulator activity
-                'GO:0008047',  # enzyme activator activity
-                'GO:0019210'  # kinase inhibitor activity
-            ]
-        }
-
-        # 创建反向映射
-        self.go_to_slim = {}
-        for slim_cat, go_terms in self.go_slim_mapping.items():
-            for term in go_terms:
-                self.go_to_slim[term] = slim_cat
+        """将GO terms映射到功能大类(映射在 data.go_slim 中只编译一次)"""
+        self.go_slim_mapping = GO_SLIM_MAPPING
+        self.go_to_slim = GO_TO_SLIM
 
     def _filter_by_go_slim(self, min_terms=1):
         self._map_to_slim_categories()
+        num_categories = len(self.go_slim_mapping)
+
+        # 标签堆叠为 [蛋白质数, 术语数] 的稀疏矩阵(没有标签的蛋白质会被过滤掉)
+        label_matrix, labeled_ids = stack_labels(self.labels, self.protein_ids)
 
         # 如果是预测场景(没有真实标签)，则保留所有蛋白质
-        if all(sum(self.labels[pid]) == 0 for pid in self.protein_ids):
+        if len(labeled_ids) == len(self.protein_ids) and label_matrix.count_nonzero() == 0:
             print("预测模式: 保留所有蛋白质")
-            new_labels = {pid: [0] * len(self.go_slim_mapping) for pid in self.protein_ids}
+            new_labels = {pid: [0] * num_categories for pid in self.protein_ids}
             self.labels = new_labels
-            self.num_classes = len(self.go_slim_mapping)
+            self.num_classes = num_categories
             return
 
-        new_labels = {}
-        filtered_protein_ids = []
-
         print("开始GO slim过滤")
         print(f"过滤前蛋白质数量: {len(self.protein_ids)}")
 
-        for pid in self.protein_ids:
-            if pid in self.labels:
-                orig_label = self.labels[pid]
-                slim_label = [0] * len(self.go_slim_mapping)
-
-                # 放宽过滤条件
-                converted = False
-                for term, idx in self.go_dict.items():
-                    if term in self.go_to_slim and idx < len(orig_label):
-                        if orig_label[idx] == 1:
-                            slim_cat = self.go_to_slim[term]
-                            slim_idx = list(self.go_slim_mapping.keys()).index(slim_cat)
-                            slim_label[slim_idx] = 1
-                            converted = True
-
-                # 只要有转换成功就保留
-                if converted:  # 移除 min_terms 条件
-                    new_labels[pid] = slim_label
-                    filtered_protein_ids.append(pid)
+        # GO术语列 -> slim类别 的索引数组，整个标签矩阵一次稀疏乘法完成转换
+        slim_index = compile_slim_index(self.go_dict, label_matrix.shape[1])
+        slim_labels, converted = convert_to_slim_labels(label_matrix, slim_index)
+
+        # 只要有转换成功就保留
+        new_labels = {}
+        filtered_protein_ids = []
+        for row in np.flatnonzero(converted):
+            pid = labeled_ids[row]
+            new_labels[pid] = slim_labels[row]
+            filtered_protein_ids.append(pid)
 
         print(f"过滤后蛋白质数量: {len(filtered_protein_ids)}")
         self.labels = new_labels
         self.protein_ids = filtered_protein_ids
-        self.num_classes = len(self.go_slim_mapping)
+        self.num_classes = num_categories
 
     @property
     def raw_file_names(self):
@@ -192,7 +91,10 @@ class ProteinGraphDataset(Dataset):
 
     @property
     def processed_file_names(self):
-        return [f'{pid.replace("|", "_").replace(":", "_")}.pt' for pid in self.protein_ids]
+        return [f'{safe_protein_id(pid)}.pt' for pid in self.protein_ids]
+
+    def processed_path(self, pid):
+        return processed_path(self.processed_dir, pid)
 
     def processed_file_exists(self):
         # 检查所有蛋白质文件是否存在
@@ -214,86 +116,90 @@ class ProteinGraphDataset(Dataset):
                 ProteinGraphDataset._processed_shown = True
             return
 
-    def process(self):
+    def _preprocessor_settings(self):
+        """创建 GraphPreprocessor 的参数(可pickle，传给worker进程)"""
+        settings = {
+            'feature_model': self.feature_model,
+            'esm_layer': self.esm_layer,
+            'graph_config': self.graph_config,
+            'max_length': self.max_length,
+            'long_sequence': self.long_sequence,
+            'window_overlap': self.window_overlap,
+            'windows_per_batch': self.windows_per_batch,
+            'embedding_cache_model': None,
+            'embedding_cache_dir': None,
+        }
+        # worker进程各自打开同一个磁盘缓存目录(写入有文件锁)，内存缓存不共享
+        if self.embedding_cache is not None and self.embedding_cache.disk_dir is not None:
+            settings['embedding_cache_model'] = self.embedding_cache.model_name
+            settings['embedding_cache_dir'] = self.embedding_cache.disk_dir
+        return settings
+
+    def _local_preprocessor(self):
+        if self._preprocessor is None:
+            self._preprocessor = GraphPreprocessor(
+                self.feature_model, self.device, self.graph_config, self.max_length, self.long_sequence,
+                self.window_overlap, self.windows_per_batch, self.embedding_cache, self.esm_layer
+            )
+        return self._preprocessor
+
+    def process(self, num_workers=0, devices=None, max_tokens=16000):
+        """
+        只处理还没有 .pt 文件的蛋白质(force_reprocess 时全部重新处理)，中断后重新运行会从断点继续
+        Args:
+            num_workers: 只有CPU时启动的预处理进程数，0 表示在当前进程中处理
+            devices: 指定每个worker使用的设备，如 ['cuda:0', 'cuda:1']；默认有多张GPU时每张卡一个worker
+            max_tokens: 每个ESM批次填充后的token数上限
+        """
         self._filter_by_go_slim(min_terms=1)
 
         os.makedirs(self.processed_dir, exist_ok=True)
 
         # 检查哪些蛋白质需要处理
-        to_process = []
+        items = []
         for pid in self.protein_ids:
-            file_path = os.path.join(self.processed_dir, f'{pid}.pt')
-            if self.force_reprocess or not os.path.exists(file_path):
-                to_process.append(pid)
-
-        if not to_process:
+            if not self.force_reprocess and (os.path.exists(self.processed_path(pid)) or
+                                             (self.graph_store is not None and pid in self.graph_store)):
+                continue
+            seq = self.sequences[pid]
+            if self.long_sequence == 'truncate':
+                seq = seq[:self.max_length]
+            if len(seq) < 4:
+                continue
+            items.append((pid, seq, self.labels[pid]))
+
+        if not items:
             print("所有数据已处理完成")
             return
 
-        # 计算总批次数
-        batch_size = 32
-        total_batches = len(self.protein_ids) // batch_size + (1 if len(self.protein_ids) % batch_size != 0 else 0)
-
-        print(f"需要处理 {len(self.protein_ids)} 个蛋白质，共 {total_batches} 个批次")
-
-        batches = [self.protein_ids[i:i + batch_size]
-                  for i in range(0, len(self.protein_ids), batch_size)]
-
-        with torch.no_grad():
-            for batch_ids in tqdm(batches, desc="正在按批次处理蛋白质", total=total_batches):
-                valid_ids = []
-                batch_seqs = []
-                for pid in batch_ids:
-                    seq = self.sequences[pid][:self.max_length]
-                    if len(seq) < 4:
-                        continue
-                    valid_ids.append(pid)
-                    batch_seqs.append((pid, seq))
-
-                if not valid_ids:
-                    continue
+        skipped = len(self.protein_ids) - len(items)
+        if skipped:
+            print(f"跳过 {skipped} 个已处理(或序列过短)的蛋白质")
 
-                _, _, batch_tokens = self.batch_converter(batch_seqs)
-                batch_tokens = batch_tokens.to(self.device)
-                results = self.model(batch_tokens, repr_layers=[6])
-                embeddings = results["representations"][6]
+        run_preprocessing(items, self.processed_dir, self._preprocessor_settings(), num_workers=num_workers,
+                          devices=devices, max_tokens=max_tokens, local_preprocessor=self._local_preprocessor)
+        # 预处理完成后释放ESM模型，DataLoader worker 不必继承它
+        self._preprocessor = None
 
-                for idx, pid in enumerate(valid_ids):
-                    # 处理文件名,替换非法字符
-                    safe_pid = pid.replace("|", "_").replace(":", "_")
-                    file_path = os.path.join(self.processed_dir, f'{safe_pid}.pt')
-
-                    seq = batch_seqs[idx][1]
-                    emb = embeddings[idx, 1:len(seq) + 1].cpu()
-
-                    edge_index = self._create_sequence_edges(len(seq))
-
-                    data = Data(
-                        x=emb,
-                        edge_index=edge_index,
-                        y=torch.tensor(self.labels[pid], dtype=torch.float),  # 这里需要使用转换后的标签
-                        seq=seq,
-                        protein_id=pid
-                    )
-
-                    torch.save(data, file_path)
-                    # torch.save(data, os.path.join(self.processed_dir, f'{pid}.pt'))
-
-    def _create_sequence_edges(self, seq_len):
-        src = torch.arange(0, seq_len - 1, dtype=torch.long)
-        dst = torch.arange(1, seq_len, dtype=torch.long)
-        return to_undirected(torch.stack([src, dst]))
+    def build_graph_store(self, shard_dir=None):
+        """把 processed_dir 中逐个保存的图转换为分片存储，之后 get() 从分片读取"""
+        self.shard_dir = shard_dir or self.shard_dir or os.path.join(self.root, 'shards')
+        convert_processed_dir(self.processed_dir, self.shard_dir, self.protein_ids)
+        self.graph_store = GraphShardStore(self.shard_dir)
+        return self.graph_store
 
     def len(self):
         return len(self.protein_ids)
 
     def get(self, idx):
         pid = self.protein_ids[idx]
-        safe_pid = pid.replace("|", "_").replace(":", "_")
-        file_path = os.path.join(self.processed_dir, f'{safe_pid}.pt')
 
-        # 移除 weights_only 参数
-        data = torch.load(file_path, map_location='cpu')
+        if self.graph_store is not None and pid in self.graph_store:
+            # 零拷贝切片，节点特征为float16，由使用方在送入模型前转换(见 predict_fasta.predict_proteins)
+            data = self.graph_store.get(pid)
+        else:
+            # 移除 weights_only 参数
+            data = torch.load(self.processed_path(pid), map_location='cpu')
 
         # 确保标签维度正确
         if isinstance(self.labels[pid], np.ndarray):
@@ -313,9 +219,9 @@ class ProteinGraphDataset(Dataset):
             edge_mask = torch.rand(data.edge_index.size(1)) > 0.15
             data.edge_index = data.edge_index[:, edge_mask]
 
-            # 添加高斯噪声
-            noise = torch.randn_like(data.x) * 0.1
-            data.x = data.x + noise
+            # 添加高斯噪声(分片存储的float16特征先转为float32)
+            noise = torch.randn(data.x.shape) * 0.1
+            data.x = data.x.float() + noise
         return data
 
     def train(self, mode=True):
@@ -10,8 +10,9 @@ os.makedirs(DB_PATH.parent, exist_ok=True)
 
 
 def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(DB_PATH, timeout=30)
     conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA foreign_keys = ON')
     return conn
 
 
@@ -19,6 +20,9 @@ def init_db():
     conn = get_db_connection()
     cursor = conn.cursor()
 
+    # WAL模式: 读请求不会被并发写入的预测结果阻塞
+    cursor.execute('PRAGMA journal_mode = WAL')
+
     # 创建用户表
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS users (
@@ -30,6 +34,62 @@ def init_db():
     )
     ''')
 
+    # 预测任务表(每次序列预测/FASTA上传对应一个任务，job 即前端使用的结果文件名)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS prediction_jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        job TEXT UNIQUE NOT NULL,
+        source TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_prediction_jobs_created ON prediction_jobs (created_at)')
+
+    # 序列表(按哈希去重)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS sequences (
+        hash TEXT PRIMARY KEY,
+        sequence TEXT NOT NULL
+    )
+    ''')
+
+    # 预测结果表
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS predictions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        job_id INTEGER NOT NULL REFERENCES prediction_jobs (id) ON DELETE CASCADE,
+        timestamp TEXT,
+        protein_id TEXT NOT NULL,
+        sequence_hash TEXT NOT NULL REFERENCES sequences (hash),
+        function TEXT NOT NULL,
+        confidence REAL NOT NULL,
+        model_version TEXT
+    )
+    ''')
+    # 旧数据库补充模型版本列(模型热替换后，结果需要能追溯到产生它的权重版本)
+    columns = [row['name'] for row in cursor.execute('PRAGMA table_info(predictions)')]
+    if 'model_version' not in columns:
+        cursor.execute('ALTER TABLE predictions ADD COLUMN model_version TEXT')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_predictions_job_protein ON predictions (job_id, protein_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_predictions_sequence ON predictions (sequence_hash)')
+
+    # 异步预测任务表(结果写入 predictions 中 job 对应的任务)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS prediction_tasks (
+        id TEXT PRIMARY KEY,
+        job TEXT NOT NULL,
+        input_path TEXT NOT NULL,
+        status TEXT NOT NULL,
+        total_records INTEGER,
+        done_records INTEGER NOT NULL DEFAULT 0,
+        error TEXT,
+        created_at TIMESTAMP,
+        started_at REAL,
+        finished_at REAL
+    )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_prediction_tasks_status ON prediction_tasks (status)')
+
     conn.commit()
     conn.close()
     print("数据库初始化完成")
\ No newline at end of file
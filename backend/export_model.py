@@ -0,0 +1,147 @@
+# backend/export_model.py
+"""
+把 ESM-2 编码器和 MultiLabelGNN 导出为 TorchScript / ONNX，供 predict_artifact.ArtifactPredictor 加载
+
+用法(在 backend 目录下):
+    python export_model.py --model models/best_model.pt --output models/export
+    python export_model.py --model models/best_model.pt --output models/export_onnx --format onnx
+"""
+import argparse
+import json
+import os
+from types import SimpleNamespace
+
+import torch
+from predict_artifact import MANIFEST_FILE, ArtifactPredictor
+from predict_seq import ProteinPredictor
+from utils.graph_edges import chain_edges
+
+AMINO_ACIDS = 'ACDEFGHIKLMNPQRSTVWY'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='导出ESM编码器与GNN模型')
+    parser.add_argument('--model', type=str, default='models/best_model.pt', help='模型文件路径')
+    parser.add_argument('--output', type=str, default='models/export', help='导出目录')
+    parser.add_argument('--format', type=str, default='torchscript', choices=['torchscript', 'onnx'],
+                        help='ESM编码器的导出格式(GNN始终导出为TorchScript)')
+    parser.add_argument('--device', type=str, default='cpu', help='导出设备，导出结果只保证在该设备上运行')
+    parser.add_argument('--opset', type=int, default=17, help='ONNX opset版本')
+    return parser.parse_args()
+
+
+class EsmEncoder(torch.nn.Module):
+    """只输出指定层残基表示的ESM包装，输入 [批大小, token数]，输出 [批大小, token数, 维度]"""
+
+    def __init__(self, esm_model, layer):
+        super().__init__()
+        self.esm_model = esm_model
+        self.layer = layer
+
+    def forward(self, tokens):
+        return self.esm_model(tokens, repr_layers=[self.layer])['representations'][self.layer]
+
+
+class GraphForward(torch.nn.Module):
+    """
+    单图前向: 输入节点特征和局部 edge_index，输出 [1, 类别数] 的logits
+    PyG 的全局池化会把图的数量作为常量记录进trace，因此导出的GNN每次只处理一个图
+    """
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, x, edge_index):
+        batch = x.new_zeros(x.size(0), dtype=torch.long)
+        return self.model(SimpleNamespace(x=x, edge_index=edge_index, batch=batch))
+
+
+def _example_sequence(length, shift=0):
+    return ''.join(AMINO_ACIDS[(i + shift) % len(AMINO_ACIDS)] for i in range(length))
+
+
+def alphabet_spec(alphabet):
+    return {
+        'tok_to_idx': alphabet.tok_to_idx,
+        'padding_idx': alphabet.padding_idx,
+        'cls_idx': alphabet.cls_idx,
+        'eos_idx': alphabet.eos_idx,
+        'unk_idx': alphabet.unk_idx,
+        'prepend_bos': alphabet.prepend_bos,
+        'append_eos': alphabet.append_eos,
+    }
+
+
+def export_esm(predictor, path, fmt, opset):
+    encoder = EsmEncoder(predictor.esm_model, predictor.esm_layer).eval()
+    # 示例批次必须包含填充: ESM在没有填充时会跳过padding mask分支，trace会把该分支固定下来
+    _, _, tokens = predictor.batch_converter([('a', _example_sequence(64)), ('b', _example_sequence(40, 3))])
+    tokens = tokens.to(predictor.device)
+
+    with torch.no_grad():
+        if fmt == 'onnx':
+            torch.onnx.export(
+                encoder, (tokens,), path,
+                input_names=['tokens'], output_names=['representations'],
+                dynamic_axes={'tokens': {0: 'batch', 1: 'length'},
+                              'representations': {0: 'batch', 1: 'length'}},
+                opset_version=opset
+            )
+        else:
+            traced = torch.jit.trace(encoder, (tokens,), check_trace=False)
+            torch.jit.freeze(traced).save(path)
+
+
+def export_gnn(predictor, path):
+    wrapper = GraphForward(predictor.model).eval()
+    x = torch.randn(50, predictor.config['input_dim'], device=predictor.device)
+    edge_index = chain_edges(50).to(predictor.device)
+    with torch.no_grad():
+        traced = torch.jit.trace(wrapper, (x, edge_index), check_trace=False)
+        torch.jit.freeze(traced).save(path)
+
+
+def verify(predictor, artifact_dir):
+    """用与trace示例不同的长度和批大小检查导出结果与eager模型一致，返回最大概率偏差"""
+    sequences = [_example_sequence(n, n) for n in (17, 153, 611)]
+    expected = predictor.predict_proba_batch(sequences)
+    actual = ArtifactPredictor(artifact_dir, device=predictor.device).predict_proba_batch(sequences)
+    return (expected - actual).abs().max().item()
+
+
+def main():
+    args = parse_args()
+    os.makedirs(args.output, exist_ok=True)
+
+    predictor = ProteinPredictor(args.model, device=args.device)
+    if predictor.graph_builder.needs_contacts:
+        raise ValueError("导出的ESM编码器不输出接触图，不支持 contact kNN 建图的模型")
+
+    esm_file = 'esm_encoder.onnx' if args.format == 'onnx' else 'esm_encoder.pt'
+    print(f"导出ESM编码器({args.format})...")
+    export_esm(predictor, os.path.join(args.output, esm_file), args.format, args.opset)
+    print("导出GNN(torchscript)...")
+    export_gnn(predictor, os.path.join(args.output, 'gnn.pt'))
+
+    manifest = {
+        'source_model': args.model,
+        'model_checksum': predictor.model_checksum,
+        'device': str(predictor.device),
+        'config': predictor.config,
+        'esm_format': args.format,
+        'esm': esm_file,
+        'gnn': 'gnn.pt',
+        'alphabet': alphabet_spec(predictor.alphabet),
+    }
+    with open(os.path.join(args.output, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+    max_diff = verify(predictor, args.output)
+    print(f"导出完成: {args.output}，与eager模型的最大概率偏差: {max_diff:.2e}")
+    if max_diff > 1e-3:
+        print("警告: 偏差过大，导出结果可能不正确")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# backend/gunicorn.conf.py
+"""
+多进程部署配置: 主进程预加载 app(模型只加载一次并移入共享内存)，worker 通过 fork 继承
+仅适用于CPU推理，CUDA上下文不能在fork后继续使用
+
+用法(在 backend 目录下):
+    gunicorn -c gunicorn.conf.py app:app
+"""
+import os
+
+# app.py 据此把权重移入共享内存，并且不在主进程恢复异步任务
+os.environ.setdefault('SHARED_WEIGHTS', '1')
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 4))
+# 同一worker内的并发请求由 MicroBatcher 合批
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 300))
+preload_app = True
+
+
+def on_starting(server):
+    # 主进程 fork 之前初始化(建表、导入历史结果、加载模型并移入共享内存)
+    from app import startup
+
+    startup()
+
+
+def when_ready(server):
+    from utils.shared_memory import memory_usage_mb
+
+    usage = memory_usage_mb()
+    server.log.info(f"主进程内存: RSS={usage['rss']:.0f}MB")
+
+
+def pre_fork(server, worker):
+    from utils.shared_memory import freeze_gc
+
+    freeze_gc()
+
+
+def post_fork(server, worker):
+    import torch
+
+    # 各worker平分CPU核，避免线程数超过核数
+    threads_per_worker = int(os.environ.get('CPU_THREADS', 0)) or max(1, (os.cpu_count() or 1) // workers)
+    torch.set_num_threads(threads_per_worker)
+
+    # 每个worker各自监视模型注册目录，激活版本变化时热替换
+    from app import start_model_watcher
+    start_model_watcher()
+
+    # 上次退出时未完成的异步任务只在第一个启动的worker中恢复
+    if worker.age == 1:
+        from app import job_manager
+        count = job_manager.resume_pending()
+        server.log.info(f"worker {worker.pid} 恢复了 {count} 个未完成的预测任务")
+
+
+def post_worker_init(worker):
+    from utils.shared_memory import memory_usage_mb
+
+    usage = memory_usage_mb()
+    worker.log.info(f"worker {worker.pid} 内存: RSS={usage['rss']:.0f}MB PSS={usage['pss']:.0f}MB "
+                    f"私有={usage['uss']:.0f}MB 共享={usage['shared']:.0f}MB")
@@ -0,0 +1,186 @@
+# backend/jobs.py
+import os
+import time
+import uuid
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from database import get_db_connection
+from predict_fasta import iter_fasta, stream_predictions
+from prediction_store import delete_job, save_predictions_stream
+
+# 任务状态
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+
+_live_managers = weakref.WeakSet()
+
+
+def _recreate_executors_after_fork():
+    # fork 出的子进程不会继承线程池中的线程，需要重新创建
+    for manager in list(_live_managers):
+        manager._create_executor()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_recreate_executors_after_fork)
+
+
+def count_fasta_records(path):
+    """用与预测相同的 iter_fasta 统计记录数(跳过没有序列的空记录)，用于计算进度"""
+    count = 0
+    with open(path, 'rb') as f:
+        for _ in iter_fasta(f):
+            count += 1
+    return count
+
+
+class JobManager:
+    """
+    FASTA异步预测任务管理: 提交后立即返回任务ID，由本地线程池执行预测
+    任务状态保存在SQLite中，重启后未完成的任务会被重新执行
+    注意: 执行任务的进程崩溃(如gunicorn worker被杀)时，任务会停留在 running 状态，
+    直到下次服务启动时由 resume_pending 重新排队；运行期间不会自动接管其他进程的任务
+
+    Args:
+        get_predictor: 返回当前 ProteinPredictor 的函数(每个任务开始时调用一次)
+        upload_folder: 上传文件的保存目录(任务执行完之前需要保留)
+        results_folder: 导出CSV的目录
+        max_workers: 并行执行的任务数
+        progress_interval: 进度写入数据库的最小间隔(秒)
+    """
+
+    def __init__(self, get_predictor, upload_folder, results_folder, max_workers=1, progress_interval=1.0):
+        self.get_predictor = get_predictor
+        self.upload_folder = upload_folder
+        self.results_folder = results_folder
+        self.progress_interval = progress_interval
+        self.max_workers = max_workers
+        self._create_executor()
+        _live_managers.add(self)
+
+    def _create_executor(self):
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='prediction-job')
+
+    def submit(self, file_storage, orig_filename):
+        """保存上传文件并排队，返回任务ID"""
+        task_id = uuid.uuid4().hex
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        job = f"{timestamp}_{orig_filename}.csv"
+        input_path = os.path.join(self.upload_folder, f"{task_id}.fasta")
+        file_storage.save(input_path)
+
+        conn = get_db_connection()
+        try:
+            conn.execute(
+                "INSERT INTO prediction_tasks (id, job, input_path, status, created_at) VALUES (?, ?, ?, ?, ?)",
+                (task_id, job, input_path, QUEUED, datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+        self._executor.submit(self._run, task_id)
+        return task_id
+
+    def resume_pending(self):
+        """
+        重新排队上次进程退出时尚未完成的任务(queued 以及进程崩溃后遗留的 running)，返回数量
+        只应在服务启动、还没有任何进程执行任务时调用一次(见 app.startup 和 gunicorn.conf.py)
+        """
+        conn = get_db_connection()
+        try:
+            rows = conn.execute(
+                "SELECT id FROM prediction_tasks WHERE status IN (?, ?) ORDER BY created_at",
+                (QUEUED, RUNNING)
+            ).fetchall()
+        finally:
+            conn.close()
+
+        for row in rows:
+            self._executor.submit(self._run, row['id'])
+        return len(rows)
+
+    def get(self, task_id):
+        """返回任务状态字典，不存在时返回None"""
+        conn = get_db_connection()
+        try:
+            row = conn.execute("SELECT * FROM prediction_tasks WHERE id = ?", (task_id,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+
+        status = {
+            'job_id': row['id'],
+            'filename': row['job'],
+            'status': row['status'],
+            'done': row['done_records'],
+            'total': row['total_records'],
+            'error': row['error'],
+            'created_time': row['created_at'],
+            'elapsed_seconds': None,
+            'eta_seconds': None,
+        }
+
+        if row['started_at'] is not None:
+            end = row['finished_at'] if row['finished_at'] is not None else time.time()
+            elapsed = end - row['started_at']
+            status['elapsed_seconds'] = round(elapsed, 1)
+            done, total = row['done_records'], row['total_records']
+            if row['status'] == RUNNING and done and total:
+                status['eta_seconds'] = round(elapsed / done * (total - done), 1)
+        return status
+
+    def _update(self, task_id, **fields):
+        assignments = ', '.join(f"{key} = ?" for key in fields)
+        conn = get_db_connection()
+        try:
+            conn.execute(f"UPDATE prediction_tasks SET {assignments} WHERE id = ?",
+                         tuple(fields.values()) + (task_id,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _run(self, task_id):
+        conn = get_db_connection()
+        try:
+            row = conn.execute("SELECT * FROM prediction_tasks WHERE id = ?", (task_id,)).fetchone()
+        finally:
+            conn.close()
+        if row is None or row['status'] not in (QUEUED, RUNNING):
+            return
+
+        job, input_path = row['job'], row['input_path']
+        try:
+            # 中断后重跑时清掉上次写入的部分结果
+            delete_job(job)
+
+            total = count_fasta_records(input_path)
+            self._update(task_id, status=RUNNING, total_records=total, done_records=0,
+                         started_at=time.time(), finished_at=None, error=None)
+
+            predictor = self.get_predictor()
+            result_path = os.path.join(self.results_folder, job)
+            done = 0
+            last_update = time.monotonic()
+            with open(input_path, 'r') as handle:
+                stream = stream_predictions(predictor, iter_fasta(handle), output_path=result_path)
+                # 结果分批写入数据库，轮询时即可读取部分结果
+                for _ in save_predictions_stream(job, 'fasta', stream, flush_rows=500):
+                    done += 1
+                    if time.monotonic() - last_update >= self.progress_interval:
+                        self._update(task_id, done_records=done)
+                        last_update = time.monotonic()
+
+            # 预测时跳过的记录(如无效序列)不计入，完成时以实际处理数为准，进度为100%
+            self._update(task_id, status=COMPLETED, done_records=done, total_records=done,
+                         finished_at=time.time())
+            os.remove(input_path)
+
+        except Exception as e:
+            print(f"预测任务 {task_id} 失败：{str(e)}")
+            self._update(task_id, status=FAILED, error=str(e), finished_at=time.time())
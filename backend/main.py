@@ -2,7 +2,6 @@ from flask import Flask, request, jsonify, send_from_directory
 import os
 import pandas as pd
 from werkzeug.utils import secure_filename
-import uuid
 from datetime import datetime
 import re
 from pathlib import Path
@@ -14,6 +13,10 @@ from database import init_db
 
 # 导入预测模块
 from predict_seq import ProteinPredictor
+from predict_fasta import iter_fasta, stream_predictions
+from jobs import JobManager
+from prediction_store import get_job_results
+from utils.result_index import ResultIndexCache, remove_result_index
 
 # 初始化Flask应用
 app = Flask(__name__)
@@ -22,7 +25,9 @@ app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = './uploads'
 app.config['RESULTS_FOLDER'] = './results'
 app.config['ALLOWED_EXTENSIONS'] = {'fasta', 'txt'}
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 限制上传大小为16MB
+# 上传大小上限(默认8GB)，FASTA按流式解析，不受此大小限制内存。注意 werkzeug 会先把 multipart 上传
+# 写入临时文件(TMPDIR)再交给视图函数，临时目录需要有足够的磁盘空间
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_UPLOAD_MB', 8192)) * 1024 * 1024
 
 # 确保上传和结果目录存在
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
@@ -35,6 +40,13 @@ init_db()
 MODEL_PATH = 'models/best_model.pt'
 predictor = ProteinPredictor(MODEL_PATH)
 
+# 结果CSV旁路索引缓存
+result_index_cache = ResultIndexCache()
+
+# 异步FASTA预测任务，恢复上次未完成的任务
+job_manager = JobManager(lambda: predictor, app.config['UPLOAD_FOLDER'], app.config['RESULTS_FOLDER'])
+job_manager.resume_pending()
+
 
 def allowed_file(filename):
     return '.' in filename and \
@@ -119,61 +131,30 @@ def predict():
             return jsonify({'error': '未选择文件'}), 400
 
         if file and allowed_file(file.filename):
-            # 生成安全的文件名
-            original_filename = secure_filename(file.filename)
-            filename = f"{uuid.uuid4().hex}_{original_filename}"
-            file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(file_path)
+            # async=1 时立即返回任务ID，由后台线程池执行
+            if request.args.get('async', type=int):
+                job_id = job_manager.submit(file, secure_filename(file.filename))
+                return jsonify({'job_id': job_id, 'status_url': f'/jobs/{job_id}'}), 202
 
-            # 解析FASTA文件并预测
-            results = []
-            try:
-                with open(file_path, 'r') as f:
-                    current_id = None
-                    current_seq = ""
-
-                    for line in f:
-                        line = line.strip()
-                        if not line:
-                            continue
-
-                        if line.startswith('>'):
-                            # 处理上一个序列(如果存在)
-                            if current_id and current_seq:
-                                sequence_results = predictor.predict(current_seq)
-                                results.extend(sequence_results)
-
-                            # 提取新的蛋白质ID
-                            header_match = re.match(r'>(\S+)', line)
-                            current_id = header_match.group(1) if header_match else f"SEQ_{len(results) + 1}"
-                            current_seq = ""
-                        else:
-                            current_seq += line
-
-                    # 处理最后一个序列
-                    if current_id and current_seq:
-                        sequence_results = predictor.predict(current_seq)
-                        results.extend(sequence_results)
-
-            except Exception as e:
-                return jsonify({'error': f'FASTA文件解析错误: {str(e)}'}), 400
-
-            # 保存结果到CSV
-            if results:
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                result_filename = f"prediction_{timestamp}.csv"
-                result_path = os.path.join(app.config['RESULTS_FOLDER'], result_filename)
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            result_filename = f"prediction_{timestamp}.csv"
+            result_path = os.path.join(app.config['RESULTS_FOLDER'], result_filename)
 
-                # 将结果转换为DataFrame并保存
-                df = pd.DataFrame(results)
-                df.to_csv(result_path, index=False)
+            # 直接从上传流中逐条解析FASTA，按长度分桶批量预测，结果增量写入CSV
+            results = []
+            for protein_id, sequence_results in stream_predictions(predictor, iter_fasta(file.stream),
+                                                                   output_path=result_path):
+                results.extend(sequence_results)
 
+            if results:
                 return jsonify({
                     'message': '预测成功',
                     'filename': result_filename,
                     'results': results
                 })
             else:
+                os.remove(result_path)
+                remove_result_index(result_path)
                 return jsonify({'error': '无法从文件中提取有效序列'}), 400
         else:
             return jsonify({'error': '不支持的文件类型'}), 400
@@ -182,6 +163,46 @@ def predict():
         return jsonify({'error': f'预测过程错误：{str(e)}'}), 500
 
 
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    # 验证令牌
+    user_info, error_response, error_code = verify_auth_token()
+    if error_response:
+        return error_response, error_code
+
+    status = job_manager.get(job_id)
+    if status is None:
+        return jsonify({'error': '任务不存在'}), 404
+    return jsonify(status)
+
+
+@app.route('/jobs/<job_id>/results', methods=['GET'])
+def get_job_result(job_id):
+    try:
+        # 验证令牌
+        user_info, error_response, error_code = verify_auth_token()
+        if error_response:
+            return error_response, error_code
+
+        status = job_manager.get(job_id)
+        if status is None:
+            return jsonify({'error': '任务不存在'}), 404
+
+        # 任务未完成时返回已写入的部分结果
+        page = request.args.get('page', 1, type=int)
+        page_size = request.args.get('page_size', None, type=int)
+        results, total = get_job_results(status['filename'], page, page_size)
+        return jsonify({
+            'status': status['status'],
+            'filename': status['filename'],
+            'total': total,
+            'results': results or []
+        })
+
+    except Exception as e:
+        return jsonify({'error': f'读取结果失败：{str(e)}'}), 500
+
+
 @app.route('/predict/sequence', methods=['POST'])
 def predict_sequence():
     try:
@@ -288,6 +309,8 @@ def delete_result(filename):
 
         # 删除文件
         os.remove(file_path)
+        remove_result_index(file_path)
+        result_index_cache.invalidate(file_path)
         return jsonify({'message': '文件已成功删除'}), 200
     except Exception as e:
         return jsonify({'error': f'删除失败：{str(e)}'}), 500
@@ -396,15 +419,14 @@ def get_protein(protein_id):
         if not os.path.exists(file_path):
             return jsonify({'error': '找不到结果文件'}), 404
 
-        # 读取CSV查找特定蛋白质序列
-        df = pd.read_csv(file_path)
-        protein_data = df[df['protein_id'] == protein_id]
+        # 通过旁路索引只读取该蛋白质所在的行
+        protein_data = result_index_cache.lookup(file_path, protein_id)
 
-        if protein_data.empty:
+        if not protein_data:
             return jsonify({'error': '找不到指定蛋白质'}), 404
 
         # 提取序列数据
-        sequence = protein_data['sequence'].iloc[0] if 'sequence' in protein_data.columns else None
+        sequence = protein_data[0].get('sequence')
 
         return jsonify({
             'protein_id': protein_id,
@@ -0,0 +1,213 @@
+# backend/model_registry.py
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from utils.result_cache import file_checksum
+
+try:
+    import fcntl
+except ImportError:  # Windows 上没有 fcntl，只有进程内的线程锁
+    fcntl = None
+
+MANIFEST_FILE = 'registry.json'
+LOCK_FILE = '.lock'
+
+
+class ModelRegistry:
+    """
+    版本化的模型权重目录:
+        <root>/registry.json   {"active": "v2", "versions": {"v1": {...}, "v2": {...}}}
+        <root>/v1.pt, v1.json  权重文件及其模型配置(models.config 的sidecar)
+    登记时复制权重并记录sha256，加载时校验，已登记的版本不会被修改
+    修改清单(登记/激活)时持有注册目录上的文件锁，gunicorn 的多个worker和命令行可以同时使用
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self):
+        # flock 在同一进程的不同文件描述符之间也互斥，线程锁只是避免同一进程内的线程空等文件锁
+        with self._lock:
+            os.makedirs(self.root, exist_ok=True)
+            with open(os.path.join(self.root, LOCK_FILE), 'a') as f:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _manifest_path(self):
+        return os.path.join(self.root, MANIFEST_FILE)
+
+    def _read(self):
+        path = self._manifest_path()
+        if not os.path.exists(path):
+            return {'active': None, 'versions': {}}
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def _write(self, manifest):
+        # 先写临时文件再替换，其他进程不会读到写了一半的清单
+        tmp_path = f"{self._manifest_path()}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self._manifest_path())
+
+    def list_versions(self):
+        manifest = self._read()
+        return [dict(record, active=(version == manifest['active']))
+                for version, record in manifest['versions'].items()]
+
+    def active_version(self):
+        return self._read()['active']
+
+    def _copy(self, src, dst):
+        # 复制到临时文件再替换，其他进程校验时不会读到复制了一半的权重
+        tmp_path = f"{dst}.{os.getpid()}.tmp"
+        shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dst)
+
+    def _register(self, manifest, model_path, version, activate, note):
+        from models.config import config_path_for
+
+        if version is None:
+            version = f"v{len(manifest['versions']) + 1}"
+        if version in manifest['versions']:
+            raise ValueError(f"模型版本已存在: {version}")
+
+        filename = f"{version}.pt"
+        self._copy(model_path, os.path.join(self.root, filename))
+        if os.path.exists(config_path_for(model_path)):
+            self._copy(config_path_for(model_path), config_path_for(os.path.join(self.root, filename)))
+
+        record = {
+            'version': version,
+            'file': filename,
+            'checksum': file_checksum(os.path.join(self.root, filename)),
+            'source': model_path,
+            'note': note,
+            'registered_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        manifest['versions'][version] = record
+        if activate or manifest['active'] is None:
+            manifest['active'] = version
+        self._write(manifest)
+        return record
+
+    def register(self, model_path, version=None, activate=False, note=None):
+        """复制权重(及同名的配置json)到注册目录，返回版本记录"""
+        with self._locked():
+            return self._register(self._read(), model_path, version, activate, note)
+
+    def register_initial(self, model_path, note=None):
+        """还没有激活版本时把 model_path 登记为第一个版本(多个进程同时调用只登记一次)"""
+        with self._locked():
+            manifest = self._read()
+            if manifest['active'] is None:
+                self._register(manifest, model_path, None, True, note)
+
+    def activate(self, version):
+        with self._locked():
+            manifest = self._read()
+            if version not in manifest['versions']:
+                raise KeyError(f"模型版本不存在: {version}")
+            manifest['active'] = version
+            self._write(manifest)
+
+    def resolve(self, version=None):
+        """返回 (版本记录, 权重路径)，默认取当前激活版本；校验和不一致时抛出 ValueError"""
+        manifest = self._read()
+        version = version or manifest['active']
+        if version not in manifest['versions']:
+            raise KeyError(f"模型版本不存在: {version}")
+        record = manifest['versions'][version]
+        path = os.path.join(self.root, record['file'])
+        if file_checksum(path) != record['checksum']:
+            raise ValueError(f"模型版本 {version} 的权重文件校验和不一致")
+        return record, path
+
+
+class RegistryWatcher:
+    """
+    定期检查注册目录中的激活版本，变化时在轮询线程中调用 on_change(新版本)
+    启动后的第一次检查总会调用一次 on_change，由回调判断是否与正在使用的版本相同；
+    on_change 返回 False 或抛出异常时视为失败，下次轮询继续重试该版本
+    """
+
+    def __init__(self, registry, on_change, interval=5.0):
+        self.registry = registry
+        self.on_change = on_change
+        self.interval = interval
+        self._last = None
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name='model-watcher', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                version = self.registry.active_version()
+            except (OSError, ValueError) as e:
+                print(f"读取模型注册信息失败：{str(e)}")
+                continue
+            if version is None or version == self._last:
+                continue
+            try:
+                succeeded = self.on_change(version)
+            except Exception as e:
+                print(f"切换到模型版本 {version} 时出错：{str(e)}")
+                succeeded = False
+            if succeeded is False:
+                print(f"模型版本 {version} 切换失败，{self.interval}秒后重试")
+                continue
+            self._last = version
+
+
+def main():
+    parser = argparse.ArgumentParser(description='模型版本管理')
+    parser.add_argument('--root', type=str, default='models/registry', help='模型注册目录')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    register_parser = subparsers.add_parser('register', help='登记新的模型权重')
+    register_parser.add_argument('model', type=str, help='权重文件路径')
+    register_parser.add_argument('--version', type=str, default=None, help='版本名，默认自动编号')
+    register_parser.add_argument('--note', type=str, default=None, help='备注')
+    register_parser.add_argument('--activate', action='store_true', help='登记后立即激活')
+
+    activate_parser = subparsers.add_parser('activate', help='切换激活版本(运行中的服务会自动热替换)')
+    activate_parser.add_argument('version', type=str, help='版本名')
+
+    subparsers.add_parser('list', help='列出所有版本')
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.root)
+    if args.command == 'register':
+        record = registry.register(args.model, args.version, args.activate, args.note)
+        print(f"已登记 {record['version']} (sha256 {record['checksum'][:12]})")
+    elif args.command == 'activate':
+        registry.activate(args.version)
+        print(f"已激活 {args.version}")
+    else:
+        for record in registry.list_versions():
+            mark = '*' if record['active'] else ' '
+            print(f"{mark} {record['version']:<8} {record['checksum'][:12]} {record['registered_at']} "
+                  f"{record['note'] or ''}")
+
+
+if __name__ == "__main__":
+    main()
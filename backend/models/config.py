@@ -0,0 +1,45 @@
+import copy
+import json
+import os
+
+# 与 best_model.pt 对应的默认模型配置
+DEFAULT_MODEL_CONFIG = {
+    'esm_model': 'esm2_t6_8M_UR50D',
+    'esm_layer': 6,
+    'input_dim': 320,
+    'hidden_dim': 128,
+    'output_dim': 8,  # GO slim类别数
+    'max_length': 1000,
+    # 超过 max_length 的序列如何处理(best_model.pt 是在截断的输入上训练的，默认保持截断):
+    #   'truncate' 直接截断
+    #   'window'   按 max_length 切分为重叠窗口分段嵌入，重叠部分取平均后拼回全长，
+    #              需要在模型配置sidecar中指定(服务端也可用环境变量 LONG_SEQUENCE 覆盖)
+    'long_sequence': 'truncate',
+    'window_overlap': 250,
+    'windows_per_batch': 8,  # 每次ESM前向最多包含的窗口数，决定长序列的峰值显存
+    # 残基图构建方式，预测与数据集预处理必须一致:
+    #   {'type': 'chain'}                                   相邻残基(默认)
+    #   {'type': 'window', 'k': 3}                          序列距离 <= k
+    #   {'type': 'knn', 'k': 10, 'source': 'embedding'}     ESM嵌入相似度kNN
+    #   {'type': 'knn', 'k': 10, 'source': 'contact'}       ESM接触图kNN
+    'graph': {'type': 'chain'},
+}
+
+
+def config_path_for(model_path):
+    """模型配置保存在权重文件旁边: best_model.pt -> best_model.json"""
+    return os.path.splitext(model_path)[0] + '.json'
+
+
+def load_model_config(model_path=None):
+    """读取权重文件旁的配置(如果存在)，并用默认值补全缺失字段"""
+    config = copy.deepcopy(DEFAULT_MODEL_CONFIG)
+    if model_path is not None and os.path.exists(config_path_for(model_path)):
+        with open(config_path_for(model_path), 'r') as f:
+            config.update(json.load(f))
+    return config
+
+
+def save_model_config(config, model_path):
+    with open(config_path_for(model_path), 'w') as f:
+        json.dump(config, f, indent=2, ensure_ascii=False)
@@ -0,0 +1,94 @@
+import json
+import os
+
+import torch
+from predict_base import BasePredictor
+from utils.cpu_inference import configure_threads
+
+MANIFEST_FILE = 'manifest.json'
+
+
+class ArtifactPredictor(BasePredictor):
+    """
+    只加载导出产物(export_model.py)的预测器，不需要 esm / torch_geometric(kNN建图除外)
+    ESM编码器为 TorchScript 或 ONNX，GNN为 TorchScript，接口与 ProteinPredictor 相同
+
+    Args:
+        artifact_dir: 导出目录(包含 manifest.json)
+        device: 推理设备，默认使用导出时的设备(trace结果会记录设备，跨设备运行不保证正确)
+    """
+
+    def __init__(self, artifact_dir, device=None, embedding_cache=None, result_cache=None,
+                 num_threads=None, num_interop_threads=None, model_version=None):
+        with open(os.path.join(artifact_dir, MANIFEST_FILE), 'r') as f:
+            manifest = json.load(f)
+        super().__init__(manifest['config'], device=device or manifest['device'],
+                         embedding_cache=embedding_cache, result_cache=result_cache, model_version=model_version)
+
+        if self.graph_builder.needs_contacts:
+            raise ValueError("导出的ESM编码器不输出接触图，不支持 contact kNN 建图")
+        if self.device.type == 'cpu':
+            threads, interop_threads = configure_threads(num_threads, num_interop_threads)
+            print(f"CPU线程数: intra-op={threads}, inter-op={interop_threads}")
+
+        # ESM字母表(代替 esm.Alphabet 的 batch_converter)
+        alphabet = manifest['alphabet']
+        self.tok_to_idx = alphabet['tok_to_idx']
+        self.padding_idx = alphabet['padding_idx']
+        self.cls_idx = alphabet['cls_idx']
+        self.eos_idx = alphabet['eos_idx']
+        self.unk_idx = alphabet['unk_idx']
+        self.prepend_bos = alphabet['prepend_bos']
+        self.append_eos = alphabet['append_eos']
+
+        self.esm_format = manifest['esm_format']
+        esm_path = os.path.join(artifact_dir, manifest['esm'])
+        if self.esm_format == 'onnx':
+            try:
+                import onnxruntime
+            except ImportError:
+                raise ImportError("加载ONNX格式的ESM编码器需要安装 onnxruntime")
+            providers = ['CPUExecutionProvider']
+            if self.device.type == 'cuda':
+                providers.insert(0, 'CUDAExecutionProvider')
+            self.esm_session = onnxruntime.InferenceSession(esm_path, providers=providers)
+        else:
+            self.esm_encoder = torch.jit.load(esm_path, map_location=self.device)
+            self.esm_encoder.eval()
+
+        self.gnn = torch.jit.load(os.path.join(artifact_dir, manifest['gnn']), map_location=self.device)
+        self.gnn.eval()
+
+        self._set_cache_scope(manifest['model_checksum'], self.esm_format)
+        print(f"已加载导出模型: {artifact_dir} (ESM: {self.esm_format}, GNN: torchscript)")
+
+    def _tokenize(self, sequences):
+        """与 esm 的 BatchConverter 相同: <cls> + 残基 + <eos>，右侧用 <pad> 补齐"""
+        extra = int(self.prepend_bos) + int(self.append_eos)
+        tokens = torch.full((len(sequences), max(len(seq) for seq in sequences) + extra),
+                            self.padding_idx, dtype=torch.long)
+        for i, seq in enumerate(sequences):
+            ids = [self.tok_to_idx.get(aa, self.unk_idx) for aa in seq]
+            if self.prepend_bos:
+                ids.insert(0, self.cls_idx)
+            if self.append_eos:
+                ids.append(self.eos_idx)
+            tokens[i, :len(ids)] = torch.tensor(ids, dtype=torch.long)
+        return tokens
+
+    def _esm_forward(self, sequences):
+        tokens = self._tokenize(sequences)
+        offset = int(self.prepend_bos)
+        with torch.inference_mode():
+            if self.esm_format == 'onnx':
+                representations = torch.from_numpy(self.esm_session.run(None, {'tokens': tokens.numpy()})[0])
+            else:
+                representations = self.esm_encoder(tokens.to(self.device))
+        return [representations[i, offset:len(seq) + offset].cpu() for i, seq in enumerate(sequences)]
+
+    def _gnn_logits(self, sequences, embeddings):
+        # 导出的GNN每次只处理一个图(见 export_model.GraphForward)
+        edges = self.graph_builder.build_local(sequences, embeddings)
+        logits = [self.gnn(emb.to(self.device), edge_index.to(self.device))
+                  for emb, edge_index in zip(embeddings, edges)]
+        return torch.cat(logits, dim=0)
@@ -0,0 +1,255 @@
+from datetime import datetime
+
+import torch
+from utils.graph_builders import CachedGraphBuilder, create_graph_builder
+from utils.shared_memory import share_modules
+from utils.sliding_window import contacts_windowed, embed_windowed
+
+
+class BasePredictor:
+    """
+    预测器公共部分: 缓存、长序列分段、按长度分批、结果格式化
+    不依赖 esm / torch_geometric，具体的ESM和GNN前向由子类实现:
+        _esm_forward(sequences)       -> 每条序列 [长度, 维度] 的CPU嵌入
+        _esm_contacts(sequences)      -> 每条序列 [长度, 长度] 的CPU接触图
+        _gnn_logits(sequences, embs)  -> [批大小, 类别数] 的logits
+    """
+
+    def __init__(self, config, device=None, embedding_cache=None, result_cache=None, model_version=None):
+        if device is None:
+            self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        else:
+            self.device = torch.device(device)
+
+        print(f"正在使用设备: {self.device}")
+
+        # 可选的ESM嵌入缓存(utils.embedding_cache.EmbeddingCache)
+        self.embedding_cache = embedding_cache
+        # 可选的预测结果缓存(utils.result_cache.ResultCache)，按 cache_scope(含模型权重校验和)区分
+        self.result_cache = result_cache
+
+        # 模型配置决定ESM模型、GNN维度和残基图构建方式
+        self.config = config
+        self.graph_builder = CachedGraphBuilder(create_graph_builder(self.config['graph']))
+        # 长序列处理方式: 滑动窗口分段嵌入或截断，窗口长度即 max_length
+        self.long_sequence = self.config['long_sequence']
+        self.window_size = self.config['max_length']
+        self.window_overlap = self.config['window_overlap']
+        self.windows_per_batch = self.config['windows_per_batch']
+
+        self.model_checksum = None
+        self.cache_scope = None
+        # 模型版本(model_registry 中的版本名)，写入每条预测结果；未指定时取权重校验和前缀
+        self.model_version = model_version
+
+        # GO slim映射（与预测结果对应）
+        self.go_categories = [
+            'protein_binding',
+            'dna_binding',
+            'catalytic',
+            'structural',
+            'transcription',
+            'signal',
+            'transport',
+            'enzyme_regulation'
+        ]
+
+    def _set_cache_scope(self, model_checksum, *variants):
+        """结果缓存的作用域: 同一份权重换了建图方式、长序列处理方式或推理后端，预测结果也会不同"""
+        self.model_checksum = model_checksum
+        self.cache_scope = ':'.join([model_checksum, self.graph_builder.name, self.long_sequence] + list(variants))
+        if self.model_version is None:
+            self.model_version = model_checksum[:12]
+
+    def _shareable_modules(self):
+        """可以移入共享内存的模型(子类覆盖)"""
+        return []
+
+    def share_memory(self):
+        """把模型权重移入共享内存，供 fork 出的 worker 共用(只适用于CPU推理)，返回共享的字节数"""
+        if self.device.type != 'cpu':
+            raise ValueError("共享内存权重只支持CPU推理(CUDA上下文不能跨fork使用)")
+        return share_modules(*self._shareable_modules())
+
+    def warmup(self, lengths=(64, 512)):
+        """用虚拟序列跑一次ESM + GNN前向(不经过嵌入/结果缓存)，触发内存分配器和算子的初始化"""
+        sequences = [('ACDEFGHIKLMNPQRSTVWY' * (n // 20 + 1))[:n] for n in lengths]
+        embeddings = self._esm_forward(sequences)
+        with torch.inference_mode():
+            self._gnn_logits(sequences, embeddings)
+        if self.device.type == 'cuda':
+            torch.cuda.synchronize()
+
+    def _esm_forward(self, sequences):
+        raise NotImplementedError
+
+    def _esm_contacts(self, sequences):
+        raise NotImplementedError
+
+    def _gnn_logits(self, sequences, embeddings):
+        raise NotImplementedError
+
+    def _clean_sequence(self, sequence, max_length=1000):
+        """验证和清理序列"""
+        sequence = sequence.strip().upper()
+        if self.long_sequence == 'truncate' and len(sequence) > max_length:
+            sequence = sequence[:max_length]
+        return sequence
+
+    def residue_count(self, length, max_length=1000):
+        """一条序列实际参与计算的残基数(截断模式下不超过 max_length)"""
+        if self.long_sequence == 'truncate':
+            return min(length, max_length)
+        return length
+
+    def _is_long(self, sequence):
+        return self.long_sequence == 'window' and len(sequence) > self.window_size
+
+    def embed_sequences(self, sequences):
+        """对已清理的序列做一次填充后的ESM前向，返回每条序列的残基级嵌入列表"""
+        # 生成ESM特征(已缓存的序列跳过ESM前向)
+        embeddings = [None] * len(sequences)
+        if self.embedding_cache is not None:
+            for i, seq in enumerate(sequences):
+                embeddings[i] = self.embedding_cache.get(seq)
+
+        missing = [i for i, emb in enumerate(embeddings) if emb is None]
+        # 超长序列单独按窗口分段嵌入，不参与整批填充
+        short = [i for i in missing if not self._is_long(sequences[i])]
+        if short:
+            for i, emb in zip(short, self._esm_forward([sequences[i] for i in short])):
+                embeddings[i] = emb
+        for i in missing:
+            if embeddings[i] is None:
+                embeddings[i] = embed_windowed(self._esm_forward, sequences[i], self.window_size,
+                                               self.window_overlap, self.windows_per_batch)
+
+        if self.embedding_cache is not None:
+            for i in missing:
+                self.embedding_cache.put(sequences[i], embeddings[i])
+
+        return embeddings
+
+    def predict_contacts(self, sequences):
+        """ESM预测的残基接触图(供 contact kNN 建图使用)，超长序列按窗口拼接"""
+        contacts = [None] * len(sequences)
+        short = [i for i, seq in enumerate(sequences) if not self._is_long(seq)]
+        if short:
+            for i, contact in zip(short, self._esm_contacts([sequences[i] for i in short])):
+                contacts[i] = contact
+        for i, seq in enumerate(sequences):
+            if contacts[i] is None:
+                contacts[i] = contacts_windowed(self._esm_contacts, seq, self.window_size,
+                                                self.window_overlap, self.windows_per_batch)
+        return contacts
+
+    def _contacts_fn(self, sequences):
+        return lambda indices: self.predict_contacts([sequences[i] for i in indices])
+
+    def predict_proba_batch(self, sequences, max_length=1000):
+        """一次ESM前向 + 一次GNN前向，返回 [批大小, 类别数] 的概率矩阵(CPU)"""
+        sequences = [self._clean_sequence(seq, max_length) for seq in sequences]
+
+        # 结果缓存命中的序列直接跳过两个模型
+        cached = [None] * len(sequences)
+        if self.result_cache is not None:
+            for i, seq in enumerate(sequences):
+                cached[i] = self.result_cache.get(seq, self.cache_scope)
+
+        missing = [i for i, probs in enumerate(cached) if probs is None]
+        if missing:
+            miss_sequences = [sequences[i] for i in missing]
+            embeddings = self.embed_sequences(miss_sequences)
+
+            with torch.inference_mode():
+                probs = torch.sigmoid(self._gnn_logits(miss_sequences, embeddings)).cpu()
+
+            for row, i in enumerate(missing):
+                cached[i] = probs[row]
+                if self.result_cache is not None:
+                    self.result_cache.put(sequences[i], self.cache_scope, probs[row])
+
+        return torch.stack(cached)
+
+    def format_predictions(self, sequence, probs, threshold=0.5, timestamp=None, prediction_id=None):
+        """把单条序列的概率向量转换为前端需要的格式"""
+        if timestamp is None:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        if prediction_id is None:
+            prediction_id = f"SEQ_{timestamp}"
+
+        results = []
+        for i, category in enumerate(self.go_categories):
+            if probs[i] > threshold:
+                results.append({
+                    'timestamp': timestamp,
+                    'protein_id': prediction_id,
+                    'sequence': sequence,
+                    'function': category,
+                    'confidence': float(probs[i]),
+                    'model_version': self.model_version
+                })
+
+        # 按置信度排序
+        results.sort(key=lambda x: x['confidence'], reverse=True)
+        return results
+
+    def _length_batches(self, items, max_tokens, max_length):
+        """按长度排序后切分批次，每批的填充后token数(最长序列+2 × 条数)不超过 max_tokens"""
+        order = sorted(range(len(items)), key=lambda i: self.residue_count(len(items[i][1]), max_length))
+        batches = []
+        current = []
+        longest = 0
+        for i in order:
+            tokens = self.residue_count(len(items[i][1]), max_length) + 2  # BOS/EOS
+            if current and max(longest, tokens) * (len(current) + 1) > max_tokens:
+                batches.append(current)
+                current = []
+                longest = 0
+            current.append(i)
+            longest = max(longest, tokens)
+        if current:
+            batches.append(current)
+        return batches
+
+    def predict_many(self, items, threshold=0.5, max_tokens=16000, bucket_size=1024, max_length=1000):
+        """
+        批量预测
+        Args:
+            items: (protein_id, sequence) 的可迭代对象
+            threshold: 预测阈值
+            max_tokens: 每个ESM批次填充后的token上限
+            bucket_size: 每次读取多少条输入做长度分桶，限制内存占用
+        Yields:
+            (protein_id, results)，顺序与输入一致，results 格式与 predict 相同
+        """
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        items = iter(items)
+        while True:
+            bucket = []
+            for pid, seq in items:
+                bucket.append((pid, seq))
+                if len(bucket) >= bucket_size:
+                    break
+            if not bucket:
+                return
+
+            # 桶内按长度分批，结果按原顺序回填
+            probs_by_index = [None] * len(bucket)
+            for batch_indices in self._length_batches(bucket, max_tokens, max_length):
+                probs = self.predict_proba_batch([bucket[i][1] for i in batch_indices], max_length)
+                for i, row in zip(batch_indices, probs):
+                    probs_by_index[i] = row
+
+            for (pid, seq), probs in zip(bucket, probs_by_index):
+                yield pid, self.format_predictions(seq, probs, threshold, timestamp, pid)
+
+    def predict(self, sequence, threshold=0.5):
+        """预测蛋白质功能并返回前端需要的格式"""
+        # 生成预测ID: SEQ_时间戳
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        prediction_id = f"SEQ_{timestamp}"
+
+        # 处理序列并预测
+        probs = self.predict_proba_batch([sequence])
+        return self.format_predictions(sequence, probs[0], threshold, timestamp, prediction_id)
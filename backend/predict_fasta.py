@@ -1,11 +1,10 @@
-import torch
+import csv
 import argparse
 from pathlib import Path
-from Bio import SeqIO
-import pandas as pd
-from models.multi_label_gnn import MultiLabelGNN
-from data.protein_dataset import ProteinGraphDataset
-from torch_geometric.loader import DataLoader
+from utils.result_index import build_result_index
+
+# torch / Bio / pandas / torch_geometric 只在命令行预测时按需导入，
+# app.py 等只用到流式解析和写结果的模块导入本文件时不需要加载它们
 
 def parse_args():
     parser = argparse.ArgumentParser(description='预测蛋白质序列的功能')
@@ -14,19 +13,102 @@ def parse_args():
     parser.add_argument('--output', type=str, default='predictions.csv', help='输出预测结果的文件路径')
     parser.add_argument('--batch_size', type=int, default=32, help='批处理大小')
     parser.add_argument('--threshold', type=float, default=0.5, help='预测阈值')
+    parser.add_argument('--streaming', action='store_true',
+                        help='流式模式: 逐条读取FASTA并增量写出结果，内存占用与文件大小无关')
+    parser.add_argument('--max_tokens', type=int, default=16000, help='每个ESM批次的token上限')
+    parser.add_argument('--device', type=str, default=None, help='流式模式下的推理设备(cuda/cpu)')
+    parser.add_argument('--quantize', action='store_true', help='流式模式下在CPU上启用int8动态量化')
+    parser.add_argument('--threads', type=int, default=None, help='流式模式下CPU推理的线程数')
+    parser.add_argument('--preprocess_workers', type=int, default=0,
+                        help='非流式模式下ESM预处理的CPU进程数(有多张GPU时自动每卡一个进程)')
+    parser.add_argument('--loader_workers', type=int, default=None,
+                        help='非流式模式下DataLoader的worker进程数，默认按CPU核数，0表示在主进程中加载')
+    parser.add_argument('--prefetch_factor', type=int, default=4, help='每个DataLoader worker预取的批次数')
+    parser.add_argument('--report_data_wait', action='store_true', help='报告每个批次等待数据的时间')
     return parser.parse_args()
 
 
 def load_fasta(fasta_file):
     """从FASTA文件加载序列"""
+    from Bio import SeqIO
+
     sequences = {}
     for record in SeqIO.parse(fasta_file, "fasta"):
         sequences[record.id] = str(record.seq)
     return sequences
 
 
+def iter_fasta(handle):
+    """
+    逐条解析FASTA，内存占用只与当前记录有关
+    Args:
+        handle: 按行迭代的文本或二进制流(文件对象、上传文件流等)
+    Yields:
+        (protein_id, sequence)，protein_id 取标题行第一个空白前的部分(与Bio.SeqIO一致)
+    """
+    current_id = None
+    parts = []
+    count = 0
+    for line in handle:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
+        line = line.strip()
+        if not line:
+            continue
+
+        if line.startswith('>'):
+            if current_id is not None and parts:
+                yield current_id, ''.join(parts)
+            count += 1
+            header = line[1:].split(None, 1)
+            current_id = header[0] if header else f"SEQ_{count}"
+            parts = []
+        elif current_id is not None:
+            parts.append(line)
+
+    if current_id is not None and parts:
+        yield current_id, ''.join(parts)
+
+
+RESULT_COLUMNS = ['timestamp', 'protein_id', 'sequence', 'function', 'confidence', 'model_version']
+
+
+def stream_predictions(predictor, records, output_path=None, threshold=0.5, max_tokens=16000,
+                       bucket_size=1024):
+    """
+    流式预测: 边读取记录边分批推理，结果逐条产出并增量写入CSV
+    峰值内存由 bucket_size / max_tokens 决定，与输入文件大小无关
+    Args:
+        records: (protein_id, sequence) 的可迭代对象，例如 iter_fasta(stream)
+    Yields:
+        (protein_id, results)
+    """
+    f = open(output_path, 'w', newline='') if output_path is not None else None
+    try:
+        writer = None
+        if f is not None:
+            writer = csv.DictWriter(f, fieldnames=RESULT_COLUMNS, extrasaction='ignore')
+            writer.writeheader()
+
+        for pid, protein_results in predictor.predict_many(records, threshold=threshold,
+                                                           max_tokens=max_tokens,
+                                                           bucket_size=bucket_size):
+            if writer is not None:
+                writer.writerows(protein_results)
+            yield pid, protein_results
+    finally:
+        if f is not None:
+            f.close()
+
+    if output_path is not None:
+        build_result_index(output_path)
+
+
 def predict_proteins(model, loader, device, threshold, sequences):
     """预测蛋白质功能"""
+    import torch
+    from data.loader import to_device
+
     model.eval()
     predictions = {}
     prediction_details = []
@@ -34,9 +116,13 @@ def predict_proteins(model, loader, device, threshold, sequences):
     from datetime import datetime
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
 
+    slim_categories = list(loader.dataset.go_slim_mapping.keys())
     with torch.no_grad(): #  关闭梯度
         for batch in loader:
-            batch = batch.to(device)
+            # 锁页内存中的批次异步拷贝到GPU
+            batch = to_device(batch, device)
+            # 分片存储的节点特征为float16，传输到设备后再转换，减少一半拷贝量
+            batch.x = batch.x.float()
             out = model(batch)
             probs = torch.sigmoid(out)
 
@@ -46,7 +132,7 @@ def predict_proteins(model, loader, device, threshold, sequences):
                 pred_functions = []
 
                 for idx in pred_indices:
-                    slim_category = list(loader.dataset.go_slim_mapping.keys())[idx.item()]
+                    slim_category = slim_categories[idx.item()]
                     confidence = probs[i][idx].item()
                     pred_functions.append((slim_category, confidence))
 
@@ -63,9 +149,40 @@ def predict_proteins(model, loader, device, threshold, sequences):
     return predictions, prediction_details
 
 
+def run_streaming(args):
+    """流式预测整个FASTA文件，不在内存中保留全部序列或结果"""
+    from predict_seq import ProteinPredictor
+
+    predictor = ProteinPredictor(args.model, device=args.device, quantize=args.quantize,
+                                 num_threads=args.threads)
+    print(f"流式预测FASTA文件: {args.fasta}")
+
+    count = 0
+    with open(args.fasta, 'r') as handle:
+        for _ in stream_predictions(predictor, iter_fasta(handle), args.output,
+                                    threshold=args.threshold, max_tokens=args.max_tokens):
+            count += 1
+            if count % 1000 == 0:
+                print(f"已预测 {count} 个蛋白质")
+
+    print(f"共预测 {count} 个蛋白质，结果已保存到: {args.output}")
+
+
 def main():
     args = parse_args()
 
+    import torch
+    import pandas as pd
+    from models.multi_label_gnn import MultiLabelGNN
+    from models.config import load_model_config
+    from data.protein_dataset import ProteinGraphDataset
+    from data.loader import create_loader
+    from utils.data_wait import DataWaitMonitor
+
+    if args.streaming:
+        run_streaming(args)
+        return
+
     print("正在初始化...")
     device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
 
@@ -90,6 +207,9 @@ def main():
         'enzyme_regulation'
     ]
 
+    # 模型配置决定ESM模型、GNN维度以及建图方式，保证与 predict_seq 一致
+    config = load_model_config(args.model)
+
     print("创建数据集...")
     dataset = ProteinGraphDataset(
         root=str(cache_dir),
@@ -97,30 +217,44 @@ def main():
         labels={pid: [0] * len(go_slim_categories) for pid in protein_ids},
         sequences=sequences,
         go_dict={cat: i for i, cat in enumerate(go_slim_categories)},
-        force_reprocess=True
+        feature_model=config['esm_model'],
+        esm_layer=config['esm_layer'],
+        max_length=config['max_length'],
+        force_reprocess=True,
+        graph_config=config['graph'],
+        long_sequence=config['long_sequence'],
+        window_overlap=config['window_overlap'],
+        windows_per_batch=config['windows_per_batch']
     )
 
     print("处理蛋白质序列...")
-    dataset.process()
+    dataset.process(num_workers=args.preprocess_workers, max_tokens=args.max_tokens)
 
-    loader = DataLoader(dataset, batch_size=args.batch_size, shuffle=False)
+    loader = create_loader(dataset, batch_size=args.batch_size, shuffle=False, device=device,
+                           num_workers=args.loader_workers, prefetch_factor=args.prefetch_factor)
+    if args.report_data_wait:
+        loader = DataWaitMonitor(loader, device)
 
     # 加载模型
     model = MultiLabelGNN(
-        input_dim=320,
-        hidden_dim=128,
+        input_dim=config['input_dim'],
+        hidden_dim=config['hidden_dim'],
         output_dim=len(go_slim_categories)
     ).to(device)
     model.load_state_dict(torch.load(args.model, map_location=device))
 
     print("开始预测...")
     predictions, prediction_details = predict_proteins(model, loader, device, args.threshold, sequences)
+    if args.report_data_wait:
+        print(loader.report())
 
     # 保存预测结果
     df = pd.DataFrame(prediction_details)
     # 确保列的顺序正确
     df = df[['timestamp', 'protein_id', 'sequence', 'function', 'confidence']]
     df.to_csv(args.output, index=False)
+    # 与流式输出一致，写完后立即生成旁路索引，服务端第一次查询时不必扫描整个CSV
+    build_result_index(args.output)
     print(f"预测结果已保存到: {args.output}")
 
     # 打印示例预测结果
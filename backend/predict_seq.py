@@ -1,34 +1,42 @@
-from datetime import datetime
-
 import torch
-from pathlib import Path
 from esm import pretrained
 from models.multi_label_gnn import MultiLabelGNN
-from torch_geometric.data import Data
-from torch_geometric.utils import to_undirected
-import json
-
-
-class ProteinPredictor:
-    def __init__(self, model_path, device=None):
-        if device is None:
-            self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-        else:
-            self.device = torch.device(device)
-
-        print(f"正在使用设备: {self.device}")
+from utils.result_cache import file_checksum
+from models.config import load_model_config
+from utils.cpu_inference import configure_threads, quantize_predictor_models
+from predict_base import BasePredictor
+from torch_geometric.data import Data, Batch
+
+
+class ProteinPredictor(BasePredictor):
+    def __init__(self, model_path, device=None, embedding_cache=None, result_cache=None, config=None,
+                 quantize=False, num_threads=None, num_interop_threads=None, model_version=None):
+        # 模型配置(默认读取权重文件旁的json)，决定ESM模型、GNN维度和残基图构建方式
+        config = config if config is not None else load_model_config(model_path)
+        super().__init__(config, device=device, embedding_cache=embedding_cache, result_cache=result_cache,
+                         model_version=model_version)
+
+        # CPU推理: 线程数与int8动态量化
+        if quantize and self.device.type != 'cpu':
+            raise ValueError("int8动态量化只支持CPU推理")
+        self.quantize = quantize
+        if self.device.type == 'cpu':
+            threads, interop_threads = configure_threads(num_threads, num_interop_threads)
+            print(f"CPU线程数: intra-op={threads}, inter-op={interop_threads}")
 
         # 初始化ESM模型
-        self.esm_model, self.alphabet = pretrained.load_model_and_alphabet("esm2_t6_8M_UR50D")
+        self.esm_model_name = self.config['esm_model']
+        self.esm_layer = self.config['esm_layer']
+        self.esm_model, self.alphabet = pretrained.load_model_and_alphabet(self.esm_model_name)
         self.esm_model = self.esm_model.to(self.device)
         self.esm_model.eval()
         self.batch_converter = self.alphabet.get_batch_converter()
 
         # 加载GNN模型
         self.model = MultiLabelGNN(
-            input_dim=320,
-            hidden_dim=128,
-            output_dim=8  # GO slim类别数
+            input_dim=self.config['input_dim'],
+            hidden_dim=self.config['hidden_dim'],
+            output_dim=self.config['output_dim']  # GO slim类别数
         ).to(self.device)
 
         # 加载模型权重
@@ -36,80 +44,68 @@ class ProteinPredictor:
         self.model.load_state_dict(state_dict)
         self.model.eval()
 
-        # GO slim映射（与预测结果对应）
-        self.go_categories = [
-            'protein_binding',
-            'dna_binding',
-            'catalytic',
-            'structural',
-            'transcription',
-            'signal',
-            'transport',
-            'enzyme_regulation'
-        ]
-
-    def _create_sequence_edges(self, seq_len):
-        src = torch.arange(0, seq_len - 1, dtype=torch.long)
-        dst = torch.arange(1, seq_len, dtype=torch.long)
-        return to_undirected(torch.stack([src, dst]))
+        if self.quantize:
+            self.esm_model, self.model = quantize_predictor_models(self.esm_model, self.model)
+            print("已启用int8动态量化(ESM线性层 + GNN输出MLP)")
+
+        self._set_cache_scope(file_checksum(model_path), *(['int8'] if self.quantize else []))
+
+    def _shareable_modules(self):
+        return [self.esm_model, self.model]
 
     def process_sequence(self, sequence, max_length=1000):
-        # 验证和清理序列
-        sequence = sequence.strip().upper()
-        if len(sequence) > max_length:
-            sequence = sequence[:max_length]
-
-        # 生成ESM特征
-        with torch.no_grad():
-            batch_labels, batch_strs, batch_tokens = self.batch_converter([("protein", sequence)])
-            batch_tokens = batch_tokens.to(self.device)
-            results = self.esm_model(batch_tokens, repr_layers=[6])
-            embeddings = results["representations"][6]
-            emb = embeddings[0, 1:len(sequence) + 1].cpu()
+        return self.process_batch([sequence], max_length=max_length)[0]
+
+    def process_batch(self, sequences, max_length=1000):
+        """将多条序列放入同一个填充后的ESM批次中，返回每条序列的图数据"""
+        sequences = [self._clean_sequence(seq, max_length) for seq in sequences]
+        embeddings = self.embed_sequences(sequences)
 
         # 创建图数据
-        edge_index = self._create_sequence_edges(len(sequence))
-        data = Data(
-            x=emb,
-            edge_index=edge_index,
-            seq=sequence
+        edges = self.graph_builder.build_local(sequences, embeddings, self._contacts_fn(sequences))
+        data_list = []
+        for seq, emb, edge_index in zip(sequences, embeddings, edges):
+            data_list.append(Data(
+                x=emb,
+                edge_index=edge_index,
+                seq=seq
+            ))
+        return data_list
+
+    def _esm_forward(self, sequences):
+        """一次填充后的ESM前向，返回每条序列的残基级嵌入(CPU)"""
+        with torch.inference_mode():
+            batch_labels, batch_strs, batch_tokens = self.batch_converter(
+                [(f"protein_{i}", seq) for i, seq in enumerate(sequences)]
+            )
+            batch_tokens = batch_tokens.to(self.device)
+            results = self.esm_model(batch_tokens, repr_layers=[self.esm_layer])
+            representations = results["representations"][self.esm_layer]
+        return [representations[i, 1:len(seq) + 1].cpu() for i, seq in enumerate(sequences)]
+
+    def _esm_contacts(self, sequences):
+        with torch.inference_mode():
+            _, _, batch_tokens = self.batch_converter(
+                [(f"protein_{i}", seq) for i, seq in enumerate(sequences)]
+            )
+            results = self.esm_model(batch_tokens.to(self.device), return_contacts=True)
+            contacts = results["contacts"]
+        return [contacts[i, :len(seq), :len(seq)].cpu() for i, seq in enumerate(sequences)]
+
+    def build_batch(self, sequences, embeddings):
+        """直接拼接节点特征并整批构建 edge_index(向量化偏移)，省去逐图建边和 collate"""
+        lengths = torch.tensor([emb.size(0) for emb in embeddings], dtype=torch.long)
+        return Batch(
+            x=torch.cat(embeddings, dim=0),
+            edge_index=self.graph_builder.build(sequences, embeddings, self._contacts_fn(sequences)),
+            batch=torch.repeat_interleave(torch.arange(len(embeddings)), lengths)
         )
-        return data
-
-    def predict(self, sequence, threshold=0.5):
-        """预测蛋白质功能并返回前端需要的格式"""
-        try:
-            # 生成预测ID: SEQ_时间戳_前6位序列
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            prediction_id = f"SEQ_{timestamp}"
-
-            # 处理序列并预测
-            data = self.process_sequence(sequence)
-            data = data.to(self.device)
-
-            self.model.eval()
-            with torch.no_grad():
-                out = self.model(data)
-                probs = torch.sigmoid(out)
-
-            # 生成预测结果
-            results = []
-            for i, category in enumerate(self.go_categories):
-                if probs[0][i] > threshold:
-                    results.append({
-                        'timestamp': timestamp,
-                        'protein_id': prediction_id,  # 使用新生成的ID
-                        'sequence': sequence,
-                        'function': category,
-                        'confidence': float(probs[0][i])
-                    })
-
-            # 按置信度排序
-            results.sort(key=lambda x: x['confidence'], reverse=True)
-            return results
-
-        except Exception as e:
-            raise e
+
+    def _gnn_logits(self, sequences, embeddings):
+        batch = self.build_batch(sequences, embeddings).to(self.device)
+        self.model.eval()
+        return self.model(batch)
+
 
 def main():
     # 测试代码
@@ -127,4 +123,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,237 @@
+# backend/prediction_store.py
+import argparse
+import csv
+import hashlib
+import os
+from datetime import datetime
+
+from database import get_db_connection, init_db
+
+
+def sequence_hash(sequence):
+    return hashlib.sha256(sequence.encode('utf-8')).hexdigest()
+
+
+def _now():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _get_or_create_job(cursor, job, source, created_at=None):
+    cursor.execute("SELECT id FROM prediction_jobs WHERE job = ?", (job,))
+    row = cursor.fetchone()
+    if row:
+        return row['id']
+    cursor.execute(
+        "INSERT INTO prediction_jobs (job, source, created_at) VALUES (?, ?, ?)",
+        (job, source, created_at or _now())
+    )
+    return cursor.lastrowid
+
+
+def save_predictions(job, source, results, created_at=None):
+    """
+    保存一批预测结果
+    Args:
+        job: 任务名(即前端使用的结果文件名)，已存在时追加到该任务
+        source: 'sequence' / 'fasta' / 'import'
+        results: 包含 timestamp/protein_id/sequence/function/confidence 的字典列表
+    Returns:
+        写入的记录数
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        job_id = _get_or_create_job(cursor, job, source, created_at)
+        count = _insert_predictions(cursor, job_id, results)
+        conn.commit()
+        return count
+    finally:
+        conn.close()
+
+
+def _insert_predictions(cursor, job_id, results):
+    """在当前事务中写入一批结果(不提交)，返回记录数"""
+    sequences = {}
+    rows = []
+    for r in results:
+        seq_hash = sequence_hash(r['sequence'])
+        sequences[seq_hash] = r['sequence']
+        rows.append((job_id, r['timestamp'], r['protein_id'], seq_hash,
+                     r['function'], float(r['confidence']), r.get('model_version') or None))
+
+    cursor.executemany(
+        "INSERT OR IGNORE INTO sequences (hash, sequence) VALUES (?, ?)",
+        sequences.items()
+    )
+    cursor.executemany(
+        "INSERT INTO predictions (job_id, timestamp, protein_id, sequence_hash, function, confidence, "
+        "model_version) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        rows
+    )
+    return len(rows)
+
+
+def save_predictions_stream(job, source, stream, flush_rows=5000):
+    """
+    透传 (protein_id, results) 流，同时每累计 flush_rows 条结果写入一次数据库
+    用于流式预测，避免把整个任务的结果保存在内存中
+    """
+    pending = []
+    for protein_id, protein_results in stream:
+        pending.extend(protein_results)
+        if len(pending) >= flush_rows:
+            save_predictions(job, source, pending)
+            pending = []
+        yield protein_id, protein_results
+    save_predictions(job, source, pending)
+
+
+def job_exists(job):
+    conn = get_db_connection()
+    try:
+        row = conn.execute("SELECT 1 FROM prediction_jobs WHERE job = ?", (job,)).fetchone()
+        return row is not None
+    finally:
+        conn.close()
+
+
+def list_jobs(page=None, page_size=None):
+    """按创建时间倒序列出任务，返回 (任务列表, 总数)"""
+    conn = get_db_connection()
+    try:
+        total = conn.execute("SELECT COUNT(*) FROM prediction_jobs").fetchone()[0]
+
+        sql = '''
+        SELECT j.job, j.source, j.created_at,
+               (SELECT COUNT(*) FROM predictions p WHERE p.job_id = j.id) AS record_count
+        FROM prediction_jobs j
+        ORDER BY j.created_at DESC, j.id DESC
+        '''
+        params = ()
+        if page_size:
+            sql += ' LIMIT ? OFFSET ?'
+            params = (page_size, (max(page or 1, 1) - 1) * page_size)
+
+        jobs = [{
+            'filename': row['job'],
+            'source': row['source'],
+            'created_time': row['created_at'],
+            'record_count': row['record_count'],
+            'size': f"{row['record_count']}条"
+        } for row in conn.execute(sql, params)]
+        return jobs, total
+    finally:
+        conn.close()
+
+
+_RESULT_COLUMNS = '''
+    p.timestamp, p.protein_id, s.sequence, p.function, p.confidence, p.model_version
+    FROM predictions p
+    JOIN prediction_jobs j ON j.id = p.job_id
+    JOIN sequences s ON s.hash = p.sequence_hash
+'''
+
+
+def get_job_results(job, page=None, page_size=None):
+    """返回 (结果列表, 总数)，任务不存在时返回 (None, 0)"""
+    conn = get_db_connection()
+    try:
+        row = conn.execute("SELECT id FROM prediction_jobs WHERE job = ?", (job,)).fetchone()
+        if row is None:
+            return None, 0
+        job_id = row['id']
+
+        total = conn.execute("SELECT COUNT(*) FROM predictions WHERE job_id = ?", (job_id,)).fetchone()[0]
+
+        sql = f"SELECT {_RESULT_COLUMNS} WHERE p.job_id = ? ORDER BY p.id"
+        params = (job_id,)
+        if page_size:
+            sql += ' LIMIT ? OFFSET ?'
+            params += (page_size, (max(page or 1, 1) - 1) * page_size)
+
+        return [dict(r) for r in conn.execute(sql, params)], total
+    finally:
+        conn.close()
+
+
+def get_protein_results(job, protein_id):
+    """按 (任务, 蛋白质ID) 走索引查询，任务不存在时返回None"""
+    conn = get_db_connection()
+    try:
+        if conn.execute("SELECT 1 FROM prediction_jobs WHERE job = ?", (job,)).fetchone() is None:
+            return None
+        sql = f"SELECT {_RESULT_COLUMNS} WHERE j.job = ? AND p.protein_id = ? ORDER BY p.confidence DESC"
+        return [dict(r) for r in conn.execute(sql, (job, protein_id))]
+    finally:
+        conn.close()
+
+
+def delete_job(job):
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute("DELETE FROM prediction_jobs WHERE job = ?", (job,))
+        conn.commit()
+        return cursor.rowcount > 0
+    finally:
+        conn.close()
+
+
+def import_results_csv(file_path, job=None, batch_size=5000):
+    """
+    把已有的预测结果CSV导入数据库，返回导入的记录数(任务已存在则跳过)
+    整个文件在一个写事务中导入: BEGIN IMMEDIATE 让并发的导入进程排队，拿到写锁后再检查任务是否存在，
+    中途失败会整体回滚，不会留下只导入了一部分的任务
+    """
+    job = job or os.path.basename(file_path)
+    if job_exists(job):
+        return 0
+
+    created_at = datetime.fromtimestamp(os.stat(file_path).st_mtime).strftime('%Y-%m-%d %H:%M:%S')
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        if cursor.execute("SELECT 1 FROM prediction_jobs WHERE job = ?", (job,)).fetchone() is not None:
+            conn.rollback()
+            return 0
+        job_id = _get_or_create_job(cursor, job, 'import', created_at)
+
+        imported = 0
+        with open(file_path, 'r', newline='') as f:
+            batch = []
+            for row in csv.DictReader(f):
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    imported += _insert_predictions(cursor, job_id, batch)
+                    batch = []
+            imported += _insert_predictions(cursor, job_id, batch)
+        conn.commit()
+        return imported
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def import_results_dir(folder):
+    """导入目录中的所有结果CSV"""
+    summary = {}
+    for filename in sorted(os.listdir(folder)):
+        if filename.endswith('.csv'):
+            summary[filename] = import_results_csv(os.path.join(folder, filename))
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='把历史预测结果CSV导入SQLite数据库')
+    parser.add_argument('--results_dir', type=str, default='static/results', help='结果CSV所在目录')
+    args = parser.parse_args()
+
+    init_db()
+    for filename, count in import_results_dir(args.results_dir).items():
+        print(f"{filename}: 导入 {count} 条记录")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+import argparse
+import copy
+import os
+import time
+
+import numpy as np
+import torch
+
+from data.loader import create_loader, to_device
+from data.protein_dataset import ProteinGraphDataset
+from models.config import DEFAULT_MODEL_CONFIG, save_model_config
+from model_registry import ModelRegistry
+from models.multi_label_gnn import MultiLabelGNN
+from utils.data_wait import DataWaitMonitor
+from utils.gaf_parser import build_go_label_matrix, load_sequences, read_filtered_gaf
+
+CHECKPOINT_FILE = 'last_checkpoint.pt'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='训练蛋白质功能预测模型(MultiLabelGNN)')
+    # 数据
+    parser.add_argument('--gaf', type=str, required=True, help='GO注释GAF文件(支持 .gz)')
+    parser.add_argument('--fasta', type=str, required=True, help='UniProt格式的蛋白质序列FASTA文件')
+    parser.add_argument('--root', type=str, default='data/train', help='数据集目录(预处理后的图、GAF缓存)')
+    parser.add_argument('--aspect', type=str, default='F', help='GO方面')
+    parser.add_argument('--min_samples', type=int, default=10, help='每个GO术语的最小样本数')
+    parser.add_argument('--max_samples', type=int, default=1000, help='每个GO术语的最大样本数')
+    parser.add_argument('--max_terms', type=int, default=1000, help='最大GO术语数量')
+    parser.add_argument('--val_split', type=float, default=0.1, help='验证集比例')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子(划分数据集与初始化)')
+    parser.add_argument('--preprocess_workers', type=int, default=0, help='ESM预处理的CPU进程数')
+    parser.add_argument('--max_tokens', type=int, default=16000, help='每个ESM批次的token上限')
+    parser.add_argument('--shard_dir', type=str, default=None, help='分片存储目录(不存在时在预处理后创建)')
+    # 模型
+    parser.add_argument('--hidden_dim', type=int, default=DEFAULT_MODEL_CONFIG['hidden_dim'], help='GNN隐藏层维度')
+    parser.add_argument('--long_sequence', type=str, default=DEFAULT_MODEL_CONFIG['long_sequence'],
+                        choices=['truncate', 'window'], help='超过最大长度的序列: 截断或滑动窗口分段嵌入(写入模型配置)')
+    # 训练
+    parser.add_argument('--epochs', type=int, default=50, help='训练轮数')
+    parser.add_argument('--batch_size', type=int, default=32, help='批大小')
+    parser.add_argument('--accum_steps', type=int, default=1, help='梯度累积步数(等效批大小 = batch_size × accum_steps)')
+    parser.add_argument('--lr', type=float, default=1e-3, help='学习率')
+    parser.add_argument('--weight_decay', type=float, default=1e-4, help='权重衰减')
+    parser.add_argument('--precision', type=str, default='fp32', choices=['fp32', 'fp16', 'bf16'],
+                        help='混合精度(只在GPU上生效，CPU上使用fp32)')
+    parser.add_argument('--device', type=str, default=None, help='训练设备，默认有GPU用GPU')
+    parser.add_argument('--loader_workers', type=int, default=None, help='DataLoader的worker进程数')
+    parser.add_argument('--prefetch_factor', type=int, default=4, help='每个DataLoader worker预取的批次数')
+    parser.add_argument('--report_data_wait', action='store_true', help='每轮报告等待数据的时间')
+    # 保存与恢复
+    parser.add_argument('--output', type=str, default='models/trained/best_model.pt',
+                        help='最佳模型权重(与预测代码兼容)，不会覆盖服务正在使用的 models/best_model.pt')
+    parser.add_argument('--register', action='store_true', help='训练结束后把最佳模型登记为模型注册目录中的新版本')
+    parser.add_argument('--registry_dir', type=str, default='models/registry', help='模型注册目录')
+    parser.add_argument('--activate', action='store_true', help='登记后立即激活(运行中的服务会热替换)')
+    parser.add_argument('--checkpoint_dir', type=str, default='models/checkpoints', help='训练状态保存目录')
+    parser.add_argument('--resume', type=str, default=None,
+                        help='从训练状态恢复: 检查点文件路径，或 "auto" 使用 checkpoint_dir 中的最新状态')
+    return parser.parse_args()
+
+
+def resolve_precision(precision, device):
+    """返回 (autocast数据类型或None, 是否需要GradScaler)；CPU或不支持bf16的GPU回退到fp32"""
+    if precision == 'fp32':
+        return None, False
+    if device.type != 'cuda':
+        print(f"CPU上不使用 {precision} 混合精度，回退到fp32")
+        return None, False
+    if precision == 'bf16':
+        if not torch.cuda.is_bf16_supported():
+            print("当前GPU不支持bf16，回退到fp32")
+            return None, False
+        return torch.bfloat16, False
+    return torch.float16, True
+
+
+def build_dataset(args, config):
+    """GAF -> 标签矩阵 -> ProteinGraphDataset(只预处理缺失的蛋白质)"""
+    gaf_df = read_filtered_gaf(args.gaf, args.aspect, cache_dir=os.path.join(args.root, 'gaf_cache'))
+    labels, protein_ids, go_to_idx, _ = build_go_label_matrix(
+        gaf_df, args.aspect, args.min_samples, args.max_samples, args.max_terms)
+
+    # 只保留有序列的蛋白质(过短的序列预处理时会被跳过，这里一并去掉)
+    sequences = load_sequences(args.fasta)
+    rows = [i for i, pid in enumerate(protein_ids) if len(sequences.get(pid, '')) >= 4]
+    protein_ids = [protein_ids[i] for i in rows]
+    print(f"有注释且有序列的蛋白质: {len(protein_ids)}")
+
+    dataset = ProteinGraphDataset(
+        root=args.root,
+        protein_ids=protein_ids,
+        labels=labels[rows],
+        sequences=sequences,
+        go_dict=go_to_idx,
+        feature_model=config['esm_model'],
+        esm_layer=config['esm_layer'],
+        max_length=config['max_length'],
+        graph_config=config['graph'],
+        long_sequence=config['long_sequence'],
+        window_overlap=config['window_overlap'],
+        windows_per_batch=config['windows_per_batch'],
+        shard_dir=args.shard_dir
+    )
+    dataset.process(num_workers=args.preprocess_workers, max_tokens=args.max_tokens)
+    if args.shard_dir and dataset.graph_store is None:
+        dataset.build_graph_store(args.shard_dir)
+    return dataset
+
+
+def split_dataset(dataset, val_split, seed):
+    order = np.random.default_rng(seed).permutation(len(dataset))
+    num_val = int(len(dataset) * val_split)
+    if num_val == 0:
+        # 没有验证集时验证损失恒为0，无法判断哪一轮是最佳模型
+        raise ValueError(f"验证集为空(数据集 {len(dataset)} 个，--val_split {val_split})，请增大 --val_split 或数据量")
+    # index_select 返回浅拷贝，训练集和验证集的 training 标志互不影响
+    train_dataset = dataset.index_select(order[num_val:].tolist()).train(True)
+    val_dataset = dataset.index_select(order[:num_val].tolist()).train(False)
+    return train_dataset, val_dataset
+
+
+def train_epoch(model, loader, optimizer, scaler, criterion, device, autocast_dtype, accum_steps):
+    model.train()
+    total_loss = 0.0
+    graphs = 0
+    residues = 0
+    optimizer.zero_grad(set_to_none=True)
+    for step, batch in enumerate(loader, start=1):
+        batch = to_device(batch, device)
+        batch.x = batch.x.float()
+        with torch.autocast(device.type, dtype=autocast_dtype, enabled=autocast_dtype is not None):
+            out = model(batch)
+            loss = criterion(out.float(), batch.y.view(out.size(0), -1))
+
+        # 梯度累积: 每 accum_steps 个批次(以及最后一批)更新一次
+        scaler.scale(loss / accum_steps).backward()
+        if step % accum_steps == 0 or step == len(loader):
+            scaler.unscale_(optimizer)
+            torch.nn.utils.clip_grad_norm_(model.parameters(), max_norm=1.0)
+            scaler.step(optimizer)
+            scaler.update()
+            optimizer.zero_grad(set_to_none=True)
+
+        total_loss += loss.item() * batch.num_graphs
+        graphs += batch.num_graphs
+        residues += batch.num_nodes
+    return total_loss / max(graphs, 1), graphs, residues
+
+
+def evaluate(model, loader, criterion, device, autocast_dtype, threshold=0.5):
+    """返回 (验证损失, micro F1)"""
+    model.eval()
+    total_loss = 0.0
+    graphs = 0
+    tp = fp = fn = 0
+    with torch.no_grad():
+        for batch in loader:
+            batch = to_device(batch, device)
+            batch.x = batch.x.float()
+            with torch.autocast(device.type, dtype=autocast_dtype, enabled=autocast_dtype is not None):
+                out = model(batch).float()
+            target = batch.y.view(out.size(0), -1)
+            total_loss += criterion(out, target).item() * batch.num_graphs
+            graphs += batch.num_graphs
+
+            pred = torch.sigmoid(out) > threshold
+            truth = target > 0.5
+            tp += (pred & truth).sum().item()
+            fp += (pred & ~truth).sum().item()
+            fn += (~pred & truth).sum().item()
+    f1 = 2 * tp / (2 * tp + fp + fn) if tp else 0.0
+    return total_loss / max(graphs, 1), f1
+
+
+def save_checkpoint(path, model, optimizer, scaler, scheduler, epoch, best_val_loss, config):
+    """完整训练状态，先写临时文件再替换，保存中断不会损坏上一个检查点"""
+    tmp_path = f"{path}.tmp"
+    torch.save({
+        'epoch': epoch,
+        'model': model.state_dict(),
+        'optimizer': optimizer.state_dict(),
+        'scaler': scaler.state_dict(),
+        'scheduler': scheduler.state_dict(),
+        'best_val_loss': best_val_loss,
+        'config': config,
+    }, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def save_best_model(model, config, output_path):
+    """只保存 state_dict(与 predict_seq / predict_fasta 加载方式一致)，并写入同名的模型配置"""
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    tmp_path = f"{output_path}.tmp"
+    torch.save(model.state_dict(), tmp_path)
+    os.replace(tmp_path, output_path)
+    save_model_config(config, output_path)
+
+
+def main():
+    args = parse_args()
+    torch.manual_seed(args.seed)
+    device = torch.device(args.device or ('cuda' if torch.cuda.is_available() else 'cpu'))
+    autocast_dtype, use_scaler = resolve_precision(args.precision, device)
+    print(f"训练设备: {device}，精度: {autocast_dtype or 'fp32'}")
+
+    config = copy.deepcopy(DEFAULT_MODEL_CONFIG)
+    config['hidden_dim'] = args.hidden_dim
+    config['long_sequence'] = args.long_sequence
+
+    dataset = build_dataset(args, config)
+    config['output_dim'] = dataset.num_classes
+    train_dataset, val_dataset = split_dataset(dataset, args.val_split, args.seed)
+    print(f"训练集: {len(train_dataset)}，验证集: {len(val_dataset)}")
+    if len(train_dataset) < args.batch_size:
+        raise ValueError(f"训练集({len(train_dataset)})小于批大小({args.batch_size})，请减小 --batch_size")
+
+    # 丢弃最后不满的批次: 只剩一个图时 BatchNorm 无法计算批统计量
+    train_loader = create_loader(train_dataset, batch_size=args.batch_size, shuffle=True, device=device,
+                                 num_workers=args.loader_workers, prefetch_factor=args.prefetch_factor,
+                                 drop_last=True)
+    val_loader = create_loader(val_dataset, batch_size=args.batch_size, shuffle=False, device=device,
+                               num_workers=args.loader_workers, prefetch_factor=args.prefetch_factor)
+
+    model = MultiLabelGNN(
+        input_dim=config['input_dim'],
+        hidden_dim=config['hidden_dim'],
+        output_dim=config['output_dim']
+    ).to(device)
+    criterion = torch.nn.BCEWithLogitsLoss()
+    optimizer = torch.optim.AdamW(model.parameters(), lr=args.lr, weight_decay=args.weight_decay)
+    scheduler = torch.optim.lr_scheduler.ReduceLROnPlateau(optimizer, mode='min', factor=0.5, patience=3)
+    scaler = torch.cuda.amp.GradScaler(enabled=use_scaler)
+
+    # 恢复训练状态
+    os.makedirs(args.checkpoint_dir, exist_ok=True)
+    checkpoint_path = os.path.join(args.checkpoint_dir, CHECKPOINT_FILE)
+    start_epoch = 1
+    best_val_loss = float('inf')
+    resume_path = checkpoint_path if args.resume == 'auto' else args.resume
+    if resume_path and os.path.exists(resume_path):
+        state = torch.load(resume_path, map_location=device)
+        if state['config'] != config:
+            raise ValueError("检查点的模型配置与当前参数不一致，无法恢复")
+        model.load_state_dict(state['model'])
+        optimizer.load_state_dict(state['optimizer'])
+        scaler.load_state_dict(state['scaler'])
+        scheduler.load_state_dict(state['scheduler'])
+        start_epoch = state['epoch'] + 1
+        best_val_loss = state['best_val_loss']
+        print(f"从 {resume_path} 恢复，继续第 {start_epoch} 轮(最佳验证损失 {best_val_loss:.4f})")
+    elif args.resume and args.resume != 'auto':
+        raise FileNotFoundError(f"检查点不存在: {resume_path}")
+
+    for epoch in range(start_epoch, args.epochs + 1):
+        loader = DataWaitMonitor(train_loader, device) if args.report_data_wait else train_loader
+        start = time.perf_counter()
+        train_loss, graphs, residues = train_epoch(model, loader, optimizer, scaler, criterion, device,
+                                                   autocast_dtype, args.accum_steps)
+        elapsed = time.perf_counter() - start
+        val_loss, val_f1 = evaluate(model, val_loader, criterion, device, autocast_dtype)
+        scheduler.step(val_loss)
+
+        print(f"第 {epoch}/{args.epochs} 轮: 训练损失 {train_loss:.4f}，验证损失 {val_loss:.4f}，"
+              f"验证 micro-F1 {val_f1:.4f} | {elapsed:.1f}s，{graphs / elapsed:.0f} 图/秒，"
+              f"{residues / elapsed:.0f} 残基/秒，学习率 {optimizer.param_groups[0]['lr']:.2e}")
+        if args.report_data_wait:
+            print(loader.report())
+
+        if val_loss < best_val_loss:
+            best_val_loss = val_loss
+            save_best_model(model, config, args.output)
+            print(f"验证损失下降，已保存最佳模型到 {args.output}")
+        save_checkpoint(checkpoint_path, model, optimizer, scaler, scheduler, epoch, best_val_loss, config)
+
+    print(f"训练完成，最佳验证损失 {best_val_loss:.4f}")
+
+    if args.register and os.path.exists(args.output):
+        record = ModelRegistry(args.registry_dir).register(args.output, activate=args.activate,
+                                                           note=f"train.py 验证损失 {best_val_loss:.4f}")
+        print(f"已登记为模型版本 {record['version']}" + ("并激活" if args.activate else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+import torch
+import torch.nn as nn
+
+
+def configure_threads(num_threads=None, num_interop_threads=None):
+    """
+    设置CPU推理的线程数: num_threads 为单个算子内部的并行线程(intra-op)，
+    num_interop_threads 为算子之间的并行线程(inter-op)
+    inter-op 线程池在进程内第一次并行计算后就不能再修改，此时保留原值
+    """
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    if num_interop_threads:
+        try:
+            torch.set_num_interop_threads(num_interop_threads)
+        except RuntimeError:
+            print(f"inter-op 线程数已初始化为 {torch.get_num_interop_threads()}，忽略设置 {num_interop_threads}")
+    return torch.get_num_threads(), torch.get_num_interop_threads()
+
+
+def quantize_linear_int8(module):
+    """把模块中的 nn.Linear 替换为动态int8量化版本(权重int8，激活按批动态量化)，仅支持CPU"""
+    return torch.ao.quantization.quantize_dynamic(module, {nn.Linear}, dtype=torch.qint8)
+
+
+def quantize_predictor_models(esm_model, gnn_model):
+    """
+    ESM-2 的注意力投影和前馈层都是 nn.Linear，整体量化
+    GNN 中 GATConv 使用 torch_geometric 自己的线性层，只量化输出MLP
+    """
+    esm_model = quantize_linear_int8(esm_model)
+    gnn_model.mlp = quantize_linear_int8(gnn_model.mlp)
+    return esm_model, gnn_model
@@ -0,0 +1,79 @@
+import time
+
+
+class DataWaitMonitor:
+    """
+    包装任意可迭代的数据加载器，统计每个批次计算方(GPU/CPU)空等数据的时间
+        等待时间: 请求下一个批次到拿到批次之间的时间
+        计算时间: 拿到批次到请求下一个批次之间的时间(循环体)
+    GPU上的计算是异步的，传入 device 时在每个批次结束时同步一次，计算时间才准确(会略微降低吞吐)
+
+    用法:
+        monitor = DataWaitMonitor(loader, device)
+        for batch in monitor:
+            ...
+        print(monitor.report())
+    """
+
+    def __init__(self, loader, device=None):
+        self.loader = loader
+        self.device = device
+        self._sync_cuda = device is not None and str(device).startswith('cuda')
+        self.wait_times = []
+        self.compute_times = []
+
+    def _synchronize(self):
+        if self._sync_cuda:
+            import torch
+            torch.cuda.synchronize(self.device)
+
+    def __iter__(self):
+        iterator = iter(self.loader)
+        while True:
+            start = time.perf_counter()
+            try:
+                batch = next(iterator)
+            except StopIteration:
+                return
+            fetched = time.perf_counter()
+            self.wait_times.append(fetched - start)
+            yield batch
+            self._synchronize()
+            self.compute_times.append(time.perf_counter() - fetched)
+
+    def __len__(self):
+        return len(self.loader)
+
+    def __getattr__(self, name):
+        # dataset 等其他属性直接转给被包装的加载器
+        return getattr(self.loader, name)
+
+    @staticmethod
+    def _percentile(values, q):
+        if not values:
+            return 0.0
+        values = sorted(values)
+        return values[min(len(values) - 1, int(round((len(values) - 1) * q / 100.0)))]
+
+    def summary(self):
+        total_wait = sum(self.wait_times)
+        total_compute = sum(self.compute_times)
+        total = total_wait + total_compute
+        batches = len(self.wait_times)
+        return {
+            'batches': batches,
+            'wait_seconds': total_wait,
+            'compute_seconds': total_compute,
+            'idle_fraction': total_wait / total if total > 0 else 0.0,
+            'wait_ms_mean': total_wait / batches * 1000 if batches else 0.0,
+            'wait_ms_p50': self._percentile(self.wait_times, 50) * 1000,
+            'wait_ms_p99': self._percentile(self.wait_times, 99) * 1000,
+            # 第一个批次包含worker启动时间，单独列出
+            'first_wait_ms': self.wait_times[0] * 1000 if batches else 0.0,
+        }
+
+    def report(self):
+        s = self.summary()
+        return (f"数据等待: {s['batches']} 个批次，空等 {s['wait_seconds']:.2f}s / 计算 {s['compute_seconds']:.2f}s "
+                f"(空闲占比 {s['idle_fraction']:.1%})，每批等待 平均 {s['wait_ms_mean']:.1f}ms "
+                f"p50 {s['wait_ms_p50']:.1f}ms p99 {s['wait_ms_p99']:.1f}ms，首批 {s['first_wait_ms']:.0f}ms")
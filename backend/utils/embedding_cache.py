@@ -0,0 +1,186 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import torch
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+def embedding_cache_name(config, quantized=False):
+    """
+    由模型配置生成缓存名(缓存键的前缀)。同一条序列的嵌入还取决于表示层、是否量化，
+    以及窗口模式下的窗口长度和重叠，这些设置不同的模型不能共用磁盘缓存中的条目
+    """
+    name = f"{config['esm_model']}-L{config['esm_layer']}"
+    if config['long_sequence'] == 'window':
+        name += f"-w{config['max_length']}o{config['window_overlap']}"
+    if quantized:
+        name += '-int8'
+    return name
+
+
+class EmbeddingCache:
+    """
+    按内容寻址的ESM嵌入两级缓存
+    - 内存层: 按字节数限制大小的LRU，保存float32张量
+    - 磁盘层(可选): 追加写入的float16分片文件，读取时通过内存映射切片
+
+    缓存键为 sha256(缓存名 + 规范化后的序列)，调用方需要传入已经 strip/upper/截断 后的序列，
+    缓存名用 embedding_cache_name 由模型配置生成。
+    磁盘层在类Unix系统上用文件锁串行化写入，多个worker进程可以共用同一目录；
+    其他进程新写入的条目在重启前不可见(只会多算一次ESM)。
+    """
+
+    INDEX_FILE = 'index.tsv'
+    LOCK_FILE = 'write.lock'
+
+    def __init__(self, model_name, max_memory_bytes=256 * 1024 * 1024, disk_dir=None,
+                 shard_bytes=64 * 1024 * 1024):
+        self.model_name = model_name
+        self.max_memory_bytes = max_memory_bytes
+        self.disk_dir = disk_dir
+        self.shard_bytes = shard_bytes
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+
+        # 统计计数
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # 磁盘层: key -> (分片号, 元素偏移, 行数, 维度)
+        self._disk_index = {}
+        self._shard_maps = {}
+        self._current_shard = 0
+        if disk_dir is not None:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._load_disk_index()
+
+    def make_key(self, sequence):
+        return hashlib.sha256(f"{self.model_name}:{sequence}".encode('utf-8')).hexdigest()
+
+    def get(self, sequence):
+        """命中返回 [序列长度, 维度] 的float32张量，否则返回None"""
+        key = self.make_key(sequence)
+        with self._lock:
+            emb = self._memory.get(key)
+            if emb is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return emb
+
+            emb = self._read_disk(key)
+            if emb is not None:
+                self.disk_hits += 1
+                self._put_memory(key, emb)
+                return emb
+
+            self.misses += 1
+            return None
+
+    def put(self, sequence, emb):
+        key = self.make_key(sequence)
+        emb = emb.detach().to('cpu', dtype=torch.float32).clone()  # 不持有整个批次张量的视图
+        with self._lock:
+            self._put_memory(key, emb)
+            if self.disk_dir is not None and key not in self._disk_index:
+                self._write_disk(key, emb)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_bytes,
+                'disk_entries': len(self._disk_index),
+            }
+
+    def _put_memory(self, key, emb):
+        nbytes = emb.numel() * emb.element_size()
+        if nbytes > self.max_memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= old.numel() * old.element_size()
+        self._memory[key] = emb
+        self._memory_bytes += nbytes
+
+        # 淘汰最久未使用的条目
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.numel() * evicted.element_size()
+            self.evictions += 1
+
+    def _shard_path(self, shard):
+        return os.path.join(self.disk_dir, f'shard_{shard:05d}.f16')
+
+    def _load_disk_index(self):
+        index_path = os.path.join(self.disk_dir, self.INDEX_FILE)
+        if not os.path.exists(index_path):
+            return
+        with open(index_path, 'r') as f:
+            for line in f:
+                parts = line.rstrip('\n').split('\t')
+                if len(parts) != 5:
+                    continue  # 写入中断留下的残行
+                key, shard, offset, rows, dim = parts
+                self._disk_index[key] = (int(shard), int(offset), int(rows), int(dim))
+                self._current_shard = max(self._current_shard, int(shard))
+
+    def _read_disk(self, key):
+        if self.disk_dir is None or key not in self._disk_index:
+            return None
+        shard, offset, rows, dim = self._disk_index[key]
+        end = offset + rows * dim
+
+        shard_map = self._shard_maps.get(shard)
+        if shard_map is None or shard_map.shape[0] < end:
+            # 分片在映射之后又被追加过，重新映射
+            shard_map = np.memmap(self._shard_path(shard), dtype=np.float16, mode='r')
+            self._shard_maps[shard] = shard_map
+
+        values = np.array(shard_map[offset:end], dtype=np.float32)
+        return torch.from_numpy(values).view(rows, dim)
+
+    def _write_disk(self, key, emb):
+        if fcntl is None:
+            self._append_disk(key, emb)
+            return
+        with open(os.path.join(self.disk_dir, self.LOCK_FILE), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self._append_disk(key, emb)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _append_disk(self, key, emb):
+        path = self._shard_path(self._current_shard)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size >= self.shard_bytes:
+            self._current_shard += 1
+            path = self._shard_path(self._current_shard)
+            size = 0
+
+        data = emb.numpy().astype(np.float16)
+        with open(path, 'ab') as f:
+            f.write(data.tobytes())
+
+        rows, dim = data.shape
+        offset = size // 2  # float16 每个元素2字节
+        with open(os.path.join(self.disk_dir, self.INDEX_FILE), 'a') as f:
+            f.write(f'{key}\t{self._current_shard}\t{offset}\t{rows}\t{dim}\n')
+        self._disk_index[key] = (self._current_shard, offset, rows, dim)
@@ -1,46 +1,197 @@
+import hashlib
+import json
+import os
+import time
+
 import pandas as pd
 import numpy as np
 from Bio import SeqIO
-from collections import defaultdict
 from pathlib import Path
 
-
-def parse_goa_gaf(file_path): # 解析GAF文件
+# GAF 2.2官方列定义
+GAF_COLUMNS = [
+    'DB', 'DB_Object_ID', 'DB_Object_Symbol', 'Qualifier',
+    'GO_ID', 'DB_Reference', 'Evidence_Code', 'With_From',
+    'Aspect', 'DB_Object_Name', 'DB_Object_Synonym', 'DB_Object_Type',
+    'Taxon', 'Date', 'Assigned_By', 'Annotation_Extension', 'Gene_Product_Form_ID'
+]
+# 只读取必要列
+GAF_USECOLS = ['DB_Object_ID', 'GO_ID', 'Evidence_Code', 'Aspect', 'Taxon']
+# 类型优化
+GAF_DTYPES = {
+    'DB': 'category',
+    'DB_Object_ID': 'string',
+    'GO_ID': 'string',
+    'Evidence_Code': 'category',
+    'Aspect': 'category',
+    'Taxon': 'string'
+}
+
+# 注释过滤条件: 人类蛋白质，排除不可靠的证据代码
+HUMAN_TAXON = 'taxon:9606'
+UNRELIABLE_EVIDENCE_CODES = ['IEA', 'NAS', 'ND', 'NR']
+GAF_CACHE_VERSION = 1
+
+
+def parse_goa_gaf(file_path, chunksize=None): # 解析GAF文件
     """
-    解析从GO官网下载的GAF 2.2格式文件
+    解析从GO官网下载的GAF 2.2格式文件(支持 .gz 压缩)
     https://current.geneontology.org/products/pages/downloads.html
+    指定 chunksize 时返回按块读取的迭代器
     """
-    # GAF 2.2官方列定义
-    columns = [
-        'DB', 'DB_Object_ID', 'DB_Object_Symbol', 'Qualifier',
-        'GO_ID', 'DB_Reference', 'Evidence_Code', 'With_From',
-        'Aspect', 'DB_Object_Name', 'DB_Object_Synonym', 'DB_Object_Type',
-        'Taxon', 'Date', 'Assigned_By', 'Annotation_Extension', 'Gene_Product_Form_ID'
-    ]
-
-    # 类型优化
-    dtype_spec = {
-        'DB': 'category',
-        'DB_Object_ID': 'string',
-        'GO_ID': 'string',
-        'Evidence_Code': 'category',
-        'Aspect': 'category',
-        'Taxon': 'string'
-    }
-
-    # 只读取必要列
     return pd.read_csv(
         file_path,
         sep='\t',
         comment='!',
         header=None,
-        names=columns,
-        dtype=dtype_spec,
-        usecols=['DB_Object_ID', 'GO_ID', 'Evidence_Code', 'Aspect', 'Taxon'],
-        low_memory=False
+        names=GAF_COLUMNS,
+        dtype=GAF_DTYPES,
+        usecols=GAF_USECOLS,
+        low_memory=False,
+        chunksize=chunksize
     )
 
 
+def filter_annotations(gaf_df, aspect='F'):
+    """按物种(人类)、证据代码和GO方面过滤注释"""
+    # 仅保留人类蛋白质(不同的Taxon取值很少，只对去重后的取值做字符串匹配；缺失值编码为-1，对应末尾的False)
+    taxon_codes, taxon_uniques = pd.factorize(gaf_df['Taxon'])
+    is_human = pd.Series(np.asarray(taxon_uniques, dtype=object)).str.contains(HUMAN_TAXON).to_numpy(dtype=bool)
+    human_filter = np.append(is_human, False)[taxon_codes]
+
+    # 排除不可靠的证据代码
+    evidence_filter = ~gaf_df['Evidence_Code'].isin(UNRELIABLE_EVIDENCE_CODES)
+
+    # 选择特定GO方面
+    aspect_filter = (gaf_df['Aspect'] == aspect)
+
+    return gaf_df[human_filter & evidence_filter & aspect_filter]
+
+
+def _gaf_cache_path(file_path, aspect, cache_dir):
+    """缓存文件名: 源文件sha256 + 过滤条件的摘要，源文件或过滤条件变化时自动失效"""
+    from utils.result_cache import file_checksum
+
+    conditions = json.dumps([aspect, HUMAN_TAXON, UNRELIABLE_EVIDENCE_CODES, GAF_CACHE_VERSION])
+    condition_key = hashlib.sha256(conditions.encode('utf-8')).hexdigest()[:8]
+    return os.path.join(cache_dir, f"{file_checksum(file_path)[:16]}_{aspect}_{condition_key}.npz")
+
+
+def _save_gaf_cache(filtered, cache_path):
+    """按列保存为整数编码 + 去重取值(定长unicode)，不需要pickle"""
+    arrays = {}
+    for column in GAF_USECOLS:
+        codes, uniques = pd.factorize(filtered[column])
+        arrays[f'{column}_codes'] = codes.astype(np.int32)
+        arrays[f'{column}_values'] = np.asarray(uniques, dtype=str)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, cache_path)
+
+
+def _load_gaf_cache(cache_path):
+    with np.load(cache_path) as arrays:
+        return pd.DataFrame({
+            column: pd.Categorical.from_codes(arrays[f'{column}_codes'], categories=arrays[f'{column}_values'])
+            for column in GAF_USECOLS
+        })
+
+
+def read_filtered_gaf(file_path, aspect='F', chunksize=1_000_000, cache_dir=None):
+    """
+    分块读取GAF，每块读完立即按物种/证据代码/GO方面过滤，峰值内存只与过滤后的大小和块大小有关
+    指定 cache_dir 时把过滤结果保存为列式npz缓存(按源文件哈希)，再次运行时直接加载
+    Returns:
+        过滤后的数据框(列同 parse_goa_gaf，可直接传给 build_go_labels / build_go_label_matrix)
+    """
+    cache_path = None
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        cache_path = _gaf_cache_path(file_path, aspect, cache_dir)
+        if os.path.exists(cache_path):
+            start = time.perf_counter()
+            filtered = _load_gaf_cache(cache_path)
+            print(f"从缓存加载 {len(filtered)} 条注释: {cache_path} ({time.perf_counter() - start:.1f}s)")
+            return filtered
+
+    start = time.perf_counter()
+    total_rows = 0
+    chunks = []
+    for chunk in parse_goa_gaf(file_path, chunksize=chunksize):
+        total_rows += len(chunk)
+        chunks.append(filter_annotations(chunk, aspect))
+    if chunks:
+        filtered = pd.concat(chunks, ignore_index=True)
+    else:
+        filtered = pd.DataFrame({column: pd.Series(dtype='string') for column in GAF_USECOLS})
+    print(f"读取 {total_rows} 条注释，过滤后保留 {len(filtered)} 条 ({time.perf_counter() - start:.1f}s)")
+
+    if cache_path is not None:
+        _save_gaf_cache(filtered, cache_path)
+    return filtered
+
+
+def build_go_label_matrix(gaf_df, aspect='F', min_samples=10, max_samples=1000, max_terms=1000):
+    """
+    向量化构建 蛋白质 × GO术语 的稀疏标签矩阵
+    蛋白质和GO术语先转换为整数编码，(蛋白质, 术语) 对去重后用 bincount 统计每个术语的蛋白质数，
+    全程没有逐行的Python循环
+    Args:
+        与 build_go_labels 相同
+    Returns:
+        labels: scipy.sparse.csr_matrix [蛋白质数, 术语数] float32
+        protein_ids: 与矩阵行对应的UniProt ID列表(按在GAF中首次出现的顺序)
+        go_to_idx: dict, GO ID到列索引的映射(按GO ID排序)
+        term_counts: [(GO ID, 注释蛋白质数), ...]，按注释数从多到少
+    """
+    from scipy.sparse import csr_matrix
+
+    # 1. 数据过滤
+    filtered = filter_annotations(gaf_df, aspect)
+
+    # 2. 整数编码并对 (蛋白质, 术语) 去重；去掉 DB 前缀只需在去重后的ID上做一次
+    object_codes, object_uniques = pd.factorize(filtered['DB_Object_ID'])
+    uniprot_ids = pd.Series(np.asarray(object_uniques, dtype=object)).str.rsplit(':', n=1).str[-1]
+    uniprot_codes, protein_uniques = pd.factorize(uniprot_ids)
+    protein_codes = uniprot_codes[object_codes]
+    go_codes, go_uniques = pd.factorize(filtered['GO_ID'])
+    protein_uniques = np.asarray(protein_uniques, dtype=object)
+    go_uniques = np.asarray(go_uniques, dtype=object)
+    num_terms = len(go_uniques)
+    pairs = np.unique(protein_codes.astype(np.int64) * num_terms + go_codes)
+    pair_proteins = pairs // num_terms if num_terms else pairs
+    pair_terms = pairs % num_terms if num_terms else pairs
+
+    # 3. 统计GO术语频率(注释了该术语的蛋白质数)
+    go_counts = np.bincount(pair_terms, minlength=num_terms)
+
+    # 4. 选择合适的GO术语: 频率在范围内，按频率从高到低(同频按GO ID)取前 max_terms 个
+    candidates = np.flatnonzero((go_counts >= min_samples) & (go_counts <= max_samples))
+    order = np.lexsort((go_uniques[candidates].astype(str), -go_counts[candidates]))
+    selected = candidates[order][:max_terms]
+    term_counts = [(go_uniques[code], int(go_counts[code])) for code in selected]
+
+    # 5. 生成GO术语到索引的映射
+    selected = selected[np.argsort(go_uniques[selected].astype(str), kind='stable')]
+    go_to_idx = {go: i for i, go in enumerate(go_uniques[selected])}
+    term_column = np.full(num_terms, -1, dtype=np.int64)
+    term_column[selected] = np.arange(len(selected))
+
+    # 6. 只保留至少有一个有效GO术语的蛋白质
+    columns = term_column[pair_terms]
+    keep = columns >= 0
+    pair_proteins, columns = pair_proteins[keep], columns[keep]
+    kept_proteins = np.unique(pair_proteins)
+    protein_row = np.full(len(protein_uniques), -1, dtype=np.int64)
+    protein_row[kept_proteins] = np.arange(len(kept_proteins))
+
+    labels = csr_matrix(
+        (np.ones(len(columns), dtype=np.float32), (protein_row[pair_proteins], columns)),
+        shape=(len(kept_proteins), len(selected))
+    )
+    return labels, list(protein_uniques[kept_proteins]), go_to_idx, term_counts
+
+
 def build_go_labels(gaf_df, aspect='F', min_samples=10, max_samples=1000, max_terms=1000):
     """
     构建多标签分类的标签矩阵
@@ -54,78 +205,21 @@ def build_go_labels(gaf_df, aspect='F', min_samples=10, max_samples=1000, max_te
         protein_labels: dict, 蛋白质ID到标签向量的映射
         go_to_idx: dict, GO ID到索引的映射
     """
-    # 1. 数据过滤
-    # 仅保留人类蛋白质
-    human_filter = gaf_df['Taxon'].str.contains('taxon:9606')
-
-    # 排除不可靠的证据代码
-    unreliable_codes = ['IEA', 'NAS', 'ND', 'NR']
-    evidence_filter = ~gaf_df['Evidence_Code'].isin(unreliable_codes)
-
-    # 选择特定GO方面
-    aspect_filter = (gaf_df['Aspect'] == aspect)
-
-    # 应用过滤器
-    filtered = gaf_df[human_filter & evidence_filter & aspect_filter].copy()
-    filtered.loc[:, 'UniProt_ID'] = filtered['DB_Object_ID'].str.split(':').str[-1]
-
-    # 2. 构建初始标签映射
-    label_map = defaultdict(set)
-    for _, row in filtered.iterrows():
-        label_map[row['UniProt_ID']].add(row['GO_ID'])
-
-    # 3. 统计GO术语频率
-    go_counts = defaultdict(int)
-    for terms in label_map.values():
-        for go in terms:
-            go_counts[go] += 1
-
-    # 4. 选择合适的GO术语
-    valid_go_terms = set()
-    balanced_go_terms = []
-
-    # 按频率排序GO术语
-    sorted_go_terms = sorted(
-        [(go, count) for go, count in go_counts.items()],
-        key=lambda x: x[1],
-        reverse=True
+    labels, protein_ids, go_to_idx, balanced_go_terms = build_go_label_matrix(
+        gaf_df, aspect, min_samples, max_samples, max_terms
     )
 
-    # 筛选符合条件的GO术语
-    for go, count in sorted_go_terms:
-        if min_samples <= count <= max_samples:
-            valid_go_terms.add(go)
-            balanced_go_terms.append((go, count))
-            if len(valid_go_terms) >= max_terms:
-                break
-
-    # 5. 过滤并均衡标签数据
-    filtered_label_map = {}
-    for prot, terms in label_map.items():
-        valid_terms = terms & valid_go_terms
-        if valid_terms:  # 只保留至少有一个有效GO术语的蛋白质
-            filtered_label_map[prot] = valid_terms
-
-    # 6. 生成GO术语到索引的映射
-    all_go_terms = sorted(valid_go_terms)
-    go_to_idx = {go: i for i, go in enumerate(all_go_terms)}
-
-    # 7. 生成标签向量
-    protein_labels = {}
-    for prot, terms in filtered_label_map.items():
-        label_vector = np.zeros(len(all_go_terms), dtype=np.float32)
-        for go in terms:
-            if go in go_to_idx:
-                label_vector[go_to_idx[go]] = 1.0
-        protein_labels[prot] = label_vector
-
-    # 8. 打印统计信息
-    print(f"\nSelected {len(valid_go_terms)} GO terms with {min_samples}-{max_samples} annotations")
+    # 生成标签向量(整个矩阵一次转为稠密，每个蛋白质取其中一行)
+    dense = labels.toarray()
+    protein_labels = {prot: dense[i] for i, prot in enumerate(protein_ids)}
+
+    # 打印统计信息
+    print(f"\nSelected {len(go_to_idx)} GO terms with {min_samples}-{max_samples} annotations")
     print("\nTop 10 most common GO terms:")
     for go, count in balanced_go_terms[:10]:
         print(f"GO:{go}: {count} annotations")
 
-    # 9. 打印分布统计
+    # 打印分布统计
     term_counts = np.array([count for _, count in balanced_go_terms])
     print(f"\nGO术语分布统计:")
     print(f"最小注释数: {term_counts.min()}")
@@ -0,0 +1,291 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import torch
+
+from utils.graph_edges import batch_chain_edges
+from utils.sliding_window import WindowedContacts
+
+# kNN建图时相似度矩阵的元素数上限(float32约64MB): 批次填充后 B×L×L 不超过该值时整批一次 bmm/topk，
+# 否则逐个图按行块计算，长序列不会分配 L×L 的矩阵
+MAX_SIMILARITY_ELEMENTS = 1 << 24
+
+
+def _batch_vector(lengths):
+    return torch.repeat_interleave(torch.arange(lengths.numel()), lengths)
+
+
+def _node_offsets(lengths):
+    return torch.cumsum(lengths, 0) - lengths
+
+
+class ChainGraphBuilder:
+    """相邻残基 i <-> i+1 (模型训练时使用的默认图)"""
+
+    needs_contacts = False
+    cacheable = False
+
+    def __init__(self):
+        self.name = 'chain'
+
+    def build(self, x, lengths, contacts=None):
+        return batch_chain_edges(lengths)
+
+
+class WindowGraphBuilder:
+    """滑动窗口: 连接序列上距离不超过 k 的所有残基对"""
+
+    needs_contacts = False
+    cacheable = False
+
+    def __init__(self, k=3):
+        self.k = k
+        self.name = f'window_k{k}'
+
+    def build(self, x, lengths, contacts=None):
+        lengths = torch.as_tensor(lengths, dtype=torch.long)
+        batch = _batch_vector(lengths)
+        nodes = torch.arange(batch.numel())
+
+        srcs, dsts = [], []
+        for d in range(1, self.k + 1):
+            if d >= nodes.numel():
+                break
+            # 只保留不跨越图边界的残基对
+            same_graph = batch[:-d] == batch[d:]
+            src = nodes[:-d][same_graph]
+            srcs.extend([src, src + d])
+            dsts.extend([src + d, src])
+
+        if not srcs:
+            return torch.empty((2, 0), dtype=torch.long)
+        return torch.stack([torch.cat(srcs), torch.cat(dsts)])
+
+
+class KnnGraphBuilder:
+    """
+    kNN图: 每个残基连接相似度最高的 k 个残基(对称化)，并保留链式骨架
+    source='embedding' 使用ESM嵌入的余弦相似度，source='contact' 使用ESM预测的接触图
+    短序列批次通过填充后的 bmm/topk 一次完成；含长序列的批次逐个图按行块做 topk，
+    只拼接稀疏的边列表，峰值内存为 行块 × 长度(窗口接触图为 行块 × 窗口)
+    """
+
+    cacheable = True
+
+    def __init__(self, k=10, source='embedding', include_chain=True):
+        if source not in ('embedding', 'contact'):
+            raise ValueError(f"未知的kNN相似度来源: {source}")
+        self.k = k
+        self.source = source
+        self.include_chain = include_chain
+        self.needs_contacts = source == 'contact'
+        self.name = f'knn_{source}_k{k}' + ('_chain' if include_chain else '')
+
+    def _dense_edges(self, x, lengths, contacts):
+        """整批填充后一次 topk，返回批次编号的 (src, dst)"""
+        sim, mask = self._similarity(x, lengths, contacts)
+        max_len = sim.size(1)
+
+        # 排除自身和填充位置
+        invalid = ~mask.unsqueeze(1) | torch.eye(max_len, dtype=torch.bool).unsqueeze(0)
+        sim = sim.masked_fill(invalid, float('-inf'))
+
+        k = min(self.k, max_len - 1)
+        values, neighbors = sim.topk(k, dim=-1)
+        valid = mask.unsqueeze(-1) & torch.isfinite(values)
+
+        offsets = _node_offsets(lengths).view(-1, 1, 1)
+        rows = torch.arange(max_len).view(1, -1, 1).expand_as(neighbors)
+        return torch.stack([(rows + offsets)[valid], (neighbors + offsets)[valid]])
+
+    def _blocked_edges(self, x, contact):
+        """单个图按行块计算相似度和 topk，返回局部编号的 (src, dst)"""
+        n = x.size(0)
+        rows_per_block = max(1, MAX_SIMILARITY_ELEMENTS // n)
+        if self.source == 'embedding':
+            normalized = torch.nn.functional.normalize(x, dim=-1)
+
+        srcs, dsts = [], []
+        for start in range(0, n, rows_per_block):
+            end = min(n, start + rows_per_block)
+            col_start = 0
+            if self.source == 'embedding':
+                sim = normalized[start:end] @ normalized.t()
+            elif isinstance(contact, WindowedContacts):
+                col_start, sim = contact.row_block(start, end)
+            else:
+                sim = contact[start:end].to(x.dtype, copy=True)
+
+            rows = torch.arange(start, end)
+            sim[torch.arange(end - start), rows - col_start] = float('-inf')  # 排除自身
+            k = min(self.k, sim.size(1) - 1)
+            if k < 1:
+                continue
+            values, neighbors = sim.topk(k, dim=-1)
+            valid = torch.isfinite(values)
+            srcs.append(rows.unsqueeze(1).expand_as(neighbors)[valid])
+            dsts.append((neighbors + col_start)[valid])
+
+        if not srcs:
+            return torch.empty((2, 0), dtype=torch.long)
+        return torch.stack([torch.cat(srcs), torch.cat(dsts)])
+
+    def _similarity(self, x, lengths, contacts):
+        from torch_geometric.utils import to_dense_batch
+
+        batch = _batch_vector(lengths)
+        if self.source == 'embedding':
+            dense, mask = to_dense_batch(torch.nn.functional.normalize(x, dim=-1), batch)
+            sim = torch.bmm(dense, dense.transpose(1, 2))
+        else:
+            max_len = int(lengths.max())
+            sim = x.new_zeros((lengths.numel(), max_len, max_len))
+            for i, contact in enumerate(contacts):
+                n = contact.size(0)
+                sim[i, :n, :n] = contact.to(sim.dtype)
+            mask = torch.arange(max_len).unsqueeze(0) < lengths.unsqueeze(1)
+        return sim, mask
+
+    def build(self, x, lengths, contacts=None):
+        # 只有kNN图需要torch_geometric，按需导入，精简推理环境(predict_artifact)可以不安装
+        from torch_geometric.utils import to_undirected
+
+        lengths = torch.as_tensor(lengths, dtype=torch.long)
+        if lengths.numel() == 0 or int(lengths.max()) < 2:
+            return batch_chain_edges(lengths)
+
+        if self.source == 'contact' and contacts is None:
+            raise ValueError("contact 模式需要ESM接触图")
+        windowed = self.source == 'contact' and any(isinstance(c, WindowedContacts) for c in contacts)
+        if not windowed and lengths.numel() * int(lengths.max()) ** 2 <= MAX_SIMILARITY_ELEMENTS:
+            edge_index = self._dense_edges(x, lengths, contacts)
+        else:
+            parts = []
+            offsets = _node_offsets(lengths).tolist()
+            for i, (offset, n) in enumerate(zip(offsets, lengths.tolist())):
+                contact = contacts[i] if self.source == 'contact' else None
+                parts.append(self._blocked_edges(x[offset:offset + n], contact) + offset)
+            edge_index = torch.cat(parts, dim=1)
+
+        if self.include_chain:
+            edge_index = torch.cat([edge_index, batch_chain_edges(lengths)], dim=1)
+        # 对称化并去重，结果按源节点排序(即按图分组)
+        return to_undirected(edge_index, num_nodes=int(lengths.sum()))
+
+
+def create_graph_builder(graph_config=None):
+    """根据模型配置中的 graph 字段创建图构建器"""
+    graph_config = dict(graph_config or {'type': 'chain'})
+    graph_type = graph_config.pop('type', 'chain')
+    if graph_type == 'chain':
+        return ChainGraphBuilder()
+    if graph_type == 'window':
+        return WindowGraphBuilder(**graph_config)
+    if graph_type == 'knn':
+        return KnnGraphBuilder(**graph_config)
+    raise ValueError(f"未知的图构建方式: {graph_type}")
+
+
+class CachedGraphBuilder:
+    """
+    为依赖内容的构建器(kNN)按序列哈希缓存每个图的局部 edge_index
+    只对未命中的序列做一次批量构建，命中的直接按偏移拼接
+    """
+
+    def __init__(self, builder, max_entries=10000):
+        self.builder = builder
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def name(self):
+        return self.builder.name
+
+    @property
+    def needs_contacts(self):
+        return self.builder.needs_contacts
+
+    def _key(self, sequence):
+        return hashlib.sha256(f"{self.builder.name}:{sequence}".encode('utf-8')).hexdigest()
+
+    def lookup(self, sequences):
+        """返回每条序列缓存的局部 edge_index(未命中为None)"""
+        cached = []
+        with self._lock:
+            for seq in sequences:
+                key = self._key(seq)
+                edges = self._cache.get(key)
+                if edges is not None:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                else:
+                    self.misses += 1
+                cached.append(edges)
+        return cached
+
+    def build_local(self, sequences, x_list, get_contacts=None):
+        """
+        返回每个图的局部 edge_index 列表(节点从0编号)，未命中缓存的序列一次性批量构建
+        Args:
+            sequences: 序列列表(作为缓存键)
+            x_list: 每条序列的节点特征
+            get_contacts: contact 模式下按需计算接触图的函数，参数为序列下标列表
+        """
+        lengths = torch.tensor([x.size(0) for x in x_list], dtype=torch.long)
+        if self.builder.cacheable:
+            local_edges = self.lookup(sequences)
+        else:
+            local_edges = [None] * len(sequences)
+
+        missing = [i for i, edges in enumerate(local_edges) if edges is None]
+        if not missing:
+            return local_edges
+
+        miss_lengths = lengths[missing]
+        contacts = get_contacts(missing) if self.builder.needs_contacts else None
+        edge_index = self.builder.build(torch.cat([x_list[i] for i in missing], dim=0),
+                                        miss_lengths, contacts)
+
+        # 按源节点所属的图拆分回局部编号
+        graph_of_edge = _batch_vector(miss_lengths)[edge_index[0]]
+        order = torch.argsort(graph_of_edge, stable=True)
+        edge_index, graph_of_edge = edge_index[:, order], graph_of_edge[order]
+        counts = torch.bincount(graph_of_edge, minlength=len(missing)).tolist()
+        offsets = _node_offsets(miss_lengths)
+        for j, (i, part) in enumerate(zip(missing, torch.split(edge_index, counts, dim=1))):
+            local_edges[i] = part - offsets[j]
+
+        if self.builder.cacheable:
+            with self._lock:
+                for i in missing:
+                    self._cache[self._key(sequences[i])] = local_edges[i]
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+        return local_edges
+
+    def build(self, sequences, x_list, get_contacts=None):
+        """返回整个批次的 edge_index(节点编号已按图偏移)"""
+        lengths = torch.tensor([x.size(0) for x in x_list], dtype=torch.long)
+        if not self.builder.cacheable:
+            # 只依赖长度的构建器直接整批构建
+            contacts = get_contacts(list(range(len(x_list)))) if self.builder.needs_contacts else None
+            return self.builder.build(torch.cat(x_list, dim=0), lengths, contacts)
+
+        local_edges = self.build_local(sequences, x_list, get_contacts)
+        counts = torch.tensor([edges.size(1) for edges in local_edges], dtype=torch.long)
+        return torch.cat(local_edges, dim=1) + _node_offsets(lengths).repeat_interleave(counts)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'builder': self.builder.name,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._cache),
+            }
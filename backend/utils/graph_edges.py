@@ -0,0 +1,74 @@
+import threading
+
+import torch
+
+DEFAULT_MAX_LENGTH = 1000
+
+
+class ChainEdgeFactory:
+    """
+    序列链式图(i <-> i+1)的 edge_index 模板
+    链式图只与长度有关: 预先为最大长度构建一次(与 to_undirected 结果的顺序一致)，
+    长度为 n 的链恰好是模板的前 2*(n-1) 列，因此可以直接返回零拷贝切片。
+    返回的是共享模板的视图，调用方不能原地修改；需要持久化时请先 clone()。
+    """
+
+    def __init__(self, max_length=DEFAULT_MAX_LENGTH):
+        self._lock = threading.Lock()
+        self._template = self._build(max_length)
+        self.max_length = max_length
+
+    @staticmethod
+    def _build(length):
+        # 按 (row, col) 排序: 0->1, 1->0, 1->2, 2->1, 2->3, ...
+        nodes = torch.arange(length, dtype=torch.long)
+        row = nodes.repeat_interleave(2)[1:-1]
+        col = torch.stack([nodes - 1, nodes + 1], dim=1).view(-1)[1:-1]
+        return torch.stack([row, col])
+
+    def _ensure(self, length):
+        if length > self.max_length:
+            with self._lock:
+                if length > self.max_length:
+                    new_length = max(length, self.max_length * 2)
+                    self._template = self._build(new_length)
+                    self.max_length = new_length
+        return self._template
+
+    def chain(self, seq_len):
+        """单条序列的 edge_index，形状 [2, 2*(seq_len-1)]"""
+        if seq_len < 2:
+            return torch.empty((2, 0), dtype=torch.long)
+        template = self._ensure(seq_len)
+        return template[:, :2 * (seq_len - 1)]
+
+    def batch_chain(self, lengths):
+        """
+        一个mini-batch的整体 edge_index(节点编号已按图偏移)，全程向量化
+        Args:
+            lengths: 每个图的节点数(list 或 1维 LongTensor)
+        """
+        lengths = torch.as_tensor(lengths, dtype=torch.long)
+        if lengths.numel() == 0:
+            return torch.empty((2, 0), dtype=torch.long)
+        template = self._ensure(int(lengths.max()))
+
+        edge_counts = (2 * (lengths - 1)).clamp(min=0)
+        total = int(edge_counts.sum())
+        node_offsets = torch.cumsum(lengths, 0) - lengths
+        edge_offsets = torch.cumsum(edge_counts, 0) - edge_counts
+
+        # 每条边在所属图模板中的位置，以及所属图的节点偏移
+        local_pos = torch.arange(total, dtype=torch.long) - edge_offsets.repeat_interleave(edge_counts)
+        return template[:, local_pos] + node_offsets.repeat_interleave(edge_counts)
+
+
+_default_factory = ChainEdgeFactory()
+
+
+def chain_edges(seq_len):
+    return _default_factory.chain(seq_len)
+
+
+def batch_chain_edges(lengths):
+    return _default_factory.batch_chain(lengths)
@@ -0,0 +1,76 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def file_checksum(path, chunk_size=1024 * 1024):
+    """计算文件的sha256，用于标识模型权重版本"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    预测结果缓存: (模型作用域, 序列哈希) -> 完整的sigmoid概率向量
+    只缓存概率，阈值在查询之后再应用。
+    作用域包含模型权重校验和，热替换期间新旧版本的条目互不干扰，
+    旧版本下线后由 invalidate() 清除(或随LRU淘汰)。
+    """
+
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def sequence_key(sequence):
+        return hashlib.sha256(sequence.encode('utf-8')).hexdigest()
+
+    def get(self, sequence, scope):
+        key = (scope, self.sequence_key(sequence))
+        with self._lock:
+            probs = self._entries.get(key)
+            if probs is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return probs
+
+    def put(self, sequence, scope, probs):
+        key = (scope, self.sequence_key(sequence))
+        probs = probs.detach().cpu().clone()
+        with self._lock:
+            self._entries[key] = probs
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, scope):
+        """清除某个作用域(已下线的模型版本)的全部条目，返回清除的条目数"""
+        with self._lock:
+            stale = [key for key in self._entries if key[0] == scope]
+            for key in stale:
+                del self._entries[key]
+            if stale:
+                self.invalidations += 1
+            return len(stale)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'invalidations': self.invalidations,
+                'scopes': sorted({key[0] for key in self._entries}),
+            }
@@ -0,0 +1,104 @@
+import csv
+import io
+import json
+import os
+import threading
+
+INDEX_SUFFIX = '.idx.json'
+
+
+def index_path_for(csv_path):
+    return csv_path + INDEX_SUFFIX
+
+
+def build_result_index(csv_path):
+    """
+    扫描一遍结果CSV，为每个 protein_id 记录其所在行的字节区间，写出旁路索引文件
+    同一蛋白质的相邻行会合并为一个区间 [start, end)
+    """
+    stat = os.stat(csv_path)
+    index = {}
+    with open(csv_path, 'rb') as f:
+        header_line = f.readline()
+        header = next(csv.reader([header_line.decode('utf-8')]))
+        pid_col = header.index('protein_id')
+
+        offset = f.tell()
+        for line in iter(f.readline, b''):
+            end = offset + len(line)
+            row = next(csv.reader([line.decode('utf-8')]), None)
+            if row and len(row) > pid_col:
+                ranges = index.setdefault(row[pid_col], [])
+                if ranges and ranges[-1][1] == offset:
+                    ranges[-1][1] = end
+                else:
+                    ranges.append([offset, end])
+            offset = end
+
+    sidecar = {
+        'mtime': stat.st_mtime,
+        'size': stat.st_size,
+        'header': header,
+        'index': index
+    }
+    tmp_path = index_path_for(csv_path) + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(sidecar, f)
+    os.replace(tmp_path, index_path_for(csv_path))
+    return sidecar
+
+
+def remove_result_index(csv_path):
+    if os.path.exists(index_path_for(csv_path)):
+        os.remove(index_path_for(csv_path))
+
+
+class ResultIndexCache:
+    """已解析的旁路索引的内存缓存，CSV的 mtime/大小 变化时自动重新加载或重建"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cache = {}
+
+    def _load(self, csv_path):
+        stat = os.stat(csv_path)
+        with self._lock:
+            sidecar = self._cache.get(csv_path)
+            if sidecar and sidecar['mtime'] == stat.st_mtime and sidecar['size'] == stat.st_size:
+                return sidecar
+
+            sidecar = None
+            idx_path = index_path_for(csv_path)
+            if os.path.exists(idx_path):
+                with open(idx_path, 'r') as f:
+                    sidecar = json.load(f)
+                if sidecar['mtime'] != stat.st_mtime or sidecar['size'] != stat.st_size:
+                    sidecar = None  # 索引已过期
+
+            if sidecar is None:
+                sidecar = build_result_index(csv_path)
+
+            self._cache[csv_path] = sidecar
+            return sidecar
+
+    def lookup(self, csv_path, protein_id):
+        """只读取目标蛋白质所在的行，返回结果字典列表(找不到时为空列表)"""
+        sidecar = self._load(csv_path)
+        ranges = sidecar['index'].get(protein_id)
+        if not ranges:
+            return []
+
+        rows = []
+        with open(csv_path, 'rb') as f:
+            for start, end in ranges:
+                f.seek(start)
+                chunk = f.read(end - start).decode('utf-8')
+                for row in csv.DictReader(io.StringIO(chunk), fieldnames=sidecar['header']):
+                    if 'confidence' in row:
+                        row['confidence'] = float(row['confidence'])
+                    rows.append(row)
+        return rows
+
+    def invalidate(self, csv_path):
+        with self._lock:
+            self._cache.pop(csv_path, None)
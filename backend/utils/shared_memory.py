@@ -0,0 +1,45 @@
+import gc
+
+
+def share_modules(*modules):
+    """
+    把模块的参数和缓冲区移入共享内存(share_memory_)，返回共享的字节数
+    在主进程中调用后，fork 出的 worker 映射的是同一份物理内存，即使被写入也不会复制
+    """
+    shared = 0
+    for module in modules:
+        module.share_memory()
+        for tensor in list(module.parameters()) + list(module.buffers()):
+            shared += tensor.numel() * tensor.element_size()
+    return shared
+
+
+def freeze_gc():
+    """
+    fork 前把已有对象移入GC的永久代: 子进程的GC不再遍历(写入)这些对象的头部，
+    对应的内存页可以一直与主进程共享
+    """
+    gc.collect()
+    gc.freeze()
+
+
+def memory_usage_mb():
+    """
+    当前进程的内存占用(MB)，读取 /proc/self/smaps_rollup(仅Linux)
+        rss: 常驻内存，包含与其他进程共享的页
+        pss: 共享页按共享进程数均摊后的占用，各worker的pss之和即总占用
+        uss: 进程私有的页(Private_Clean + Private_Dirty)
+        shared: 与其他进程共享的页
+    """
+    fields = {}
+    with open('/proc/self/smaps_rollup', 'r') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(':') and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1]) / 1024  # kB -> MB
+    return {
+        'rss': fields.get('Rss', 0.0),
+        'pss': fields.get('Pss', 0.0),
+        'uss': fields.get('Private_Clean', 0.0) + fields.get('Private_Dirty', 0.0),
+        'shared': fields.get('Shared_Clean', 0.0) + fields.get('Shared_Dirty', 0.0),
+    }
@@ -0,0 +1,93 @@
+import torch
+
+
+def window_spans(length, window, overlap):
+    """
+    把长度为 length 的序列切分为重叠窗口，返回 [(start, end), ...]
+    相邻窗口重叠 overlap 个残基，最后一个窗口与序列末尾对齐(保证每个窗口都是满长)
+    """
+    if length <= window:
+        return [(0, length)]
+    if not 0 <= overlap < window:
+        raise ValueError(f"窗口重叠长度必须在 [0, {window}) 内: {overlap}")
+
+    stride = window - overlap
+    spans = [(start, start + window) for start in range(0, length - window, stride)]
+    spans.append((length - window, length))
+    return spans
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def embed_windowed(forward_fn, sequence, window, overlap, windows_per_batch=8):
+    """
+    长序列分段嵌入: 重叠窗口按 windows_per_batch 个一批送入ESM，
+    残基表示累加回全长矩阵，重叠部分取平均
+    峰值显存只取决于 window × windows_per_batch，与序列总长无关
+
+    Args:
+        forward_fn: 输入若干条(不超过 window 的)序列，返回每条序列 [长度, 维度] 的CPU张量列表
+        sequence: 已清理的完整序列
+    Returns:
+        [len(sequence), 维度] 的残基级嵌入
+    """
+    spans = window_spans(len(sequence), window, overlap)
+    total = None
+    counts = torch.zeros(len(sequence), 1)
+
+    for chunk in _chunks(spans, windows_per_batch):
+        outputs = forward_fn([sequence[start:end] for start, end in chunk])
+        for (start, end), emb in zip(chunk, outputs):
+            if total is None:
+                total = emb.new_zeros((len(sequence), emb.size(1)))
+            total[start:end] += emb
+            counts[start:end] += 1
+
+    return total / counts.to(total.dtype)
+
+
+class WindowedContacts:
+    """
+    长序列的分段接触图: 只保存每个窗口的 [窗口, 窗口] 接触块(float16)，内存与 序列长度 × 窗口 成正比，
+    不物化 L×L 的全长矩阵(titin约35k残基时全长矩阵约5GB)。使用方按行块取出，重叠部分取平均，
+    不在同一窗口内的残基对没有预测值
+    """
+
+    def __init__(self, length, spans, blocks):
+        self.length = length
+        self.spans = spans
+        self.blocks = blocks
+
+    def size(self, dim=None):
+        shape = torch.Size((self.length, self.length))
+        return shape if dim is None else shape[dim]
+
+    def row_block(self, start, end):
+        """
+        返回 (列起点, [end - start, 列数] 的接触值)，只包含覆盖这些行的窗口所涉及的列
+        """
+        covering = [(s, e, block) for (s, e), block in zip(self.spans, self.blocks) if s < end and e > start]
+        col_start = min(s for s, _, _ in covering)
+        col_end = max(e for _, e, _ in covering)
+        total = torch.zeros((end - start, col_end - col_start))
+        counts = torch.zeros((end - start, col_end - col_start))
+        for s, e, block in covering:
+            r0, r1 = max(s, start), min(e, end)
+            total[r0 - start:r1 - start, s - col_start:e - col_start] += block[r0 - s:r1 - s].float()
+            counts[r0 - start:r1 - start, s - col_start:e - col_start] += 1
+        return col_start, total / counts.clamp(min=1)
+
+
+def contacts_windowed(contacts_fn, sequence, window, overlap, windows_per_batch=8):
+    """
+    长序列分段预测接触图，返回 WindowedContacts(按窗口保存，不拼成全长矩阵)
+    """
+    spans = window_spans(len(sequence), window, overlap)
+    blocks = []
+    for chunk in _chunks(spans, windows_per_batch):
+        outputs = contacts_fn([sequence[start:end] for start, end in chunk])
+        blocks.extend(contact.half() for contact in outputs)
+    return WindowedContacts(len(sequence), spans, blocks)
@@ -17,4 +17,49 @@ export async function getProteinData(proteinId, filename) {
   return await axios.get(`/api/protein/${proteinId}`, {
     params: { filename }
   })
-}
\ No newline at end of file
+}
+
+// 流式FASTA预测：每收到一个蛋白质的结果就回调 onResult，结束时返回 { filename, count }
+export async function predictFastaStream(file, onResult) {
+  const formData = new FormData()
+  formData.append('file', file)
+
+  const response = await fetch('/api/predict/stream', {
+    method: 'POST',
+    body: formData,
+    headers: { Accept: 'application/x-ndjson' }
+  })
+  if (!response.ok) {
+    const error = await response.json().catch(() => ({}))
+    throw new Error(error.error || `HTTP ${response.status}`)
+  }
+
+  const reader = response.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+  let summary = null
+
+  const handleLine = (line) => {
+    if (!line.trim()) return
+    const message = JSON.parse(line)
+    if (message.type === 'result') {
+      onResult(message)
+    } else if (message.type === 'done') {
+      summary = { filename: message.filename, count: message.count }
+    } else if (message.type === 'error') {
+      throw new Error(message.error)
+    }
+  }
+
+  while (true) {
+    const { done, value } = await reader.read()
+    if (done) break
+    buffer += decoder.decode(value, { stream: true })
+    const lines = buffer.split('\n')
+    buffer = lines.pop()
+    lines.forEach(handleLine)
+  }
+  handleLine(buffer)
+
+  return summary
+}